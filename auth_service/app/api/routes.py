@@ -1,12 +1,18 @@
 import uuid
-from fastapi import APIRouter, HTTPException, status, Depends,Request
+import base64
+import binascii
+import json
+from fastapi import APIRouter, HTTPException, status, Depends,Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import  HTTPAuthorizationCredentials
 from typing import List
 from datetime import datetime
 from app.api.models import UserCreate, User, LoginRequest, Token, PasswordChange, Event
-from app.database import users_db, sessions_db, outbox_db
+from app.database import users_db, sessions_db, outbox_db, UserRecord, find_user_by_email, iter_users
 from app.api.dependencies import security, get_current_user
 from shared.rabbitmq import publish_notification_async
+from shared.unique_id import generate_id
+from shared.repository import DuplicateKeyError
 from starlette.responses import RedirectResponse
 import httpx
 import logging
@@ -31,38 +37,126 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 def generate_unique_user_id():
-    """Генерує ID і перевіряє унікальність в пам'яті"""
-    max_attempts = 10
-    for _ in range(max_attempts):
-        user_id = str(uuid.uuid4())
-
-        # Перевіряємо чи немає користувача з таким ID
-        user_exists = any(user['id'] == user_id for user in users_db)
-        if not user_exists:
-            return user_id
-            
-    raise Exception("Cannot generate unique ID")
-
-@router.get('/users', response_model=List[User])
-async def index():
-    return users_db
+    """Генерує k-сортований ID без перегляду users_db"""
+    return generate_id()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Скільки рядків NDJSON віддавати одним шматком потоку
+NDJSON_CHUNK_ROWS = 1000
+USER_FIELDS = tuple(User.model_fields)
+
+def _encode_cursor(user_id: str) -> str:
+    return base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        user_id = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        user_id = None
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return user_id
+
+def _parse_fields(fields: str | None) -> tuple:
+    if not fields:
+        return USER_FIELDS
+    selected = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in USER_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def _user_json(user, fields: tuple) -> dict:
+    # Рядок серіалізується напряму, без валідації через Pydantic-модель
+    data = {field: user[field] for field in fields}
+    if "created_at" in data:
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+@router.get('/users')
+def index(
+    request: Request,
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = None,
+    fields: str | None = None,
+    email: str | None = None,
+    created_after: datetime | None = None,
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+):
+    """
+    Користувачі в порядку створення.
+    format=json   - одна сторінка (limit, за замовчуванням 100, не більше 1000);
+                    курсор наступної сторінки - у заголовках X-Next-Cursor і Link.
+    format=ndjson - потокове вивантаження, рядок JSON на користувача (усі або не більше limit).
+    fields=id,email - лише обрані поля; email= і created_after= - фільтри.
+    """
+    selected = _parse_fields(fields)
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    after = _decode_cursor(cursor) if cursor else None
+    if created_after is not None and created_after.tzinfo is not None:
+        # Час створення зберігається як місцевий час без поясу (datetime.now())
+        created_after = created_after.astimezone().replace(tzinfo=None)
+
+    if email is not None:
+        # Пошук за унікальним індексом email замість перегляду всіх користувачів
+        user = find_user_by_email(email)
+        users = iter([user] if user is not None
+                     and (after is None or user["id"] > after)
+                     and (created_after is None or user["created_at"] > created_after) else [])
+    elif output == "ndjson":
+        users = iter_users(after, created_after)
+    else:
+        # Пачка з індексу на сторінку плюс один запис - щоб знати, чи є наступна
+        users = iter_users(after, created_after, batch=page_size + 1)
+
+    if output == "ndjson":
+        def rows():
+            chunk = []
+            for count, user in enumerate(users, 1):
+                chunk.append(json.dumps(_user_json(user, selected)))
+                if limit is not None and count >= limit:
+                    break
+                if len(chunk) >= NDJSON_CHUNK_ROWS:
+                    yield "\n".join(chunk) + "\n"
+                    chunk = []
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    page = []
+    headers = {}
+    for user in users:
+        if len(page) == page_size:
+            # Є ще хоча б один користувач - віддаємо курсор на наступну сторінку
+            next_cursor = _encode_cursor(page[-1]["id"])
+            headers["X-Next-Cursor"] = next_cursor
+            # Лише відносний запит: клієнт звертається через gateway (/auth/users), а не до request.url сервісу
+            next_query = request.url.include_query_params(cursor=next_cursor).query
+            headers["Link"] = f'<?{next_query}>; rel="next"'
+            break
+        page.append(user)
+    return JSONResponse([_user_json(user, selected) for user in page], headers=headers)
 
 @router.post('/users', status_code=201)
 async def add_user(user_data: UserCreate):
-    for user in users_db:
-        if user["email"] == user_data.email:
-            raise HTTPException(status_code=400,detail = "Email already registered" )
+    if find_user_by_email(user_data.email) is not None:
+        raise HTTPException(status_code=400,detail = "Email already registered" )
         
     user_id = generate_unique_user_id()
 
-    new_user = {
-        "id":user_id,
-        "email": user_data.email,
-        "password":user_data.password,
-        "full_name": user_data.full_name,
-        "created_at": datetime.now()
-    }
-    users_db.append(new_user)
+    new_user = UserRecord(
+        id=user_id,
+        email=user_data.email,
+        password=user_data.password,
+        full_name=user_data.full_name,
+        created_at=datetime.now()
+    )
+    try:
+        # Унікальний індекс email перевіряє ще раз під блокуванням (паралельна реєстрація)
+        await users_db.insert_async(new_user)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400,detail = "Email already registered" )
 
     
     payload = {  
@@ -73,7 +167,7 @@ async def add_user(user_data: UserCreate):
     }
 
     outbox_entry ={
-        "id":str(uuid.uuid4()),
+        "id":generate_id(),
         "payload": payload,
         # "exchange": "",
         # "routing_key": "notifications", # Куди потрібно відправити
@@ -87,11 +181,7 @@ async def add_user(user_data: UserCreate):
 @router.put("/users/{user_id}/")
 async def change_password(user_id: str, password_data: PasswordChange):
     # Знаходимо користувача
-    user = None
-    for u in users_db:
-        if u["id"] == user_id:
-            user = u
-            break
+    user = users_db.get(user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -101,7 +191,7 @@ async def change_password(user_id: str, password_data: PasswordChange):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Оновлюємо пароль
-    user["password"] = password_data.new_password
+    await users_db.update_async(user_id, {"password": password_data.new_password})
     print(f"Password changed for user: {user['email']}")
 
     payload = {  
@@ -112,7 +202,7 @@ async def change_password(user_id: str, password_data: PasswordChange):
     }
 
     outbox_entry ={
-        "id":str(uuid.uuid4()),
+        "id":generate_id(),
         "payload": payload,
         # "exchange": "",
         # "routing_key": "notifications", # Куди потрібно відправити
@@ -125,19 +215,11 @@ async def change_password(user_id: str, password_data: PasswordChange):
 
 @router.delete("/users/{user_id}/")
 async def delete_user(user_id: str):
-    user = None
-    user_index = None
-    for index,us in enumerate(users_db):
-        if us["id"] == user_id:
-            user = us
-            user_index = index
-            break
+    user = await users_db.delete_async(user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    del users_db[user_index]
-    
     print(f"User successfully deleted: {user['email']}")
 
     payload = {  
@@ -148,7 +230,7 @@ async def delete_user(user_id: str):
     }
 
     outbox_entry ={
-        "id":str(uuid.uuid4()),
+        "id":generate_id(),
         "payload": payload,
         # "exchange": "",
         # "routing_key": "notifications", # Куди потрібно відправити
@@ -269,11 +351,7 @@ async def get_my_profile(current_user: dict = Depends(get_current_user)):
 
 @router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
-    user = None
-    for u in users_db:
-        if u["id"] == user_id:
-            user = u
-            break
+    user = users_db.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return User(**user)
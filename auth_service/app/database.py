@@ -1,18 +1,65 @@
-import uuid
 from datetime import datetime
 
-test_id = str(uuid.uuid4())
+from shared.repository import RangeIndex, UniqueIndex
+from shared.storage import open_repository
+from shared.records import Record
+from shared.unique_id import generate_id, id_lower_bound
 
-users_db = [
-    {
-        'id':test_id,
-        'email':'something@gmail.com',
-        'password':'a123bk',
-        'full_name':'Oleksandr',
-        'created_at':datetime.now()
-    }
-]
+class UserRecord(Record):
+    __slots__ = ("id", "email", "password", "full_name", "created_at")
+    TIMESTAMPS = frozenset({"created_at"})
+
+def normalize_email(email: str) -> str:
+    """Ключ індексу email: адреси, що відрізняються лише регістром, вважаються однаковими"""
+    return email.strip().lower()
+
+# Користувачі: хеш-індекс за id (первинний ключ) і унікальний індекс за нормалізованим email.
+# Унікальність email перевіряється атомарно при insert (DuplicateKeyError), без перегляду всіх записів.
+# Впорядкований індекс id - для сторінок списку: ID k-сортовані, тож це порядок створення.
+users_db = open_repository("users", indexes={
+    "email": UniqueIndex("email", key=lambda u: normalize_email(u["email"])),
+    "id_order": RangeIndex("id"),
+})
+
+def find_user_by_email(email: str):
+    return users_db.find_one("email", normalize_email(email))
+
+def iter_users(after: str = None, created_after: datetime = None, batch: int = 500):
+    """
+    Користувачі в порядку id, з id > after і created_at > created_after.
+    Читає індекс пачками по batch записів, тож вартість пропорційна кількості прочитаних.
+    """
+    start = after
+    if created_after is not None:
+        # Найменший ID, створений у ту ж мілісекунду - далі точна перевірка created_at
+        bound = id_lower_bound(created_after)
+        if start is None or bound > start:
+            start = bound
+    skip = after
+    while True:
+        records = users_db.range("id_order", start, limit=batch)
+        for record in records:
+            if record["id"] == skip:
+                continue
+            if created_after is not None and record["created_at"] <= created_after:
+                continue
+            yield record
+        if len(records) < batch:
+            return
+        start = skip = records[-1]["id"]
+
+test_id = generate_id()
+
+# Тестовий користувач (якщо його ще немає у збереженому стані)
+if find_user_by_email('something@gmail.com') is None:
+    users_db.insert(UserRecord(
+        id=test_id,
+        email='something@gmail.com',
+        password='a123bk',
+        full_name='Oleksandr',
+        created_at=datetime.now()
+    ))
 
 outbox_db = []
 
-sessions_db = {}
\ No newline at end of file
+sessions_db = {}
@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from shared.persistence import DurableWritesMiddleware
 from app.api.routes import router
 from app.database import outbox_db,users_db
 import asyncio
@@ -87,13 +88,8 @@ async def saga_rollback_listener():
                             
                             # 4. ЛОГІКА КОМПЕНСАЦІЇ (ВІДКАТУ)
                             # Видаляємо користувача з локальної БД
-                            global users_db
-                            initial_len = len(users_db)
-                            users_to_keep = [u for u in users_db if u["id"] != user_id]
-                            users_db.clear()
-                            users_db.extend(users_to_keep)
-                            
-                            if len(users_db) < initial_len:
+                            # (через репозиторій, щоб індекси id та email лишалися узгодженими)
+                            if user_id and await users_db.delete_async(user_id) is not None:
                                 logger.info(f"User {user_id} removed from DB.")
                             else:
                                 logger.warning(f"User {user_id} not found in DB or already removed.")
@@ -174,6 +170,9 @@ setup_tracing(app, "auth-service")
 # Додаємо Middleware для автоматичного збору даних для КОЖНОГО запиту
 app.add_middleware(BaseHTTPMiddleware, dispatch=prometheus_middleware)
 
+# Очікування fsync журналу (PERSISTENCE_FSYNC=always) - поза event loop, перед відправкою відповіді
+app.add_middleware(DurableWritesMiddleware)
+
 # Підключаємо всі маршрути
 app.include_router(router)
 # Додаємо ендпоінт /metrics, який Prometheus буде опитувати
@@ -188,7 +187,13 @@ async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # UVICORN_UDS=/run/services/<name>.sock - слухати Unix-сокет замість TCP (gateway на тому ж хості)
+    uds = os.getenv("UVICORN_UDS")
+    if uds:
+        uvicorn.run(app, uds=uds)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 
 
@@ -0,0 +1,82 @@
+"""
+Пошук користувачів auth_service: індекси users_db проти лінійного перегляду списку (як було).
+
+Для 10^5 і 10^6 користувачів вимірює get за id (GET /users/{id} - його викликають
+board, task і subscription для кожної зміни), пошук за email у іншому регістрі,
+перевірку унікальності email при реєстрації, delete + insert і сторінку
+GET /users (100 користувачів після курсора).
+
+    python benchmarks/bench_auth_users.py --lookups 2000 --scan-max 100000
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+from itertools import islice
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "auth_service"))
+
+# Справжній users_db з його індексами (app.database auth_service)
+database = importlib.import_module("app.database")
+from shared.unique_id import generate_id
+
+
+def fill(size: int) -> list:
+    database.users_db.clear()
+    rows = []
+    for i in range(size):
+        user = database.UserRecord(
+            id=generate_id(),
+            email=f"User{i}@Example.com",
+            password="secret",
+            full_name=f"User {i}",
+            created_at=datetime.now(),
+        )
+        database.users_db.insert(user)
+        rows.append(user)
+    return rows
+
+
+def per_call_us(func, args_list) -> float:
+    started = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def main(args):
+    users_db = database.users_db
+    print(f"{'users':>10}{'get':>10}{'scan id':>12}{'email':>10}{'scan email':>12}{'delete+ins':>12}{'page 100':>10}   (us/call)")
+    for size in (10 ** 5, 10 ** 6):
+        rows = fill(size)
+        sample = random.sample(rows, k=min(args.lookups, size))
+        ids = [(row["id"],) for row in sample]
+        emails = [(row["email"].upper(),) for row in sample]
+
+        get = per_call_us(users_db.get, ids)
+        email = per_call_us(database.find_user_by_email, emails)
+
+        def reinsert(pk):
+            users_db.insert(users_db.delete(pk))
+        churn = per_call_us(reinsert, ids)
+        page = per_call_us(lambda pk: list(islice(database.iter_users(after=pk), 100)), ids[:200])
+
+        scan_id = scan_email = "-"
+        if size <= args.scan_max:
+            scan_id = f"{per_call_us(lambda pk: next(u for u in rows if u['id'] == pk), ids[:50]):.1f}"
+            # Регістронезалежний перегляд, як мала б робити перевірка унікальності без індексу
+            scan_email = f"{per_call_us(lambda e: [u for u in rows if u['email'].lower() == e.lower()], emails[:50]):.1f}"
+        print(f"{size:>10}{get:>10.2f}{scan_id:>12}{email:>10.2f}{scan_email:>12}{churn:>12.2f}{page:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--scan-max", type=int, default=100_000,
+                        help="найбільший розмір, для якого міряти перегляд списку")
+    main(parser.parse_args())
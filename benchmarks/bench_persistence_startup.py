@@ -0,0 +1,101 @@
+"""
+Час відновлення Repository у пам'яті після перезапуску (shared.persistence).
+
+Записує rows завдань через журнал змін, після чого вимірює запуск:
+відтворенням лише WAL, зі знімка, і зі знімка плюс хвіст WAL (10% змін після знімка).
+Кожне відновлення виконується в окремому процесі, як справжній перезапуск сервісу.
+
+    python benchmarks/bench_persistence_startup.py --rows 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from shared.persistence import Persistence
+from shared.repository import MultiIndex, RangeIndex, Repository
+
+
+def make_repository():
+    return Repository("tasks", indexes={
+        "active_board_id": MultiIndex("board_id", key=lambda t: t["board_id"] if t["status"] != "archived" else None),
+        "due_date": RangeIndex("due_date"),
+    })
+
+
+def task(i: int) -> dict:
+    now = datetime.now()
+    return {
+        "id": f"task-{i:08d}", "title": f"Task {i}", "description": "", "board_id": f"board-{i // 100}",
+        "status": "todo", "priority": "medium", "assignee_id": None, "created_by": "user",
+        "due_date": None, "created_at": now, "updated_at": now,
+    }
+
+
+def write(directory: str, start: int, count: int, mode: str) -> float:
+    persistence = Persistence(directory, fsync_mode=mode)
+    repository = make_repository()
+    persistence.attach(repository)
+    started = time.perf_counter()
+    for i in range(start, start + count):
+        repository.insert(task(i))
+    persistence.flush()
+    elapsed = time.perf_counter() - started
+    persistence.close()
+    return count / elapsed
+
+
+def snapshot(directory: str):
+    persistence = Persistence(directory)
+    repository = make_repository()
+    persistence.attach(repository)
+    persistence.journals[0].snapshot()
+    persistence.close()
+
+
+def recover_in_subprocess(directory: str) -> str:
+    output = subprocess.run([sys.executable, __file__, "--recover", directory],
+                            capture_output=True, text=True, check=True)
+    return output.stdout.strip()
+
+
+def recover(directory: str):
+    started = time.perf_counter()
+    persistence = Persistence(directory)
+    repository = make_repository()
+    persistence.attach(repository)
+    print(f"{len(repository)} records in {time.perf_counter() - started:.2f}s")
+
+
+def size_mb(directory: str) -> float:
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 2 ** 20
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        rate = write(directory, 0, args.rows, "batch")
+        print(f"write (fsync batch): {rate:,.0f} inserts/s, on disk {size_mb(directory):.1f} MB")
+        print(f"startup, WAL only:           {recover_in_subprocess(directory)}")
+        snapshot(directory)
+        print(f"startup, snapshot:           {recover_in_subprocess(directory)}   ({size_mb(directory):.1f} MB)")
+        write(directory, args.rows, args.rows // 10, "batch")
+        print(f"startup, snapshot + WAL 10%: {recover_in_subprocess(directory)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        rate = write(directory, 0, min(args.rows, 20_000), "always")
+        print(f"write (fsync always, 1 thread): {rate:,.0f} inserts/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--recover":
+        recover(sys.argv[2])
+        sys.exit()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+"""
+Пам'ять на рядок: dict на кожен запис (як було) проти компактних записів shared.records.
+
+Заповнює справжні репозиторії task_service і notification_service (з їхніми індексами)
+через create_task/create_notification і порівнює з тими самими даними у вигляді dict
+у Repository з еквівалентними індексами. Пам'ять міряється tracemalloc.
+
+    python benchmarks/bench_record_memory.py --rows 1000000
+"""
+import argparse
+import gc
+import importlib
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from shared.repository import MultiIndex, Repository
+from shared.unique_id import generate_id
+
+TASKS_PER_BOARD = 100
+USERS = 10_000
+
+
+def load_database(service: str):
+    """app.database сервісу (пакети всіх сервісів називаються app, тому імпортуємо по черзі)"""
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        del sys.modules[name]
+    sys.path.insert(0, os.path.join(ROOT, service))
+    try:
+        return importlib.import_module("app.database")
+    finally:
+        sys.path.pop(0)
+
+
+def measure(fill, rows: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    keep = fill(rows)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return used / rows
+
+
+def tasks_as_dicts(rows: int):
+    repo = Repository("tasks", indexes={
+        "active_board_id": MultiIndex("board_id", key=lambda t: t["board_id"] if t["status"] != "archived" else None),
+    })
+    for i in range(rows):
+        repo.insert({
+            "id": generate_id(), "title": f"Task {i}", "description": "",
+            "board_id": f"board-{i // TASKS_PER_BOARD}", "status": "todo", "priority": "medium",
+            "assignee_id": None, "created_by": f"user-{i % USERS}", "due_date": None,
+            "created_at": datetime.now(), "updated_at": datetime.now(),
+        })
+    return repo
+
+
+def tasks_as_records(rows: int):
+    database = load_database("task_service")
+    for i in range(rows):
+        database.create_task(f"Task {i}", "", f"board-{i // TASKS_PER_BOARD}", f"user-{i % USERS}")
+    return database
+
+
+def notifications_as_dicts(rows: int):
+    repo = Repository("notifications", indexes={
+        "user_id": MultiIndex("user_id"),
+        "notification_type": MultiIndex("notification_type"),
+    })
+    for i in range(rows):
+        repo.insert({
+            "id": generate_id(), "user_id": f"user-{i % USERS}", "notification_type": "task_updated",
+            "subject": "task_updated", "message": f"Task {i} updated", "metadata": {},
+            "sent_at": datetime.now(), "status": "sent",
+        })
+    return repo
+
+
+def notifications_as_records(rows: int):
+    database = load_database("notification_service")
+    notification_type = database.NotificationType.TASK_UPDATED
+    for i in range(rows):
+        database.create_notification(f"user-{i % USERS}", notification_type, "task_updated", f"Task {i} updated")
+    return database
+
+
+def main(args):
+    print(f"rows={args.rows}, bytes per row (records + indexes)")
+    print(f"{'':>14}{'dict':>10}{'record':>10}{'saved':>8}")
+    for name, before, after in (("task", tasks_as_dicts, tasks_as_records),
+                                ("notification", notifications_as_dicts, notifications_as_records)):
+        dict_bytes = measure(before, args.rows)
+        record_bytes = measure(after, args.rows)
+        print(f"{name:>14}{dict_bytes:>10.0f}{record_bytes:>10.0f}{1 - record_bytes / dict_bytes:>8.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+Час пошуку в shared.repository.Repository проти лінійного перегляду списку.
+
+Для 10^3..10^6 записів, схожих на завдання task_service, вимірює:
+get за первинним ключем, find за MultiIndex (завдання дошки),
+вибірку за RangeIndex (термін за добу) і update зі зміною індексованого поля.
+
+    python benchmarks/bench_repository.py --lookups 2000 --scan-max 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.repository import Repository, MultiIndex, RangeIndex
+from shared.unique_id import generate_id
+
+# Як TASK_LIMIT_PER_BOARD: на дошці 100 завдань незалежно від розміру колекції
+TASKS_PER_BOARD = 100
+
+
+def build(size: int):
+    repo = Repository("tasks", indexes={
+        "board_id": MultiIndex("board_id"),
+        "due_date": RangeIndex("due_date"),
+    })
+    rows = []
+    start = datetime(2025, 1, 1)
+    boards = max(1, size // TASKS_PER_BOARD)
+    for i in range(size):
+        task = {
+            "id": generate_id(),
+            "board_id": f"board-{i % boards}",
+            "status": "todo",
+            "due_date": start + timedelta(minutes=i),
+        }
+        repo.insert(task)
+        rows.append(task)
+    return repo, rows
+
+
+def per_call_us(func, args_list) -> float:
+    started = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def main(args):
+    print(f"{'records':>10}{'get':>10}{'scan id':>12}{'find':>10}{'scan board':>12}{'range 1d':>10}{'update':>10}   (us/call)")
+    for exponent in range(3, 7):
+        size = 10 ** exponent
+        repo, rows = build(size)
+        sample = random.choices(rows, k=args.lookups)
+        ids = [(row["id"],) for row in sample]
+        boards = [(row["board_id"],) for row in sample]
+        days = [(row["due_date"], row["due_date"] + timedelta(days=1)) for row in sample]
+
+        get = per_call_us(repo.get, ids)
+        find = per_call_us(lambda board: repo.find("board_id", board), boards)
+        day = per_call_us(lambda s, e: repo.range("due_date", s, e), days[:200])
+        # Переносимо завдання на іншу дошку: кількість завдань на дошках не змінюється
+        update = per_call_us(lambda pk, board: repo.update(pk, {"board_id": board}),
+                             [(pk, board) for (pk,), (board,) in zip(ids, reversed(boards))])
+
+        scan_id = scan_board = "-"
+        if size <= args.scan_max:
+            scan_id = f"{per_call_us(lambda pk: next(r for r in rows if r['id'] == pk), ids[:50]):.1f}"
+            scan_board = f"{per_call_us(lambda board: [r for r in rows if r['board_id'] == board], boards[:50]):.1f}"
+        print(f"{size:>10}{get:>10.2f}{scan_id:>12}{find:>10.1f}{scan_board:>12}{day:>10.1f}{update:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--scan-max", type=int, default=100_000,
+                        help="найбільший розмір, для якого міряти перегляд списку")
+    main(parser.parse_args())
@@ -0,0 +1,108 @@
+"""
+Порівняння бекендів сховища: Repository у пам'яті і SqliteRepository (WAL, один writer).
+
+Вимірює пропускну здатність вставки завдань з 1 і з кількох потоків
+(з кількох потоків writer об'єднує записи в спільні транзакції)
+і затримку p50/p99 для get за ключем і find за індексом дошки.
+
+    python benchmarks/bench_storage_backends.py --rows 20000 --threads 16
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.repository import MultiIndex, RangeIndex, Repository
+from shared.sqlite_repository import SqliteRepository, SqliteStore
+from shared.unique_id import generate_id
+
+
+def indexes():
+    return {
+        "active_board_id": MultiIndex("board_id", key=lambda t: t["board_id"] if t["status"] != "archived" else None),
+        "due_date": RangeIndex("due_date"),
+    }
+
+
+def make_task(boards: int) -> dict:
+    return {
+        "id": generate_id(),
+        "title": "Benchmark task",
+        "description": "x" * 200,
+        "board_id": f"board-{random.randrange(boards)}",
+        "status": "todo",
+        "priority": "medium",
+        "assignee_id": None,
+        "created_by": "user",
+        "due_date": None,
+        "created_at": datetime.now(),
+        "updated_at": datetime.now(),
+    }
+
+
+def write_throughput(repo, rows: int, threads: int, boards: int) -> float:
+    per_thread = rows // threads
+    tasks = [[make_task(boards) for _ in range(per_thread)] for _ in range(threads)]
+
+    def writer(batch):
+        for task in batch:
+            repo.insert(task)
+
+    workers = [threading.Thread(target=writer, args=(batch,)) for batch in tasks]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def latencies_us(func, args_list) -> tuple[float, float]:
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - started) * 1e6)
+    percentiles = statistics.quantiles(samples, n=100)
+    return percentiles[49], percentiles[98]
+
+
+def run(name: str, make_repo, args):
+    single = write_throughput(make_repo(), args.rows, 1, args.boards)
+    repo = make_repo()
+    parallel = write_throughput(repo, args.rows, args.threads, args.boards)
+    ids = [(task["id"],) for task in random.sample(repo.all(), args.reads)]
+    boards = [(f"board-{random.randrange(args.boards)}",) for _ in range(args.reads)]
+    get_p50, get_p99 = latencies_us(repo.get, ids)
+    find_p50, find_p99 = latencies_us(lambda board: repo.find("active_board_id", board), boards)
+    print(f"{name:>14}{single:>12.0f}{parallel:>14.0f}{get_p50:>10.1f}{get_p99:>10.1f}{find_p50:>10.1f}{find_p99:>10.1f}")
+
+
+def main(args):
+    print(f"rows={args.rows}, threads={args.threads}, ~{args.rows // args.boards} tasks per board")
+    print(f"{'backend':>14}{'insert/s 1':>12}{f'insert/s {args.threads}':>14}"
+          f"{'get p50':>10}{'get p99':>10}{'find p50':>10}{'find p99':>10}   (us)")
+    run("memory", lambda: Repository("tasks", indexes=indexes()), args)
+    with tempfile.TemporaryDirectory() as directory:
+        for synchronous in ("NORMAL", "FULL"):
+            store = SqliteStore(os.path.join(directory, f"{synchronous}.db"), synchronous=synchronous)
+            counter = iter(range(100))
+            run(f"sqlite/{synchronous.lower()}",
+                lambda: SqliteRepository(store, f"tasks{next(counter)}", indexes=indexes()), args)
+            store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--boards", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+"""
+Порівняння затримки проксі-шляху gateway -> upstream через TCP loopback і Unix-сокет.
+
+Запускає один і той самий тестовий upstream на 127.0.0.1 і на Unix-сокеті,
+створює для кожного пул gateway (upstream.UpstreamPool) і виконує через proxy.fetch
+послідовні та паралельні GET, виводячи p50/p99.
+
+    python benchmarks/bench_uds_transport.py --requests 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "gateaway"))
+
+import uvicorn
+from fastapi import FastAPI
+
+import config
+from proxy import fetch
+from upstream import UpstreamPool
+
+# Тестовий upstream: відповідь схожа за розміром на GET /boards/{id}
+upstream_app = FastAPI()
+BOARD = {
+    "id": "1", "name": "Board", "admin_user_id": "u1", "users": [f"u{i}" for i in range(10)],
+    "status": "active", "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+}
+
+
+@upstream_app.get("/boards/{board_id}")
+async def get_board(board_id: str):
+    return BOARD
+
+
+def start_server(**bind) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(upstream_app, log_level="warning", **bind))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def run(pool: UpstreamPool, requests: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await fetch(pool, "GET", f"boards/{i}")
+            latencies.append(time.perf_counter() - started)
+
+    # Прогрів з'єднань
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    latencies.clear()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+async def main(args):
+    socket_path = os.path.join(tempfile.mkdtemp(), "upstream.sock")
+    start_server(host="127.0.0.1", port=args.port)
+    start_server(uds=socket_path)
+
+    settings = {**config.DEFAULT_POOL_SETTINGS}
+    # Бенчмарк вимірює транспорт: limiter і breaker не повинні втручатися
+    config.CONCURRENCY_LIMIT_SETTINGS["enabled"] = False
+    targets = {
+        "tcp": f"http://127.0.0.1:{args.port}",
+        "uds": f"unix:{socket_path}",
+    }
+
+    print(f"{'transport':<10}{'concurrency':>12}{'p50, ms':>10}{'p99, ms':>10}{'mean, ms':>10}")
+    for concurrency in (1, args.concurrency):
+        for name, url in targets.items():
+            pool = UpstreamPool(f"bench-{name}", [url], settings)
+            pool.open()
+            try:
+                latencies = await run(pool, args.requests, concurrency)
+            finally:
+                await pool.close()
+            print(f"{name:<10}{concurrency:>12}"
+                  f"{percentile(latencies, 50) * 1000:>10.3f}"
+                  f"{percentile(latencies, 99) * 1000:>10.3f}"
+                  f"{statistics.mean(latencies) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=18500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""
+Вартість вставки запису з генерацією ID залежно від кількості наявних записів.
+
+legacy - попередній generate_unique_id: uuid4 + перегляд усього списку (O(n));
+new    - shared.unique_id.generate_id: k-сортований ID без перегляду (O(1)).
+
+    python benchmarks/bench_unique_id.py --inserts 1000 --legacy-max 100000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.unique_id import generate_id, id_created_at
+
+
+def legacy_generate_unique_id(data):
+    for _ in range(10):
+        new_id = str(uuid.uuid4())
+        if not any(example['id'] == new_id for example in data):
+            return new_id
+    raise Exception("Cannot generate unique ID")
+
+
+def measure(generate, size: int, inserts: int) -> float:
+    """Середній час однієї вставки (мкс) у список з size записів"""
+    data = [{"id": generate_id()} for _ in range(size)]
+    started = time.perf_counter()
+    for _ in range(inserts):
+        data.append({"id": generate(data)})
+    return (time.perf_counter() - started) / inserts * 1e6
+
+
+def main(args):
+    print(f"{'records':>10}{'legacy, us':>14}{'new, us':>10}")
+    for exponent in range(3, 7):
+        size = 10 ** exponent
+        legacy = f"{measure(legacy_generate_unique_id, size, args.inserts):>14.2f}" if size <= args.legacy_max else f"{'-':>14}"
+        new = measure(lambda data: generate_id(), size, args.inserts)
+        print(f"{size:>10}{legacy}{new:>10.2f}")
+
+    # Перевірка властивостей: унікальність і зростання в межах процесу
+    ids = [generate_id() for _ in range(100_000)]
+    assert len(set(ids)) == len(ids) and ids == sorted(ids)
+    print(f"100000 IDs unique and sorted, created_at of last: {id_created_at(ids[-1])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inserts", type=int, default=1000)
+    parser.add_argument("--legacy-max", type=int, default=100_000,
+                        help="найбільший розмір, для якого міряти legacy (O(n^2) на великих списках)")
+    main(parser.parse_args())
@@ -1,38 +1,42 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-import requests
+import httpx
 from typing import List
 from shared.rabbitmq import publish_notification_async
+from shared.circuit_breaker import auth_service_cb, CircuitOpenError
+from shared.service_client import service_get
 
 from app.api.models import (BoardCreate, Board, BoardUpdate, BoardStatus,
     UserInviteRequest, UserJoinRequest, UserRoleUpdate, 
     UserRemoveRequest, BoardUserResponse, UserRole
 )
-from app.database import (boards_db, create_board, find_board_by_id, find_boards_by_user, update_board,
-                          is_user_admin,add_user_to_board,update_user_role,remove_user_from_board,get_board_users)
+from app.database import (create_board_async, find_board_by_id, find_boards_by_user, update_board_async,
+                          remove_board_async, is_user_admin, add_user_to_board_async, update_user_role_async,
+                          remove_user_from_board_async, get_board_users)
 
 router = APIRouter()
 
-# Синхронний виклик до auth-service для перевірки користувача
-def verify_user_exists(user_id: str) -> bool:
+# Виклик до auth-service для перевірки користувача
+async def verify_user_exists(user_id: str) -> bool:
     try:
-        # Виклик до auth-service (синхронна комунікація)
-        response = requests.get(f"http://auth-service:8000/users/{user_id}")
+        response = await service_get(auth_service_cb, f"http://auth-service:8000/users/{user_id}")
         return response.status_code == 200
-    except requests.exceptions.RequestException:
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Auth service is temporarily unavailable")
+    except httpx.HTTPError:
         return False
     
 @router.post("/boards", response_model=Board)
 async def create_board_endpoint(board_data: BoardCreate):
     # Перевірка чи існує адміністратор
-    if not verify_user_exists(board_data.admin_user_id):
+    if not await verify_user_exists(board_data.admin_user_id):
         raise HTTPException(status_code=404, detail="Admin user not found")
     
     # Створення дошки
     try:
-        new_board = create_board(
+        new_board = await create_board_async(
             name=board_data.name,
-            admin_user_id=board_data.admin_user_id
+            admin_id=board_data.admin_user_id
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -43,7 +47,7 @@ async def create_board_endpoint(board_data: BoardCreate):
             user_id=board_data.admin_user_id,
             notification_type="board_created",
             subject="board_created",
-            message=f"User {board_data.admin_user_id}, created board with id {new_board.id}"
+            message=f"User {board_data.admin_user_id}, created board with id {new_board['id']}"
         )
     except Exception as e:
         print(f"Failed to publish create board notification: {e}")
@@ -52,7 +56,7 @@ async def create_board_endpoint(board_data: BoardCreate):
 
 @router.get("/boards/users/{user_id}", response_model=List[Board])
 async def get_user_boards(user_id: str):
-    if not verify_user_exists(user_id):
+    if not await verify_user_exists(user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
     boards = find_boards_by_user(user_id)
@@ -60,7 +64,7 @@ async def get_user_boards(user_id: str):
 
 @router.get("/boards/{board_id}", response_model=Board)
 async def get_board(board_id: str):
-    board,index = find_board_by_id(board_id)
+    board = find_board_by_id(board_id)
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
     
@@ -68,7 +72,7 @@ async def get_board(board_id: str):
 
 @router.put("/boards/{board_id}", response_model=Board)
 async def update_board_endpoint(board_id: str, board_data: BoardUpdate):
-    board,index = find_board_by_id(board_id)
+    board = find_board_by_id(board_id)
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
     
@@ -79,16 +83,16 @@ async def update_board_endpoint(board_id: str, board_data: BoardUpdate):
     if board_data.status is not None:
         updates["status"] = board_data.status
     
-    updated_board = update_board(board_id, updates)
+    updated_board = await update_board_async(board_id, updates)
     
     print(f"Board '{board_id}' updated")
 
     try:
         await publish_notification_async(
-            user_id=board.admin_user_id,
+            user_id=board["admin_user_id"],
             notification_type="board_updated",
             subject="board_updated",
-            message=f"Board {board.id}, updated"
+            message=f"Board {board['id']}, updated"
         )
     except Exception as e:
         print(f"Failed to publish update board notification: {e}")
@@ -97,7 +101,7 @@ async def update_board_endpoint(board_id: str, board_data: BoardUpdate):
 
 @router.post("/boards/{board_id}/archive")
 async def archive_board(board_id: str):
-    board,index = find_board_by_id(board_id)
+    board = find_board_by_id(board_id)
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
     
@@ -105,16 +109,16 @@ async def archive_board(board_id: str):
         raise HTTPException(status_code=400, detail="Board already archived")
     
     # Архівуємо дошку
-    update_board(board_id, {"status": BoardStatus.ARCHIVED})
+    await update_board_async(board_id, {"status": BoardStatus.ARCHIVED})
     
     print(f"Board '{board_id}' archived")
 
     try:
         await publish_notification_async(
-            user_id=board.admin_user_id,
+            user_id=board["admin_user_id"],
             notification_type="board_archived",
             subject = "board_archived",
-            message = f"Board {board.id} archived"
+            message = f"Board {board['id']} archived"
         )
     except Exception as e:
         print(f"Failed to publish archive board notification: {e}")
@@ -124,7 +128,7 @@ async def archive_board(board_id: str):
 
 @router.post("/boards/{board_id}/restore")
 async def restore_board(board_id: str):
-    board,index = find_board_by_id(board_id)
+    board = find_board_by_id(board_id)
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
     
@@ -132,16 +136,16 @@ async def restore_board(board_id: str):
         raise HTTPException(status_code=400, detail="Board is not archived")
     
     # Відновлюємо дошку
-    update_board(board_id, {"status": BoardStatus.ACTIVE})
+    await update_board_async(board_id, {"status": BoardStatus.ACTIVE})
     
     print(f"Board '{board_id}' restored from archive")
 
     try:
         await publish_notification_async(
-            user_id=board.admin_user_id,
+            user_id=board["admin_user_id"],
             notification_type="board_restored",
             subject = "board_restored",
-            message = f"Board {board.id} restored"
+            message = f"Board {board['id']} restored"
         )
     except Exception as e:
         print(f"Failed to publish restore board notification: {e}")
@@ -150,21 +154,21 @@ async def restore_board(board_id: str):
 
 @router.delete("/boards/{board_id}")
 async def delete_board(board_id: str):
-    board,index = find_board_by_id(board_id)
+    board = find_board_by_id(board_id)
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
     
     # "М'яке" видалення - міняємо статус
     # update_board(board_id, {"status": BoardStatus.DELETED})
-    del boards_db[index]
+    await remove_board_async(board_id)
     print(f"Board '{board_id}' deleted (soft delete)")
     
     try:
         await publish_notification_async(
-            user_id=board.admin_user_id,
+            user_id=board["admin_user_id"],
             notification_type="board_deleted",
             subject = "board_deleted",
-            message = f"Board {board.id} deleted"
+            message = f"Board {board['id']} deleted"
         )
     except Exception as e:
         print(f"Failed to publish delete board notification: {e}")
@@ -176,11 +180,11 @@ async def delete_board(board_id: str):
 @router.post("/boards/invite")
 async def invite_user_to_board(invite_data: UserInviteRequest):
     # Перевірка чи адміністратор існує
-    if not verify_user_exists(invite_data.admin_user_id):
+    if not await verify_user_exists(invite_data.admin_user_id):
         raise HTTPException(status_code=404, detail="Admin user not found")
     
     # Перевірка чи запрошений користувач існує
-    if not verify_user_exists(invite_data.invited_user_id):
+    if not await verify_user_exists(invite_data.invited_user_id):
         raise HTTPException(status_code=404, detail="Invited user not found")
     
     # Перевірка прав адміністратора
@@ -189,7 +193,7 @@ async def invite_user_to_board(invite_data: UserInviteRequest):
     
     # Додаємо користувача до дошки
     try:
-        updated_board = add_user_to_board(
+        updated_board = await add_user_to_board_async(
             board_id=invite_data.board_id,
             user_id=invite_data.invited_user_id,
             role=UserRole.MEMBER
@@ -214,12 +218,12 @@ async def invite_user_to_board(invite_data: UserInviteRequest):
 @router.post("/boards/join")
 async def join_board(join_data: UserJoinRequest):
     # Перевірка чи користувач існує
-    if not verify_user_exists(join_data.user_id):
+    if not await verify_user_exists(join_data.user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Додаємо користувача до дошки
     try:
-        updated_board = add_user_to_board(
+        updated_board = await add_user_to_board_async(
             board_id=join_data.board_id,
             user_id=join_data.user_id,
             role=UserRole.MEMBER
@@ -249,7 +253,7 @@ async def update_user_role_endpoint(role_data: UserRoleUpdate):
     
     # Оновлюємо роль
     try:
-        updated_board = update_user_role(
+        updated_board = await update_user_role_async(
             board_id=role_data.board_id,
             user_id=role_data.target_user_id,
             new_role=role_data.new_role
@@ -279,7 +283,7 @@ async def remove_user_from_board_endpoint(remove_data: UserRemoveRequest):
     
     # Видаляємо користувача
     try:
-        updated_board = remove_user_from_board(
+        updated_board = await remove_user_from_board_async(
             board_id=remove_data.board_id,
             user_id=remove_data.target_user_id
         )
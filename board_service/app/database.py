@@ -1,49 +1,110 @@
 from datetime import datetime
-import uuid
-from shared.unique_id import generate_unique_id
-from app.api.models import UserRole
+from operator import attrgetter
+import sys
+from shared.unique_id import generate_id
+from shared.repository import MultiIndex
+from shared.storage import open_repository
+from shared.records import Record, from_epoch, intern_value, to_epoch
+from app.api.models import BoardStatus, UserRole
 
-# Тимчасова база даних в пам'яті
-boards_db = []
+def _member(role, joined_at):
+    # None - роль за замовчуванням (MEMBER) і невідомий час приєднання: кортеж не створюється
+    if role is None and joined_at is None:
+        return None
+    return (intern_value(UserRole, role), joined_at)
+
+class BoardRecord(Record):
+    """
+    Дошка. Учасники зберігаються одним dict members: user_id -> None або (роль, час приєднання),
+    а поля users, user_roles і joined_at обчислюються з нього.
+    """
+    __slots__ = ("id", "name", "admin_user_id", "status", "created_at", "updated_at", "members")
+    TIMESTAMPS = frozenset({"created_at", "updated_at"})
+    ENUMS = {"status": BoardStatus}
+    INTERNED = frozenset({"admin_user_id"})
+
+    def keys(self) -> tuple:
+        return ("id", "name", "admin_user_id", "users", "status", "created_at", "updated_at",
+                "user_roles", "joined_at")
+
+    def __getitem__(self, field):
+        if field == "users":
+            return list(self.members)
+        if field == "user_roles":
+            return {u: m[0] for u, m in self.members.items() if m is not None and m[0] is not None}
+        if field == "joined_at":
+            return {u: from_epoch(m[1]) for u, m in self.members.items() if m is not None and m[1] is not None}
+        if field == "members":
+            raise KeyError(field)
+        return super().__getitem__(field)
+
+    def __setitem__(self, field, value):
+        # Кожна зміна створює новий dict members - попередній стан лишається незмінним
+        members = getattr(self, "members", None) or {}
+        if field == "users":
+            value = {sys.intern(u): members.get(u) for u in value}
+        elif field == "user_roles":
+            value = {u: _member(value.get(u), m and m[1]) for u, m in members.items()}
+        elif field == "joined_at":
+            value = {u: _member(m and m[0], to_epoch(value.get(u))) for u, m in members.items()}
+        elif field != "members":
+            return super().__setitem__(field, value)
+        super().__setitem__("members", value)
+
+# База даних сервісу: у пам'яті або в SQLite (STORAGE_BACKEND, див. shared/storage.py)
+boards_db = open_repository("boards", indexes={
+    "admin_user_id": MultiIndex("admin_user_id"),
+    # Дошка індексується за кожним своїм учасником
+    "users": MultiIndex("users", key=attrgetter("members"), each=True),
+})
 BOARD_LIMIT_PER_USER = 10  # Ліміт дошок на користувача
 
-def create_board(name:str, admin_id:str):
-    user_boards = [ b for b in boards_db if b["admin_user_id"] == admin_id]
-    if len(user_boards) >= BOARD_LIMIT_PER_USER:
+def _new_board(name: str, admin_id: str) -> BoardRecord:
+    if boards_db.count("admin_user_id", admin_id) >= BOARD_LIMIT_PER_USER:
         raise Exception("Board limit reached")
     
-    board_id = generate_unique_id(boards_db)
-
-    board = {
-        "id":board_id,
-        "name": name,
-        "admin_user_id": admin_id,
-        "users": [admin_id],  
-        "status": "active",
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
+    board_id = generate_id()
 
-    boards_db.append(board)
+    board = BoardRecord(
+        id=board_id,
+        name=name,
+        admin_user_id=admin_id,
+        users=[admin_id],
+        status=BoardStatus.ACTIVE,
+        created_at=datetime.now(),
+        updated_at=datetime.now()
+    )
     return board
 
+def create_board(name:str, admin_id:str):
+    return boards_db.insert(_new_board(name, admin_id))
+
+async def create_board_async(name: str, admin_id: str):
+    """Як create_board, але без блокування event loop на час запису (для бекенду sqlite)"""
+    return await boards_db.insert_async(_new_board(name, admin_id))
+
 def find_board_by_id(board_id: str):
-    for index, board in enumerate(boards_db):
-        if board["id"] == board_id:
-            return board,index
-    return None,-1
+    return boards_db.get(board_id)
 
 def find_boards_by_user(user_id: str):
-    return [b for b in boards_db if user_id in b["users"]]
+    return boards_db.find("users", user_id)
+
+def _board_changes(updates: dict) -> dict:
+    changes = {key: value for key, value in updates.items() if value is not None}
+    changes["updated_at"] = datetime.now()
+    return changes
 
 def update_board(board_id:str,updates:dict):
-    board = find_board_by_id(board_id)
-    if board:
-        for key,value in updates.items():
-            if value is not None:
-                board[key] = value
-            board["updated_at"] = datetime.now()
-    return board
+    return boards_db.update(board_id, _board_changes(updates))
+
+async def update_board_async(board_id: str, updates: dict):
+    return await boards_db.update_async(board_id, _board_changes(updates))
+
+def remove_board(board_id: str):
+    return boards_db.delete(board_id)
+
+async def remove_board_async(board_id: str):
+    return await boards_db.delete_async(board_id)
 
 
 
@@ -56,8 +117,7 @@ def is_user_admin(board_id: str, user_id: str) -> bool:
         return False
     return board["admin_user_id"] == user_id
 
-def add_user_to_board(board_id: str, user_id: str, role: UserRole = UserRole.MEMBER):
-    """Додає користувача до дошки"""
+def _user_added(board_id: str, user_id: str, role: UserRole) -> dict:
     board = find_board_by_id(board_id)
     if not board:
         raise Exception("Board not found")
@@ -70,24 +130,23 @@ def add_user_to_board(board_id: str, user_id: str, role: UserRole = UserRole.MEM
     if user_id in board["users"]:
         raise Exception("User already on board")
     
-    # Додаємо користувача
-    board["users"].append(user_id)
-    
-    # Зберігаємо роль (в реальному додатку - окрема таблиця)
-    if "user_roles" not in board:
-        board["user_roles"] = {}
-    board["user_roles"][user_id] = role
-    
-    # Додаємо час приєднання
-    if "joined_at" not in board:
-        board["joined_at"] = {}
-    board["joined_at"][user_id] = datetime.now()
-    
-    board["updated_at"] = datetime.now()
-    return board
+    # Роль і час приєднання (в реальному додатку - окрема таблиця)
+    now = datetime.now()
+    return {
+        "users": board["users"] + [user_id],
+        "user_roles": {**board.get("user_roles", {}), user_id: role},
+        "joined_at": {**board.get("joined_at", {}), user_id: now},
+        "updated_at": now,
+    }
 
-def remove_user_from_board(board_id: str, user_id: str):
-    """Видаляє користувача з дошки"""
+def add_user_to_board(board_id: str, user_id: str, role: UserRole = UserRole.MEMBER):
+    """Додає користувача до дошки"""
+    return boards_db.update(board_id, _user_added(board_id, user_id, role))
+
+async def add_user_to_board_async(board_id: str, user_id: str, role: UserRole = UserRole.MEMBER):
+    return await boards_db.update_async(board_id, _user_added(board_id, user_id, role))
+
+def _user_removed(board_id: str, user_id: str) -> dict:
     board = find_board_by_id(board_id)
     if not board:
         raise Exception("Board not found")
@@ -99,20 +158,22 @@ def remove_user_from_board(board_id: str, user_id: str):
     if board["admin_user_id"] == user_id:
         raise Exception("Cannot remove board admin")
     
-    # Видаляємо користувача
-    board["users"].remove(user_id)
-    
-    # Видаляємо додаткові дані
-    if "user_roles" in board and user_id in board["user_roles"]:
-        del board["user_roles"][user_id]
-    if "joined_at" in board and user_id in board["joined_at"]:
-        del board["joined_at"][user_id]
-    
-    board["updated_at"] = datetime.now()
-    return board
+    # Видаляємо користувача разом з додатковими даними
+    return {
+        "users": [u for u in board["users"] if u != user_id],
+        "user_roles": {u: r for u, r in board.get("user_roles", {}).items() if u != user_id},
+        "joined_at": {u: t for u, t in board.get("joined_at", {}).items() if u != user_id},
+        "updated_at": datetime.now(),
+    }
 
-def update_user_role(board_id: str, user_id: str, new_role: UserRole):
-    """Оновлює роль користувача на дошці"""
+def remove_user_from_board(board_id: str, user_id: str):
+    """Видаляє користувача з дошки"""
+    return boards_db.update(board_id, _user_removed(board_id, user_id))
+
+async def remove_user_from_board_async(board_id: str, user_id: str):
+    return await boards_db.update_async(board_id, _user_removed(board_id, user_id))
+
+def _role_changed(board_id: str, user_id: str, new_role: UserRole) -> dict:
     board = find_board_by_id(board_id)
     if not board:
         raise Exception("Board not found")
@@ -120,12 +181,17 @@ def update_user_role(board_id: str, user_id: str, new_role: UserRole):
     if user_id not in board["users"]:
         raise Exception("User not on board")
     
-    if "user_roles" not in board:
-        board["user_roles"] = {}
-    
-    board["user_roles"][user_id] = new_role
-    board["updated_at"] = datetime.now()
-    return board
+    return {
+        "user_roles": {**board.get("user_roles", {}), user_id: new_role},
+        "updated_at": datetime.now(),
+    }
+
+def update_user_role(board_id: str, user_id: str, new_role: UserRole):
+    """Оновлює роль користувача на дошці"""
+    return boards_db.update(board_id, _role_changed(board_id, user_id, new_role))
+
+async def update_user_role_async(board_id: str, user_id: str, new_role: UserRole):
+    return await boards_db.update_async(board_id, _role_changed(board_id, user_id, new_role))
 
 def get_board_users(board_id: str):
     """Повертає список користувачів дошки з ролями"""
@@ -0,0 +1,51 @@
+import asyncio
+import json
+from typing import Any
+from urllib.parse import urlsplit, parse_qsl
+from fastapi import HTTPException
+from pydantic import BaseModel
+from proxy import BufferedResponse
+
+BATCH_METHODS = frozenset({"GET", "POST", "PUT", "DELETE"})
+
+
+class BatchItem(BaseModel):
+    """Один підзапит: шлях у форматі gateway, наприклад /board/boards/1?x=1"""
+    id: str | None = None
+    method: str = "GET"
+    path: str
+    body: Any = None
+
+
+def split_path(path: str) -> tuple[str, str, list[tuple[str, str]]]:
+    """/board/boards/1?x=1 -> ("board", "boards/1", [("x", "1")])"""
+    parts = urlsplit(path)
+    service, _, rest = parts.path.strip("/").partition("/")
+    return service, rest, parse_qsl(parts.query, keep_blank_values=True)
+
+
+def decode_body(response: BufferedResponse):
+    """JSON-тіло повертаємо як об'єкт, інше - як текст"""
+    if not response.body:
+        return None
+    try:
+        return json.loads(response.body)
+    except ValueError:
+        return response.body.decode("utf-8", errors="replace")
+
+
+async def run_batch(items: list[BatchItem], handler, concurrency: int) -> list[dict]:
+    """Виконує підзапити одночасно (не більше concurrency за раз), зберігаючи порядок.
+    Помилка одного підзапиту не впливає на інші."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: BatchItem) -> dict:
+        async with semaphore:
+            try:
+                response = await handler(item)
+                status, body = response.status_code, decode_body(response)
+            except HTTPException as e:
+                status, body = e.status_code, {"detail": e.detail}
+        return {"id": item.id, "status": status, "body": body}
+
+    return await asyncio.gather(*(run(item) for item in items))
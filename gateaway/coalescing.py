@@ -0,0 +1,48 @@
+import asyncio
+from monitoring import COALESCED_REQUESTS
+from routing import RouteMatch
+
+
+class SingleFlight:
+    """
+    Об'єднує однакові одночасні запити: перший (лідер) виконує запит до upstream,
+    решта чекають на його результат замість власного запиту.
+    """
+
+    def __init__(self):
+        self._inflight: dict[tuple, asyncio.Task] = {}
+
+    async def do(self, key: tuple, func, service: str):
+        task = self._inflight.get(key)
+        if task is not None:
+            COALESCED_REQUESTS.labels(service=service, role="follower").inc()
+        else:
+            COALESCED_REQUESTS.labels(service=service, role="leader").inc()
+            # Окрема задача: відключення клієнта-лідера не скасовує запит для інших
+            task = asyncio.create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # позначаємо виняток як оброблений
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+def coalesce_key(match: RouteMatch, method: str, path: str, query, identity: str | None) -> tuple:
+    """Ключ: метод, шлях, query і клас авторизації.
+    query - пари (ключ, значення) рядка запиту.
+    Клас авторизації - scope маршруту (усі, хто його має, отримують однакову відповідь),
+    або конкретний користувач для маршрутів з cache_per_user."""
+    normalized = f"/{match.service}/" + "/".join(s for s in path.split("/") if s)
+    query = tuple(sorted(query))
+    if match.options.get("cache_per_user"):
+        auth_class = ("user", identity)
+    else:
+        auth_class = ("scope", match.scope)
+    return (method, normalized, query, auth_class)
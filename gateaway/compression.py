@@ -0,0 +1,172 @@
+import asyncio
+import time
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from monitoring import COMPRESSION_BYTES, COMPRESSION_CPU_SECONDS
+
+try:
+    import brotli  # опційно: pip install brotli
+except ImportError:
+    brotli = None
+
+# Типи, які варто стискати (JSON, текст); бінарні формати вже стиснуті
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "text/")
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Вибирає кодування з Accept-Encoding з урахуванням q (br має пріоритет за рівних q)"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "").lower()
+    if "content-encoding" in headers or content_type.startswith("text/event-stream"):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+class _Compressor:
+    """Потоковий компресор; рахує байти та процесорний час (thread_time потоку, де працює)"""
+
+    def __init__(self, encoding: str, level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._finish = self._obj.process, self._obj.finish
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+
+    def _run(self, func, *args) -> bytes:
+        started = time.thread_time()
+        data = func(*args)
+        COMPRESSION_CPU_SECONDS.labels(encoding=self.encoding).observe(time.thread_time() - started)
+        return data
+
+    async def compress(self, chunk: bytes, offload_size: int) -> bytes:
+        COMPRESSION_BYTES.labels(encoding=self.encoding, direction="in").inc(len(chunk))
+        if len(chunk) >= offload_size:
+            # Великі частини стискаємо в пулі потоків, щоб не блокувати event loop
+            data = await asyncio.to_thread(self._run, self._compress, chunk)
+        else:
+            data = self._run(self._compress, chunk)
+        COMPRESSION_BYTES.labels(encoding=self.encoding, direction="out").inc(len(data))
+        return data
+
+    def finish(self) -> bytes:
+        data = self._run(self._finish)
+        COMPRESSION_BYTES.labels(encoding=self.encoding, direction="out").inc(len(data))
+        return data
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: стискає відповіді gzip або brotli відповідно до Accept-Encoding.
+    Відповідь, передана одним шматком, стискається повністю, якщо вона не менша за minimum_size.
+    Потокова відповідь стискається частинами в міру надходження, без буферизації.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6,
+                 brotli_quality: int = 4, offload_size: int = 64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.offload_size = offload_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _CompressingSend(self, send, encoding))
+
+
+class _CompressingSend:
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.start_message = None
+        self.compressor: _Compressor | None = None
+        # None - ще не вирішено, False - передаємо як є
+        self.active = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            length = headers.get("content-length")
+            if (message["status"] in (204, 304) or not _compressible(headers)
+                    or (length is not None and length.isdigit() and int(length) < self.middleware.minimum_size)):
+                self.active = False
+                await self.send(message)
+            else:
+                # Заголовки відправимо разом з першою частиною тіла, коли стане зрозуміло, чи стискати
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.active is False:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.active is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.active = False
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.active = True
+            self.compressor = _Compressor(self.encoding, self.middleware.level, self.middleware.brotli_quality)
+            await self._send_start(body, more_body)
+            return
+
+        await self._send_body(body, more_body)
+
+    async def _send_start(self, body: bytes, more_body: bool):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # Стиснене представлення відрізняється побайтово, тому ETag стає слабким
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["etag"] = "W/" + etag
+
+        if not more_body:
+            data = await self.compressor.compress(body, self.middleware.offload_size) + self.compressor.finish()
+            headers["content-length"] = str(len(data))
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": data})
+        else:
+            # Довжина стисненого потоку наперед невідома
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self.send(self.start_message)
+            await self._send_body(body, True)
+
+    async def _send_body(self, body: bytes, more_body: bool):
+        data = await self.compressor.compress(body, self.middleware.offload_size) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,129 @@
+import asyncio
+import math
+import time
+from collections import deque
+from monitoring import UPSTREAM_CONCURRENCY_LIMIT, UPSTREAM_QUEUED, UPSTREAM_SHED
+
+
+class LimitExceeded(Exception):
+    """Запит відкинуто limiter'ом: upstream перевантажений"""
+    def __init__(self, service: str, reason: str):
+        super().__init__(f"Service '{service}' is overloaded ({reason})")
+        self.service = service
+        self.reason = reason
+
+
+class AdaptiveLimiter:
+    """
+    Адаптивний ліміт одночасних запитів до upstream (градієнтний алгоритм).
+    Довготривала EWMA затримки - базовий рівень; якщо поточна затримка зростає,
+    ліміт зменшується пропорційно (gradient), інакше поволі росте (+sqrt(limit)).
+    Помилки та таймаути зменшують ліміт мультиплікативно (AIMD).
+    Запити понад ліміт чекають в обмеженій черзі; ті, що не встигнуть до дедлайну,
+    відкидаються одразу. Усе виконується в event loop без await між перевіркою і зміною стану.
+    """
+
+    def __init__(self, service: str, initial_limit: int, min_limit: int, max_limit: int,
+                 queue_size: int, queue_timeout: float, tolerance: float = 2.0,
+                 smoothing: float = 0.2, long_window: int = 100, backoff: float = 0.9):
+        self.service = service
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.long_alpha = 1.0 / long_window
+        self.backoff = backoff
+        self.in_flight = 0
+        self.rtt_long = 0.0
+        # Черга очікування: (future, дедлайн)
+        self._queue: deque[tuple[asyncio.Future, float]] = deque()
+        self._export()
+
+    async def acquire(self, deadline: float | None = None):
+        """Займає слот або чекає в черзі (не довше queue_timeout); інакше кидає LimitExceeded.
+        deadline - момент (time.monotonic), після якого відповідь уже не потрібна."""
+        if self.in_flight < int(self.limit) and not self._queue:
+            self.in_flight += 1
+            return
+
+        if len(self._queue) >= self.queue_size:
+            self._shed("queue_full")
+
+        now = time.monotonic()
+        deadline = deadline or math.inf
+        # Якщо до дедлайну не встигнемо навіть за типової затримки - не займаємо місце в черзі
+        if deadline - now < self.rtt_long:
+            self._shed("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, deadline)
+        self._queue.append(entry)
+        self._export()
+        try:
+            await asyncio.wait_for(waiter, min(self.queue_timeout, deadline - now))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Слот вже виділено, але запит скасовано - повертаємо слот
+                self._release_slot()
+            else:
+                self._remove(entry)
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed("queue_timeout")
+            raise
+        finally:
+            self._export()
+
+    def release(self, latency: float | None, failed: bool = False):
+        """Звільняє слот і коригує ліміт за затримкою (latency=None - без виміру)"""
+        if failed:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif latency is not None:
+            self._update(latency)
+        self._release_slot()
+        self._export()
+
+    def _update(self, rtt: float):
+        if self.rtt_long == 0.0:
+            self.rtt_long = rtt
+        else:
+            self.rtt_long += self.long_alpha * (rtt - self.rtt_long)
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.rtt_long / rtt)) if rtt > 0 else 1.0
+        # Не збільшуємо ліміт, якщо його й так не використовують повністю
+        if gradient == 1.0 and self.in_flight < self.limit / 2:
+            return
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        now = time.monotonic()
+        while self._queue and self.in_flight < int(self.limit):
+            waiter, deadline = self._queue.popleft()
+            if waiter.done():
+                continue
+            if deadline - now < self.rtt_long:
+                # Запит уже не встигне - відповідаємо 503 одразу, а слот віддаємо наступному
+                waiter.set_exception(LimitExceeded(self.service, "deadline"))
+                UPSTREAM_SHED.labels(service=self.service, reason="deadline").inc()
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _remove(self, entry):
+        try:
+            self._queue.remove(entry)
+        except ValueError:
+            pass
+
+    def _shed(self, reason: str):
+        UPSTREAM_SHED.labels(service=self.service, reason=reason).inc()
+        raise LimitExceeded(self.service, reason)
+
+    def _export(self):
+        UPSTREAM_CONCURRENCY_LIMIT.labels(service=self.service).set(int(self.limit))
+        UPSTREAM_QUEUED.labels(service=self.service).set(len(self._queue))
@@ -0,0 +1,141 @@
+import os
+
+# Конфігурація сервісів: одна адреса або список адрес реплік, наприклад
+#   "task": ["http://task-service-1:8000", "http://task-service-2:8000"]
+# Сервіс на тому ж хості можна підключити через Unix-сокет (сервіс запущено з UVICORN_UDS):
+#   "auth": "unix:/run/services/auth.sock"
+SERVICE_URLS = {
+    "auth": "http://auth-service:8000",
+    "subscription": "http://subscription-service:8000",
+    "board": "http://board-service:8000",
+    "task": "http://task-service:8000",
+    "notification": "http://notification-service:8000",
+}
+
+# Налаштування пулу з'єднань до upstream за замовчуванням - змінні оточення нижче.
+# Для окремого сервісу: GATEWAY_POOL_<СЕРВІС>_<ПАРАМЕТР>, де ПАРАМЕТР - ключ словника
+# у верхньому регістрі, напр. GATEWAY_POOL_AUTH_READ_TIMEOUT=10, GATEWAY_POOL_TASK_HTTP2=true.
+DEFAULT_POOL_SETTINGS = {
+    "max_connections": int(os.getenv("GATEWAY_POOL_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("GATEWAY_POOL_MAX_KEEPALIVE", "20")),
+    "keepalive_expiry": float(os.getenv("GATEWAY_POOL_KEEPALIVE_EXPIRY", "30")),
+    "http2": os.getenv("GATEWAY_POOL_HTTP2", "false").lower() == "true",
+    "connect_timeout": float(os.getenv("GATEWAY_POOL_CONNECT_TIMEOUT", "3")),
+    "read_timeout": float(os.getenv("GATEWAY_POOL_READ_TIMEOUT", "30")),
+    "write_timeout": float(os.getenv("GATEWAY_POOL_WRITE_TIMEOUT", "30")),
+    "pool_timeout": float(os.getenv("GATEWAY_POOL_ACQUIRE_TIMEOUT", "5")),
+}
+
+# Перевизначення для окремих сервісів (ключ - запис у SERVICE_URLS)
+POOL_SETTINGS = {
+    "auth": {"read_timeout": 10.0},
+    "notification": {"max_connections": 50},
+}
+
+
+def _env_pool_overrides(service: str) -> dict:
+    overrides = {}
+    for key, default in DEFAULT_POOL_SETTINGS.items():
+        value = os.getenv(f"GATEWAY_POOL_{service.upper()}_{key.upper()}")
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            overrides[key] = value.lower() == "true"
+        else:
+            overrides[key] = type(default)(value)
+    return overrides
+
+
+for _service in SERVICE_URLS:
+    _overrides = _env_pool_overrides(_service)
+    if _overrides:
+        POOL_SETTINGS[_service] = {**POOL_SETTINGS.get(_service, {}), **_overrides}
+
+# Активна перевірка реплік: GET <path> кожні interval секунд.
+# Після unhealthy_threshold невдач репліка виключається з балансування,
+# після healthy_threshold успіхів - повертається.
+HEALTH_CHECK_SETTINGS = {
+    "enabled": os.getenv("GATEWAY_HEALTH_CHECK_ENABLED", "true").lower() == "true",
+    "path": "/health",
+    "interval": float(os.getenv("GATEWAY_HEALTH_CHECK_INTERVAL", "5")),
+    "timeout": float(os.getenv("GATEWAY_HEALTH_CHECK_TIMEOUT", "2")),
+    "unhealthy_threshold": 3,
+    "healthy_threshold": 2,
+}
+
+# Circuit breaker для кожного upstream: відкривається, коли частка помилок
+# (мережеві збої, таймаути, 5xx) за window_seconds досягає failure_rate_threshold
+# і викликів було не менше minimum_calls. Через recovery_timeout пропускається
+# не більше half_open_max_calls пробних запитів.
+CIRCUIT_BREAKER_SETTINGS = {
+    "failure_rate_threshold": float(os.getenv("GATEWAY_CB_FAILURE_RATE", "0.5")),
+    "window_seconds": int(os.getenv("GATEWAY_CB_WINDOW", "30")),
+    "minimum_calls": int(os.getenv("GATEWAY_CB_MINIMUM_CALLS", "20")),
+    "recovery_timeout": float(os.getenv("GATEWAY_CB_RECOVERY_TIMEOUT", "15")),
+    "half_open_max_calls": int(os.getenv("GATEWAY_CB_HALF_OPEN_CALLS", "3")),
+}
+
+# Адаптивний ліміт одночасних запитів до кожного upstream.
+# Ліміт змінюється між min_limit і max_connections пулу залежно від затримки;
+# запити понад ліміт чекають у черзі (queue_size, не довше queue_timeout секунд),
+# решта одразу отримують 503.
+CONCURRENCY_LIMIT_SETTINGS = {
+    "enabled": os.getenv("GATEWAY_CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true",
+    "initial_limit": int(os.getenv("GATEWAY_CONCURRENCY_INITIAL_LIMIT", "20")),
+    "min_limit": int(os.getenv("GATEWAY_CONCURRENCY_MIN_LIMIT", "4")),
+    "queue_size": int(os.getenv("GATEWAY_CONCURRENCY_QUEUE_SIZE", "50")),
+    "queue_timeout": float(os.getenv("GATEWAY_CONCURRENCY_QUEUE_TIMEOUT", "1")),
+    "tolerance": float(os.getenv("GATEWAY_CONCURRENCY_TOLERANCE", "2")),
+}
+
+# Потокове проксування: тіла запитів і відповідей не буферизуються в gateway
+STREAMING_PROXY = os.getenv("GATEWAY_STREAMING_PROXY", "true").lower() == "true"
+
+# Максимальний розмір тіла запиту від клієнта (байти)
+MAX_REQUEST_BODY_SIZE = int(os.getenv("GATEWAY_MAX_REQUEST_BODY_SIZE", str(10 * 1024 * 1024)))
+
+# Кеш JWKS: період фонового оновлення та мінімальний інтервал примусового оновлення (секунди)
+JWKS_TTL = float(os.getenv("GATEWAY_JWKS_TTL", "300"))
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("GATEWAY_JWKS_MIN_REFRESH_INTERVAL", "10"))
+
+# Кеш перевірених JWT: максимум записів і максимальний час життя запису (секунди)
+TOKEN_CACHE_SIZE = int(os.getenv("GATEWAY_TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL = float(os.getenv("GATEWAY_TOKEN_CACHE_MAX_TTL", "300"))
+
+# Кеш відповідей на GET: загальний обсяг і максимальний розмір одного запису (байти)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("GATEWAY_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("GATEWAY_RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+# Обмеження частоти: максимальна кількість кошиків token bucket у пам'яті
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("GATEWAY_RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+# POST /batch: максимум підзапитів в одному пакеті та скільки з них виконується одночасно
+BATCH_MAX_ITEMS = int(os.getenv("GATEWAY_BATCH_MAX_ITEMS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("GATEWAY_BATCH_CONCURRENCY", "10"))
+
+# Агреговані представлення: таймаут кожного запиту до сервісу (секунди)
+# і скільки користувачів запитується з auth одночасно
+VIEW_PART_TIMEOUT = float(os.getenv("GATEWAY_VIEW_PART_TIMEOUT", "2"))
+VIEW_USER_CONCURRENCY = int(os.getenv("GATEWAY_VIEW_USER_CONCURRENCY", "10"))
+
+# Заголовок Server-Timing з тривалістю фаз запиту (для налагодження)
+SERVER_TIMING = os.getenv("GATEWAY_SERVER_TIMING", "false").lower() == "true"
+
+# Бюджет повторів: частка від усіх запитів до upstream і мінімум повторів за секунду
+RETRY_BUDGET_RATIO = float(os.getenv("GATEWAY_RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("GATEWAY_RETRY_BUDGET_MIN_PER_SECOND", "5"))
+# Затримка hedge, поки для маршруту ще недостатньо вимірів (секунди)
+HEDGE_DEFAULT_DELAY = float(os.getenv("GATEWAY_HEDGE_DEFAULT_DELAY", "0.1"))
+
+# Стиснення відповідей: мінімальний розмір тіла (байти), рівні стиснення gzip/brotli
+# і розмір частини, з якого стиснення виконується поза event loop
+COMPRESSION_ENABLED = os.getenv("GATEWAY_COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("GATEWAY_COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("GATEWAY_COMPRESSION_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("GATEWAY_BROTLI_QUALITY", "4"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("GATEWAY_COMPRESSION_OFFLOAD_SIZE", str(64 * 1024)))
+
+# WebSocket і SSE: максимум одночасних з'єднань на gateway
+# і скільки секунд з'єднання може бути без повідомлень
+PUSH_MAX_CONNECTIONS = int(os.getenv("GATEWAY_PUSH_MAX_CONNECTIONS", "1000"))
+PUSH_IDLE_TIMEOUT = float(os.getenv("GATEWAY_PUSH_IDLE_TIMEOUT", "300"))
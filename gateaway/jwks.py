@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+import httpx
+from jose import jwk
+from monitoring import JWKS_REFRESHES
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSUnavailable(Exception):
+    pass
+
+
+class JWKSCache:
+    """
+    Кеш публічних ключів Keycloak (JWKS).
+    Ключі індексуються за kid і розбираються в об'єкти один раз при завантаженні.
+    Одночасні промахи чекають на один спільний запит (single-flight),
+    а примусове оновлення через невідомий kid обмежене за частотою.
+    """
+
+    def __init__(self, openid_config_url: str, ttl: float = 300.0,
+                 min_refresh_interval: float = 10.0, timeout: float = 5.0):
+        self.openid_config_url = openid_config_url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.jwks_uri = None
+        # kid -> (jose Key, алгоритм)
+        self.keys = {}
+        # Ключ для токенів без kid (як і раніше - перший ключ у JWKS)
+        self.default_key = None
+        self.fetched_at = None
+        self._last_forced = float("-inf")
+        self._inflight: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            await self.refresh()
+        except JWKSUnavailable as e:
+            # Gateway стартує і без Keycloak, ключі підтягнуться при першому запиті
+            logger.warning(f"Initial JWKS fetch failed: {e}")
+        except Exception:
+            logger.exception("Initial JWKS fetch failed unexpectedly")
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def _refresh_loop(self):
+        """Фонове оновлення ключів кожні ttl секунд"""
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                await self.refresh()
+            except JWKSUnavailable as e:
+                logger.warning(f"Background JWKS refresh failed, keeping old keys: {e}")
+            except Exception:
+                # Напр. TypeError з некоректного JWKS - цикл не має зупинятися, інакше ключі
+                # оновлюватимуться лише при промаху kid
+                logger.exception("Background JWKS refresh failed unexpectedly, keeping old keys")
+
+    async def refresh(self):
+        """Завантажує JWKS; одночасні виклики чекають на той самий запит"""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(self._clear_inflight)
+        # shield: скасування одного з клієнтів не скасовує спільний запит
+        await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, task: asyncio.Task):
+        self._inflight = None
+        if not task.cancelled():
+            task.exception()  # позначаємо виняток як оброблений
+
+    async def _fetch(self):
+        try:
+            if not self.jwks_uri:
+                response = await self._client.get(self.openid_config_url)
+                response.raise_for_status()
+                self.jwks_uri = response.json()["jwks_uri"]
+
+            response = await self._client.get(self.jwks_uri)
+            response.raise_for_status()
+            jwks = response.json()
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            JWKS_REFRESHES.labels(outcome="error").inc()
+            raise JWKSUnavailable(str(e))
+
+        keys = {}
+        default_key = None
+        for key_data in jwks.get("keys", []):
+            if key_data.get("use", "sig") != "sig":
+                continue
+            algorithm = key_data.get("alg", "RS256")
+            try:
+                parsed = (jwk.construct(key_data, algorithm), algorithm)
+            except Exception as e:
+                logger.warning(f"Skipping JWK {key_data.get('kid')}: {e}")
+                continue
+            if default_key is None:
+                default_key = parsed
+            if "kid" in key_data:
+                keys[key_data["kid"]] = parsed
+
+        # Замінюємо набір ключів цілком, щоб читачі не бачили проміжного стану
+        self.keys = keys
+        self.default_key = default_key
+        self.fetched_at = time.monotonic()
+        JWKS_REFRESHES.labels(outcome="ok").inc()
+        logger.info(f"JWKS refreshed: {len(keys)} signing key(s)")
+
+    async def get_key(self, kid: str | None):
+        """Повертає (Key, алгоритм) для kid або None, якщо такого ключа немає"""
+        if self.default_key is None:
+            # Холодний старт: усі запити чекають на одне завантаження
+            await self.refresh()
+
+        if kid is None:
+            return self.default_key
+
+        key = self.keys.get(kid)
+        if key is None:
+            # Невідомий kid - можливо, Keycloak ротував ключі
+            now = time.monotonic()
+            if now - self._last_forced >= self.min_refresh_interval:
+                self._last_forced = now
+                await self.refresh()
+                key = self.keys.get(kid)
+        return key
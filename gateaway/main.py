@@ -1,9 +1,36 @@
-from fastapi import FastAPI, HTTPException, Response, Request,Header,Depends
+from fastapi import FastAPI, HTTPException, Response, Request,Header,Depends, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import requests
 import httpx
 import uvicorn
+import logging
+import json
+import time
+from urllib.parse import urlencode
 from jose import jwt, JWTError
+from config import (SERVICE_URLS, JWKS_TTL, JWKS_MIN_REFRESH_INTERVAL, TOKEN_CACHE_SIZE, TOKEN_CACHE_MAX_TTL,
+                    RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES, RATE_LIMIT_MAX_BUCKETS,
+                    BATCH_MAX_ITEMS, BATCH_CONCURRENCY, VIEW_PART_TIMEOUT, VIEW_USER_CONCURRENCY,
+                    SERVER_TIMING, COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL,
+                    BROTLI_QUALITY, COMPRESSION_OFFLOAD_SIZE, PUSH_MAX_CONNECTIONS, PUSH_IDLE_TIMEOUT)
+from jwks import JWKSCache, JWKSUnavailable
+from token_cache import TokenCache, VerifiedToken
+from routing import build_router
+from response_cache import ResponseCache, MUTATING_METHODS, serve_cached, purge_prefixes
+from coalescing import SingleFlight, coalesce_key
+from rate_limit import RateLimiter, enforce_rate_limit
+from batch import BatchItem, BATCH_METHODS, split_path, run_batch
+from views import board_view
+import timing
+from compression import CompressionMiddleware
+from push import PushConnections, proxy_sse, proxy_websocket
+from upstream import open_pools, close_pools, get_pool
+from proxy import forward, fetch, filter_hop_by_hop
+from monitoring import metrics_endpoint, BATCH_ITEMS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 #trafic
 
@@ -12,19 +39,50 @@ ISSUER_URL = "http://localhost:8080/realms/KpiRealm"
 
 OPENID_CONFIG_URL = f"{KEYCLOAK_URL}/.well-known/openid-configuration"
 
-JWKS_URL = "" # Буде заповнено після першого запиту
-PUBLIC_KEY = "" # Публічний ключ для перевірк
 CLIENT_ID = "web-client"
 
-# Список шляхів, які НЕ вимагають JWT для доступу
+# Кеш публічних ключів (JWKS), оновлюється у фоні
+jwks_cache = JWKSCache(
+    OPENID_CONFIG_URL,
+    ttl=JWKS_TTL,
+    min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL,
+)
+
+# Кеш уже перевірених токенів, щоб не перевіряти RS256-підпис на кожен запит
+token_cache = TokenCache(max_size=TOKEN_CACHE_SIZE, max_ttl=TOKEN_CACHE_MAX_TTL)
+
+# Кеш відповідей на GET для маршрутів з cache_ttl
+response_cache = ResponseCache(max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entry_bytes=RESPONSE_CACHE_MAX_ENTRY_BYTES)
+
+# Об'єднання однакових одночасних GET до upstream (маршрути з coalesce)
+upstream_flight = SingleFlight()
+
+# Token bucket для маршрутів з rate_limit
+rate_limiter = RateLimiter(max_buckets=RATE_LIMIT_MAX_BUCKETS)
+
+# Довготривалі з'єднання (WebSocket, SSE): спільний ліміт і таймаут тиші
+push_connections = PushConnections(max_connections=PUSH_MAX_CONNECTIONS, idle_timeout=PUSH_IDLE_TIMEOUT)
+
+# Список шляхів, які НЕ вимагають JWT для доступу (шаблони, збіг за сегментами)
 UNPROTECTED_PATHS = [
     "/auth/login",
     "/auth/callback",
-    "/health", 
+    "/{service}/health",
     "/auth/metrics"
 ]
 
-app = FastAPI(title="API Gateway")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Пули з'єднань живуть весь час роботи gateway (keep-alive до сервісів)
+    open_pools()
+    await jwks_cache.start()
+
+    yield
+
+    await jwks_cache.stop()
+    await close_pools()
+
+app = FastAPI(title="API Gateway", lifespan=lifespan)
 
 origins = [
     "https://cad.kpi.ua", # Дозволений сайт кафедри
@@ -40,41 +98,63 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "Accept"], 
 )
 
+# Стиснення відповідей (gzip, brotli якщо встановлено) за Accept-Encoding клієнта
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        level=COMPRESSION_LEVEL,
+        brotli_quality=BROTLI_QUALITY,
+        offload_size=COMPRESSION_OFFLOAD_SIZE,
+    )
+
 # Карта: (Назва_Сервісу, HTTP_Метод, URL_Шлях_Шаблон) : Required_Scope
+# Шаблон може містити параметри: "users/{user_id}"
+# Замість рядка можна вказати словник з налаштуваннями маршруту:
+#   cache_ttl      - кешувати GET на вказану кількість секунд
+#   cache_per_user - додавати користувача (sub) до ключа кешу
+#   cache_purge    - префікси, які очищуються при зміні ресурсу
+#   coalesce       - однакові одночасні GET ділять один запит до upstream
+#   rate_limit     - {"rate": токенів/с, "burst": місткість, "key": "sub" | "ip" | "scope"}
+#   retries        - скільки разів повторити GET на іншу репліку при помилці з'єднання
+#   hedge          - для GET: {"delay": секунди} або {"percentile": 95} - другий запит
+#                    на іншу репліку, якщо перший не відповів за цей час
+#   sse            - GET з Accept: text/event-stream проксується як потік подій без таймауту читання
+#   websocket      - дозволити WebSocket за цим шляхом (токен - у заголовку або ?access_token=)
 AUTHORIZATION_MAP = {
     # АВТЕНТИФІКОВАНЕ ЧИТАННЯ (GET /auth/users)
-    ("auth", "GET", "users"): "user:read",
+    ("auth", "GET", "users"): {"scope": "user:read", "rate_limit": {"rate": 5, "burst": 10, "key": "sub"}},
+    ("auth", "GET", "users/{user_id}"): {"scope": "user:read", "cache_ttl": 30, "coalesce": True},
     
     # СТВОРЕННЯ (POST /auth/users)
-    ("auth", "POST", "users"): "add:user",
+    ("auth", "POST", "users"): {"scope": "add:user", "rate_limit": {"rate": 1, "burst": 5, "key": "sub"}},
 
     # ВИДАЛЕННЯ (DELETE /auth/users/{id})
-    # ("auth", "DELETE", "users/"): "user:delete", #
+    # ("auth", "DELETE", "users/{user_id}"): "user:delete", #
 
-}
+    # ДОШКИ
+    ("board", "GET", "boards/{board_id}"): {"scope": "board:read", "cache_ttl": 10, "coalesce": True,
+                                            "retries": 1, "hedge": {"percentile": 95}},
+    ("board", "POST", "boards"): "board:write",
+    ("board", "PUT", "boards/{board_id}"): "board:write",
 
-# Отримання JWKS (публічних ключів)
-async def fetch_public_key():
-    global JWKS_URL, PUBLIC_KEY
-    if not JWKS_URL:
-        # Отримати конфігурацію 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(OPENID_CONFIG_URL)
-            response.raise_for_status()
-            config = response.json()
-            # Отримати URL для ключів
-            JWKS_URL = config.get("jwks_uri")
-    
-    # 3. Отримати самий ключ (JWKS)
-    async with httpx.AsyncClient() as client:
-        response = await client.get(JWKS_URL)
-        response.raise_for_status()
-        # Keycloak зазвичай повертає JWKS, звідки беремо перший ключ
-        PUBLIC_KEY = response.json()['keys'][0]
+    # ЗАВДАННЯ
+    ("task", "GET", "tasks/board/{board_id}"): {"scope": "task:read", "cache_ttl": 5, "coalesce": True,
+                                                "retries": 1, "hedge": {"percentile": 95}},
+    ("task", "POST", "tasks"): "task:write",
+    ("task", "PUT", "tasks/{task_id}"): "task:write",
 
+    # PUSH-КАНАЛИ (коли сервіс сповіщень їх підтримуватиме)
+    # ("notification", "GET", "notifications/stream"): {"scope": "notification:read", "sse": True},
+    # ("notification", "GET", "ws"): {"scope": "notification:read", "websocket": True},
 
-async def validate_token(authorization: str = Header(None)):
-    """Перевіряє JWT Access Token, підписаний Keycloak."""
+}
+
+# Таблиця маршрутів компілюється один раз при старті
+route_table = build_router(AUTHORIZATION_MAP, UNPROTECTED_PATHS)
+
+async def verify_token(authorization: str) -> VerifiedToken:
+    """Перевіряє JWT Access Token, підписаний Keycloak, з урахуванням кешу."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
 
@@ -82,23 +162,25 @@ async def validate_token(authorization: str = Header(None)):
         scheme, token = authorization.split()
         if scheme.lower() != 'bearer':
             raise HTTPException(status_code=401, detail="Invalid token scheme")
-        
-        # Перевіряємо, чи ми вже отримали публічний ключ
-        if not PUBLIC_KEY:
-            await fetch_public_key() 
 
-        # Використовуємо PUBLIC_KEY для декодування та перевірки підпису
-        
-        # Для простоти (але менш безпечно), ми можемо декодувати токен, 
-        # використовуючи секрет, але це JWT, тому використовуємо публічний ключ.
+        # Токен уже перевіряли і він ще не прострочений
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
         
+        # Беремо вже розібраний публічний ключ з кешу за kid із заголовка токена
+        kid = jwt.get_unverified_header(token).get("kid")
+        signing_key = await jwks_cache.get_key(kid)
+        if signing_key is None:
+            raise HTTPException(status_code=401, detail="Invalid token: unknown signing key")
+
         # Отримання потрібного алгоритму (наприклад, RS256)
-        algorithm = PUBLIC_KEY.get('alg', 'RS256')
+        public_key, algorithm = signing_key
         
         # Декодування і валідація токена (audience, issuer, expiration)
         payload = jwt.decode(
             token,
-            PUBLIC_KEY,
+            public_key,
             algorithms=[algorithm],
             # audience=['account', CLIENT_ID],
             options={"verify_aud": False}, 
@@ -106,13 +188,22 @@ async def validate_token(authorization: str = Header(None)):
         )
         
         # Додавання payload токена до запиту для мікросервісів
-        return payload
+        return token_cache.put(token, payload)
 
+    except HTTPException:
+        raise
     except JWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+    except JWKSUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Authentication keys unavailable: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Authentication error: {e}")
 
+async def validate_token(authorization: str = Header(None)):
+    """Повертає payload перевіреного JWT."""
+    verified = await verify_token(authorization)
+    return verified.payload
+
 def scope_required(required_scope: str):
     """
     Функція, яка перевіряє наявність потрібного Scope в JWT.
@@ -121,32 +212,24 @@ def scope_required(required_scope: str):
     async def scope_checker(authorization: str = Header(None)):
         # Викликаємо нашу основну валідацію, щоб отримати Payload
         try:
-            auth_payload = await validate_token(authorization)
+            verified = await verify_token(authorization)
         except HTTPException:
             raise
         
         # Перевіряємо, чи існує потрібний Scope у токені
-        # Поле 'scope' є рядком, розділеним пробілами
-        scopes = auth_payload.get("scope", "")
-        
-        if required_scope not in scopes.split():
+        # (scopes вже розібрані в frozenset при першій перевірці токена)
+        if required_scope not in verified.scopes:
             raise HTTPException(
                 status_code=403, 
                 detail=f"Forbidden: Missing required scope '{required_scope}'"
             )
         
         # Якщо все добре, повертаємо Payload або True
-        return auth_payload
+        return verified.payload
     return scope_checker
 
-# Конфігурація сервісів
-SERVICE_URLS = {
-    "auth": "http://auth-service:8000",
-    "subscription": "http://subscription-service:8000",
-    "board": "http://board-service:8000",
-    "task": "http://task-service:8000",
-    "notification": "http://notification-service:8000",
-}
+# Додаємо ендпоінт /metrics, який Prometheus буде опитувати
+app.add_route("/metrics", metrics_endpoint)
 
 @app.get("/")
 async def root():
@@ -156,28 +239,76 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.post("/batch")
+async def batch(items: list[BatchItem], request: Request):
+    """
+    Виконує кілька підзапитів за один виклик: токен перевіряється один раз,
+    підзапити йдуть до upstream одночасно, результат - статус і тіло кожного.
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {BATCH_MAX_ITEMS} requests")
+    BATCH_ITEMS.observe(len(items))
+
+    verified = await verify_token(request.headers.get("Authorization"))
+    # Заголовки зовнішнього запиту (Authorization тощо) спільні для всіх підзапитів
+    base_headers = filter_hop_by_hop(request.headers, drop=("content-length", "content-type", "if-none-match"))
+
+    async def run_item(item: BatchItem):
+        method = item.method.upper()
+        service_name, path, query = split_path(item.path)
+        if service_name not in SERVICE_URLS:
+            raise HTTPException(status_code=404, detail="Service not found")
+        route = route_table.resolve(service_name, method, path)
+        if method not in BATCH_METHODS or route is None or (route.protected and route.scope is None):
+            raise HTTPException(status_code=405, detail="Method not allowed for this path or missing scope configuration")
+        if route.protected and route.scope not in verified.scopes:
+            raise HTTPException(status_code=403, detail=f"Forbidden: Missing required scope '{route.scope}'")
+        enforce_rate_limit(rate_limiter, route, request, verified.payload)
+
+        pool = get_pool(route.upstream)
+        headers, content = base_headers, b""
+        if item.body is not None:
+            headers = base_headers + [("content-type", "application/json")]
+            content = json.dumps(item.body).encode()
+
+        fetch_once = lambda: fetch(pool, method, path, query, headers, content, route=route)
+        if method == "GET" and route.options.get("coalesce"):
+            key = coalesce_key(route, method, path, query, verified.payload.get("sub"))
+            response = await upstream_flight.do(key, fetch_once, service=route.upstream)
+        else:
+            response = await fetch_once()
+
+        if method in MUTATING_METHODS:
+            for prefix in purge_prefixes(route, path):
+                response_cache.purge(prefix)
+        return response
+
+    return {"responses": await run_batch(items, run_item, BATCH_CONCURRENCY)}
+
+@app.get("/views/boards/{board_id}")
+async def board_view_endpoint(board_id: str, request: Request):
+    """Агрегований документ дошки: дошка, учасники з даними користувачів і завдання"""
+    verified = await verify_token(request.headers.get("Authorization"))
+    if "board:read" not in verified.scopes:
+        raise HTTPException(status_code=403, detail="Forbidden: Missing required scope 'board:read'")
+    headers = filter_hop_by_hop(request.headers, drop=("content-length", "if-none-match"))
+    return await board_view(board_id, headers, verified.scopes, VIEW_PART_TIMEOUT, VIEW_USER_CONCURRENCY)
+
 @app.api_route("/{service_name}/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def gateway(service_name: str, path: str, request: Request):
     if service_name not in SERVICE_URLS:
         raise HTTPException(status_code=404, detail="Service not found")
     
-    http_method = request.method
-    path_key = path.split('/')[0]
-    # Створюємо ключ для пошуку в AUTHORIZATION_MAP
-    auth_key = (service_name, http_method, path_key)
-    
-    target_url = f"{SERVICE_URLS[service_name]}/{path}"
-    query_params = request.query_params
-
-    full_path = f"/{service_name}/{path}"
-    # Перевіряємо, чи поточний шлях є захищеним. 
-    # Робимо перевірку, якщо шлях НЕ в списку UNPROTECTED_PATHS.
-    is_protected = not any(p in full_path for p in UNPROTECTED_PATHS)
-
-    required_scope = AUTHORIZATION_MAP.get(auth_key)
+    # Один пошук у скомпільованій таблиці дає upstream, scope і ознаку захищеності
+    started = time.perf_counter()
+    route = route_table.resolve(service_name, request.method, path)
+    # Час фаз запиту (маршрут, автентифікація, upstream) з міткою шаблону маршруту
+    request_timing = timing.start(service_name, route.template if route else "unmatched")
+    request_timing.observe("route", time.perf_counter() - started)
+    is_protected = route is None or route.protected
 
     if is_protected:
-        if required_scope is None:
+        if route is None or route.scope is None:
              raise HTTPException(
                 status_code=405, # Method Not Allowed (або 403)
                 detail="Method not allowed for this path or missing scope configuration"
@@ -187,10 +318,11 @@ async def gateway(service_name: str, path: str, request: Request):
 
         try:
             # Очікуємо виконання асинхронної функції валідації
-            auth_payload = await scope_required(required_scope)(auth_header)
+            with request_timing.measure("auth"):
+                auth_payload = await scope_required(route.scope)(auth_header)
             
             # Якщо токен валідний, отримуємо оригінальні заголовки
-            headers = dict(request.headers)
+            headers = request.headers
             
             
         except HTTPException as e:
@@ -198,24 +330,78 @@ async def gateway(service_name: str, path: str, request: Request):
             raise e
     else:
         # Якщо шлях НЕ захищений, просто використовуємо оригінальні заголовки
-        headers = dict(request.headers)
+        headers = request.headers
+        auth_payload = None
+
+    # Ліміт перевіряється після автентифікації, щоб чужий трафік не вичерпував кошик користувача
+    enforce_rate_limit(rate_limiter, route, request, auth_payload)
+
+    pool = get_pool(route.upstream)
+
+    # Потік подій тримає з'єднання довго, тому йде окремим шляхом з власним лімітом
+    if (request.method == "GET" and route.options.get("sse")
+            and "text/event-stream" in request.headers.get("accept", "")):
+        return await proxy_sse(push_connections, pool, request, path, headers)
+
+    # Ідемпотентні GET з кешем, об'єднанням запитів, повторами чи hedge читаються з upstream повністю
+    if request.method == "GET" and any(route.options.get(o) for o in ("cache_ttl", "coalesce", "retries", "hedge")):
+        identity = auth_payload.get("sub") if is_protected else None
+        # If-None-Match обробляє gateway, upstream має повернути повне тіло
+        upstream_headers = filter_hop_by_hop(headers, drop=("if-none-match",))
+
+        async def fetch_upstream():
+            fetch_once = lambda: fetch(pool, "GET", path, request.query_params, upstream_headers, route=route)
+            if route.options.get("coalesce"):
+                key = coalesce_key(route, "GET", path, request.query_params.multi_items(), identity)
+                return await upstream_flight.do(key, fetch_once, service=route.upstream)
+            return await fetch_once()
+
+        if route.options.get("cache_ttl"):
+            response = await serve_cached(response_cache, route, request, path, identity, fetch_upstream)
+        else:
+            response = (await fetch_upstream()).to_response()
+        return _with_server_timing(response, request_timing)
 
     # headers = dict(request.headers)
-    async with httpx.AsyncClient() as client:
-        response = await client.request(
-            method = request.method,
-            url = target_url,
-            params = query_params,
-            headers = headers, # Передаємо оригінальний Authorization заголовок
-            content = await request.body(),
-            timeout = 30.0
-        )
+    # Проксуємо через пул з'єднань сервісу (таймаути налаштовані в config.POOL_SETTINGS)
+    response = await forward(pool, request, path, headers)
+
+    # Зміна ресурсу робить застарілими закешовані відповіді з тим самим префіксом
+    if request.method in MUTATING_METHODS:
+        for prefix in purge_prefixes(route, path):
+            response_cache.purge(prefix)
+    return _with_server_timing(response, request_timing)
+
+@app.websocket("/{service_name}/{path:path}")
+async def websocket_gateway(websocket: WebSocket, service_name: str, path: str):
+    """WebSocket-проксі з тією ж перевіркою JWT і scope, що й для HTTP"""
+    if service_name not in SERVICE_URLS:
+        await websocket.close(code=1008)
+        return
+    route = route_table.resolve(service_name, "GET", path)
+    if route is None or not route.options.get("websocket"):
+        await websocket.close(code=1008)
+        return
+
+    # Браузер не може додати заголовок Authorization до WebSocket, тому токен можна передати в query
+    query = [(k, v) for k, v in websocket.query_params.multi_items() if k != "access_token"]
+    auth_header = websocket.headers.get("Authorization")
+    if not auth_header and websocket.query_params.get("access_token"):
+        auth_header = f"Bearer {websocket.query_params['access_token']}"
+    if route.protected:
+        try:
+            await scope_required(route.scope)(auth_header)
+        except HTTPException:
+            await websocket.close(code=1008)  # Policy Violation
+            return
 
-    return Response(
-        content = response.content,
-        status_code = response.status_code,
-        headers = dict(response.headers)
-    )
+    await proxy_websocket(push_connections, get_pool(route.upstream), websocket, path, urlencode(query), auth_header)
+
+def _with_server_timing(response: Response, request_timing: timing.RequestTiming) -> Response:
+    # Для потокових відповідей body ще не передано, тому його в заголовку немає
+    if SERVER_TIMING:
+        response.headers.append("Server-Timing", request_timing.server_timing())
+    return response
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8080)
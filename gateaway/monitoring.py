@@ -0,0 +1,144 @@
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Метрики пулів з'єднань до upstream-сервісів
+UPSTREAM_POOL_IN_FLIGHT = Gauge(
+    'gateway_upstream_pool_in_flight', 'Requests currently holding an upstream connection',
+    ['service']
+)
+UPSTREAM_POOL_MAX_CONNECTIONS = Gauge(
+    'gateway_upstream_pool_max_connections', 'Configured connection limit of the upstream pool',
+    ['service']
+)
+UPSTREAM_POOL_TIMEOUTS = Counter(
+    'gateway_upstream_pool_timeouts_total', 'Requests that could not acquire a pooled connection in time',
+    ['service']
+)
+UPSTREAM_REQUESTS = Counter(
+    'gateway_upstream_requests_total', 'Requests sent to upstream services',
+    ['service', 'outcome']
+)
+
+# Метрики окремих реплік сервісів
+ENDPOINT_HEALTHY = Gauge(
+    'gateway_upstream_endpoint_healthy', 'Whether the replica is in rotation (1) or ejected (0)',
+    ['service', 'endpoint']
+)
+ENDPOINT_OUTSTANDING = Gauge(
+    'gateway_upstream_endpoint_outstanding', 'Requests currently outstanding on the replica',
+    ['service', 'endpoint']
+)
+ENDPOINT_LATENCY_EWMA = Gauge(
+    'gateway_upstream_endpoint_latency_ewma_seconds', 'Exponentially weighted moving average of replica latency',
+    ['service', 'endpoint']
+)
+
+# Метрики кешу ключів Keycloak
+JWKS_REFRESHES = Counter(
+    'gateway_jwks_refreshes_total', 'JWKS fetches from Keycloak',
+    ['outcome']
+)
+
+# Метрики кешу перевірених токенів
+TOKEN_CACHE_LOOKUPS = Counter(
+    'gateway_token_cache_lookups_total', 'Verified-token cache lookups',
+    ['result']
+)
+TOKEN_CACHE_SIZE = Gauge(
+    'gateway_token_cache_size', 'Entries in the verified-token cache'
+)
+
+# Час пошуку маршруту в скомпільованій таблиці
+ROUTE_MATCH_LATENCY = Histogram(
+    'gateway_route_match_seconds', 'Time spent resolving a request against the route table',
+    buckets=(0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001)
+)
+
+# Метрики кешу відповідей
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'gateway_response_cache_lookups_total', 'Response cache lookups for cacheable GETs',
+    ['result']
+)
+RESPONSE_CACHE_BYTES = Gauge(
+    'gateway_response_cache_bytes', 'Approximate size of cached response bodies and headers'
+)
+
+# Об'єднання однакових запитів: coalescing ratio = follower / (leader + follower)
+COALESCED_REQUESTS = Counter(
+    'gateway_coalesced_requests_total', 'Coalescable GETs by role in a shared upstream request',
+    ['service', 'role']
+)
+
+# Обмеження частоти запитів
+RATE_LIMITED_REQUESTS = Counter(
+    'gateway_rate_limited_requests_total', 'Requests rejected with 429 by the rate limiter',
+    ['service', 'route']
+)
+RATE_LIMIT_BUCKETS = Gauge(
+    'gateway_rate_limit_buckets', 'Token buckets currently tracked by the rate limiter'
+)
+
+# Розмір пакетних запитів POST /batch
+BATCH_ITEMS = Histogram(
+    'gateway_batch_items', 'Sub-requests per POST /batch call',
+    buckets=(1, 2, 5, 10, 20, 30, 50)
+)
+
+# Агреговані представлення (/views/...): частини, які не вдалося отримати
+VIEW_PART_FAILURES = Counter(
+    'gateway_view_part_failures_total', 'Parts of aggregated views that could not be fetched',
+    ['view', 'part', 'reason']
+)
+
+# Адаптивний ліміт одночасних запитів (in-flight - gateway_upstream_pool_in_flight)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    'gateway_upstream_concurrency_limit', 'Current adaptive concurrency limit per upstream',
+    ['service']
+)
+UPSTREAM_QUEUED = Gauge(
+    'gateway_upstream_queued', 'Requests waiting for a concurrency slot',
+    ['service']
+)
+UPSTREAM_SHED = Counter(
+    'gateway_upstream_shed_total', 'Requests rejected by the concurrency limiter',
+    ['service', 'reason']
+)
+# Розбивка часу запиту за фазами: route, auth, queue, connect, ttfb, body
+PHASE_LATENCY = Histogram(
+    'gateway_phase_seconds', 'Time spent in each phase of a proxied request',
+    ['service', 'route', 'phase'],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+# Повтори та hedged-запити (outcome: sent | budget_exhausted)
+UPSTREAM_RETRIES = Counter(
+    'gateway_upstream_retries_total', 'Extra upstream attempts made for retries and hedging',
+    ['service', 'kind', 'outcome']
+)
+HEDGE_WINS = Counter(
+    'gateway_hedge_wins_total', 'Which attempt answered first when a hedge was sent',
+    ['service', 'winner']
+)
+# Стиснення відповідей: коефіцієнт = out / in за кодуванням
+COMPRESSION_BYTES = Counter(
+    'gateway_compression_bytes_total', 'Bytes passed through response compression',
+    ['encoding', 'direction']
+)
+COMPRESSION_CPU_SECONDS = Histogram(
+    'gateway_compression_cpu_seconds', 'CPU time spent compressing one chunk',
+    ['encoding'],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+)
+# Довготривалі з'єднання (kind: websocket | sse)
+PUSH_CONNECTIONS = Gauge(
+    'gateway_push_connections', 'Open WebSocket and SSE connections',
+    ['service', 'kind']
+)
+PUSH_CLOSED = Counter(
+    'gateway_push_closed_total', 'Closed or rejected push connections by reason',
+    ['service', 'kind', 'reason']
+)
+
+def metrics_endpoint(request: Request):
+    """Експортує метрики у форматі Prometheus."""
+    return Response(content=generate_latest(), media_type="text/plain")
@@ -0,0 +1,173 @@
+import httpx
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from config import STREAMING_PROXY, MAX_REQUEST_BODY_SIZE
+from upstream import UpstreamPool
+from shared.circuit_breaker import CircuitOpenError
+from concurrency import LimitExceeded
+from retry import request_with_policy
+from routing import RouteMatch
+
+# Заголовки, які стосуються лише одного з'єднання і не передаються далі (RFC 7230, 6.1)
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+})
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+class BufferedResponse:
+    """Повністю прочитана відповідь upstream (для кешу та агрегації)"""
+    __slots__ = ("status_code", "headers", "body")
+
+    def __init__(self, status_code: int, headers: list[tuple[str, str]], body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def to_response(self, extra_headers=()) -> Response:
+        return with_headers(
+            Response(content=self.body, status_code=self.status_code),
+            self.headers + list(extra_headers),
+        )
+
+
+def filter_hop_by_hop(headers, drop=()) -> list[tuple[str, str]]:
+    """Прибирає hop-by-hop заголовки та ті, що перелічені в Connection"""
+    connection_tokens = {token.strip().lower() for token in headers.get("connection", "").split(",")}
+    excluded = HOP_BY_HOP_HEADERS | connection_tokens | set(drop)
+    # multi_items (httpx) не склеює повторювані заголовки, як-от Set-Cookie
+    items = headers.multi_items() if hasattr(headers, "multi_items") else headers.items()
+    return [(key, value) for key, value in items if key.lower() not in excluded]
+
+
+def with_headers(response: Response, headers: list[tuple[str, str]]) -> Response:
+    """Додає заголовки до відповіді, зберігаючи повтори"""
+    response.raw_headers.extend(
+        (key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in headers
+    )
+    return response
+
+
+def _has_body(request: Request) -> bool:
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        return content_length != "0"
+    return "transfer-encoding" in request.headers
+
+
+def check_body_size(request: Request):
+    """Відхиляє запит одразу, якщо заявлений Content-Length перевищує ліміт"""
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > MAX_REQUEST_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Request body too large")
+
+
+async def _limited_body(request: Request):
+    """Передає тіло запиту upstream частинами, рахуючи розмір"""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_REQUEST_BODY_SIZE:
+            raise RequestBodyTooLarge()
+        yield chunk
+
+
+def _upstream_error(service_name: str, exc: Exception) -> HTTPException:
+    if isinstance(exc, RequestBodyTooLarge):
+        return HTTPException(status_code=413, detail="Request body too large")
+    if isinstance(exc, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail=f"Service '{service_name}' is temporarily unavailable",
+            headers={"Retry-After": str(max(1, int(exc.retry_after + 0.5)))},
+        )
+    if isinstance(exc, LimitExceeded):
+        return HTTPException(
+            status_code=503,
+            detail=f"Service '{service_name}' is overloaded, try again later",
+            headers={"Retry-After": "1"},
+        )
+    if isinstance(exc, httpx.PoolTimeout):
+        return HTTPException(status_code=503, detail=f"Service '{service_name}' is overloaded, try again later")
+    if isinstance(exc, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail=f"Service '{service_name}' timed out")
+    return HTTPException(status_code=502, detail=f"Service '{service_name}' is unavailable")
+
+
+async def forward(pool: UpstreamPool, request: Request, path: str, headers) -> Response:
+    """Проксує запит до upstream: потоково (за замовчуванням) або з буферизацією"""
+    check_body_size(request)
+    upstream_headers = filter_hop_by_hop(headers)
+
+    if not STREAMING_PROXY:
+        return await _forward_buffered(pool, request, path, upstream_headers)
+
+    # Тіло передаємо потоком, не тримаючи його цілком у пам'яті gateway
+    content = _limited_body(request) if _has_body(request) else b""
+    try:
+        response = await pool.open_stream(
+            method=request.method,
+            url=f"/{path}",
+            params=request.query_params,
+            headers=upstream_headers,
+            content=content,
+        )
+    except (RequestBodyTooLarge, CircuitOpenError, LimitExceeded, httpx.HTTPError) as e:
+        raise _upstream_error(pool.name, e)
+
+    # aiter_raw віддає байти як є, тому Content-Encoding/Content-Length лишаються коректними
+    return with_headers(
+        StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            background=BackgroundTask(pool.close_stream, response),
+        ),
+        filter_hop_by_hop(response.headers),
+    )
+
+
+async def fetch(pool: UpstreamPool, method: str, path: str, params=None,
+                headers: list[tuple[str, str]] | None = None, content=b"",
+                route: RouteMatch | None = None) -> BufferedResponse:
+    """Виконує запит до upstream і читає тіло повністю (headers - вже відфільтровані).
+    route - правило маршруту, з якого беруться retries і hedge."""
+    try:
+        response = await request_with_policy(
+            pool,
+            method=method,
+            url=f"/{path}",
+            options=route.options if route else {},
+            key=route.template if route else "",
+            params=params,
+            headers=headers,
+            content=content,
+        )
+    except (CircuitOpenError, LimitExceeded, httpx.HTTPError) as e:
+        raise _upstream_error(pool.name, e)
+
+    # httpx вже розпакував тіло, тому довжину та кодування не передаємо
+    return BufferedResponse(
+        response.status_code,
+        filter_hop_by_hop(response.headers, drop=("content-length", "content-encoding")),
+        response.content,
+    )
+
+
+async def _forward_buffered(pool: UpstreamPool, request: Request, path: str, upstream_headers) -> Response:
+    body = await request.body()
+    if len(body) > MAX_REQUEST_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Request body too large")
+    buffered = await fetch(pool, request.method, path, request.query_params, upstream_headers, body)
+    return buffered.to_response()
@@ -0,0 +1,173 @@
+import asyncio
+import time
+import httpx
+import websockets
+from websockets.asyncio.client import connect as ws_connect, unix_connect as ws_unix_connect
+from fastapi import HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from monitoring import PUSH_CONNECTIONS, PUSH_CLOSED
+from proxy import filter_hop_by_hop, with_headers
+from upstream import UpstreamPool, Endpoint
+
+# Заголовки WebSocket-рукостискання, які клієнт websockets формує сам
+# (підпротоколи клієнта передаються окремо, через subprotocols)
+WS_HANDSHAKE_HEADERS = ("host", "sec-websocket-key", "sec-websocket-version",
+                        "sec-websocket-extensions", "sec-websocket-protocol")
+
+
+class PushConnections:
+    """
+    Облік довготривалих з'єднань (WebSocket, SSE): спільний ліміт на gateway.
+    Такі з'єднання не проходять через adaptive limiter пулу, щоб не займати
+    його слоти годинами.
+    """
+
+    def __init__(self, max_connections: int, idle_timeout: float):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.active = 0
+
+    def open(self, service: str, kind: str) -> bool:
+        if self.active >= self.max_connections:
+            PUSH_CLOSED.labels(service=service, kind=kind, reason="limit").inc()
+            return False
+        self.active += 1
+        PUSH_CONNECTIONS.labels(service=service, kind=kind).inc()
+        return True
+
+    def close(self, service: str, kind: str, reason: str):
+        self.active -= 1
+        PUSH_CONNECTIONS.labels(service=service, kind=kind).dec()
+        PUSH_CLOSED.labels(service=service, kind=kind, reason=reason).inc()
+
+
+async def proxy_sse(connections: PushConnections, pool: UpstreamPool, request: Request, path: str, headers):
+    """Server-Sent Events: потік без таймауту читання, але закривається після idle_timeout тиші"""
+    service = pool.name
+    if not connections.open(service, "sse"):
+        raise HTTPException(status_code=503, detail="Too many push connections")
+
+    endpoint = pool.pick()
+    upstream_request = endpoint.client.build_request(
+        "GET", f"/{path}",
+        params=request.query_params,
+        headers=filter_hop_by_hop(headers, drop=("accept-encoding",)),
+        # Між подіями може минати багато часу - за тишею стежить idle_timeout
+        timeout=httpx.Timeout(pool.settings["connect_timeout"], read=None),
+    )
+    try:
+        response = await endpoint.client.send(upstream_request, stream=True)
+    except httpx.HTTPError:
+        connections.close(service, "sse", "upstream_error")
+        raise HTTPException(status_code=502, detail=f"Service '{service}' is unavailable")
+
+    state = {"reason": "upstream_closed"}
+
+    async def events():
+        chunks = response.aiter_raw()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), connections.idle_timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                state["reason"] = "idle"
+                return
+            yield chunk
+
+    async def close():
+        await response.aclose()
+        connections.close(service, "sse", state["reason"])
+
+    return with_headers(
+        StreamingResponse(events(), status_code=response.status_code, background=BackgroundTask(close)),
+        filter_hop_by_hop(response.headers),
+    )
+
+
+def _ws_connect(endpoint: Endpoint, path: str, query: str, **kwargs):
+    base_url = "http://localhost" if endpoint.uds_path else endpoint.url
+    url = base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1).rstrip("/") + f"/{path}"
+    if query:
+        url = f"{url}?{query}"
+    if endpoint.uds_path:
+        return ws_unix_connect(endpoint.uds_path, url, **kwargs)
+    return ws_connect(url, **kwargs)
+
+
+async def proxy_websocket(connections: PushConnections, pool: UpstreamPool, websocket: WebSocket,
+                          path: str, query: str, auth_header: str | None = None):
+    """Двобічна передача повідомлень між клієнтом і upstream; закриває обидва боки
+    після idle_timeout без повідомлень в будь-якому напрямку"""
+    service = pool.name
+    if not connections.open(service, "websocket"):
+        await websocket.close(code=1013)  # Try Again Later
+        return
+
+    endpoint = pool.pick()
+    headers = filter_hop_by_hop(websocket.headers, drop=WS_HANDSHAKE_HEADERS + ("authorization",))
+    if auth_header:
+        headers.append(("authorization", auth_header))
+    # Підпротоколи, які запросив клієнт (graphql-ws, STOMP...): обирає upstream, gateway лише передає вибір
+    subprotocols = websocket.scope.get("subprotocols") or None
+    reason = "client_closed"
+    try:
+        async with _ws_connect(
+            endpoint, path, query,
+            additional_headers=headers,
+            subprotocols=subprotocols,
+            open_timeout=pool.settings["connect_timeout"],
+        ) as upstream:
+            await websocket.accept(subprotocol=upstream.subprotocol)
+            last_activity = time.monotonic()
+
+            async def client_to_upstream():
+                nonlocal last_activity
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return "client_closed"
+                    last_activity = time.monotonic()
+                    await upstream.send(message["text"] if message.get("text") is not None else message["bytes"])
+
+            async def upstream_to_client():
+                nonlocal last_activity
+                async for message in upstream:
+                    last_activity = time.monotonic()
+                    if isinstance(message, str):
+                        await websocket.send_text(message)
+                    else:
+                        await websocket.send_bytes(message)
+                return "upstream_closed"
+
+            async def idle_watchdog():
+                while True:
+                    remaining = last_activity + connections.idle_timeout - time.monotonic()
+                    if remaining <= 0:
+                        return "idle"
+                    await asyncio.sleep(remaining)
+
+            tasks = [asyncio.create_task(c()) for c in (client_to_upstream, upstream_to_client, idle_watchdog)]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                finished = done.pop()
+                reason = finished.result() if finished.exception() is None else "error"
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+    except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException):
+        reason = "upstream_error"
+    except WebSocketDisconnect:
+        reason = "client_closed"
+    finally:
+        connections.close(service, "websocket", reason)
+
+    if reason != "client_closed":
+        # 1000 - upstream завершив сесію, 1001 - тиша довше idle_timeout, 1011 - помилка
+        code = {"upstream_closed": 1000, "idle": 1001}.get(reason, 1011)
+        try:
+            await websocket.close(code=code)
+        except RuntimeError:
+            pass  # з'єднання з клієнтом вже закрите
@@ -0,0 +1,82 @@
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from monitoring import RATE_LIMITED_REQUESTS, RATE_LIMIT_BUCKETS
+from routing import RouteMatch
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Token bucket на ключ (користувач, IP або scope) для кожного маршруту.
+    Кількість кошиків обмежена: найдавніше використані витісняються (LRU).
+    Перевірка - O(1) і не містить await, тому блокування не потрібні.
+    """
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[tuple, TokenBucket] = OrderedDict()
+
+    def hit(self, key: tuple, rate: float, burst: int) -> float:
+        """Списує один токен. Повертає 0, якщо запит дозволено,
+        інакше - скільки секунд чекати до появи токена."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            RATE_LIMIT_BUCKETS.set(len(self._buckets))
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit_key(match: RouteMatch, request: Request, payload: dict | None) -> tuple:
+    """Ключ кошика: шаблон маршруту + метод + користувач (sub), IP клієнта або scope"""
+    key_type = match.options["rate_limit"].get("key", "sub")
+    if key_type == "scope":
+        owner = match.scope
+    elif key_type == "sub" and payload and payload.get("sub"):
+        owner = payload["sub"]
+    else:
+        # Незахищений маршрут або токен без sub - обмежуємо за IP
+        owner = client_ip(request)
+    return (match.template, match.route.method, key_type, owner)
+
+
+def enforce_rate_limit(limiter: RateLimiter, match: RouteMatch, request: Request, payload: dict | None):
+    """Кидає 429 з Retry-After, якщо ліміт маршруту вичерпано"""
+    limit = match.options.get("rate_limit")
+    if not limit:
+        return
+    wait = limiter.hit(rate_limit_key(match, request, payload), limit["rate"], limit.get("burst", limit["rate"]))
+    if wait:
+        RATE_LIMITED_REQUESTS.labels(service=match.service, route=match.template).inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
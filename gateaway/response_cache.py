@@ -0,0 +1,173 @@
+import hashlib
+import time
+from collections import OrderedDict
+from fastapi import Request, Response
+from monitoring import RESPONSE_CACHE_LOOKUPS, RESPONSE_CACHE_BYTES
+from proxy import BufferedResponse, HOP_BY_HOP_HEADERS
+from routing import RouteMatch
+
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# Заголовки, які не зберігаються в кеші: належать одному з'єднанню або одному користувачу
+UNCACHED_HEADERS = HOP_BY_HOP_HEADERS | {"set-cookie", "etag"}
+
+
+class CacheEntry:
+    __slots__ = ("response", "etag", "stored_at", "expires_at", "size")
+
+    def __init__(self, response: BufferedResponse, etag: str, ttl: float):
+        self.response = response
+        self.etag = etag
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+        self.size = len(response.body) + sum(len(k) + len(v) for k, v in response.headers)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Порівняння для If-None-Match (слабке, як вимагає RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """
+    LRU-кеш відповідей на GET, обмежений сумарним розміром у байтах.
+    Записи очищуються за префіксом шляху, коли той самий ресурс змінюється.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        # Лічильник очищень: відповідь, отримана до очищення, не потрапляє в кеш
+        self.generation = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+
+    def get(self, key: tuple) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: CacheEntry, generation: int):
+        if generation != self.generation or entry.size > self.max_entry_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+        RESPONSE_CACHE_BYTES.set(self.size)
+
+    def purge(self, prefix: str):
+        """Видаляє всі записи, шлях яких починається з prefix"""
+        self.generation += 1
+        for key in [key for key in self._entries if _path_has_prefix(key[0], prefix)]:
+            self._remove(key)
+        RESPONSE_CACHE_BYTES.set(self.size)
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+
+
+def _path_has_prefix(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix + "/")
+
+
+def cache_key(match: RouteMatch, path: str, request: Request, identity: str | None) -> tuple:
+    normalized = f"/{match.service}/" + "/".join(s for s in path.split("/") if s)
+    query = tuple(sorted(request.query_params.multi_items()))
+    # Ідентичність користувача додаємо лише там, де відповідь від неї залежить
+    owner = identity if match.options.get("cache_per_user") else None
+    return (normalized, query, owner)
+
+
+def purge_prefixes(match: RouteMatch, path: str) -> list[str]:
+    """Префікси, які треба очистити після зміни ресурсу: явні з правила
+    або колекція, до якої належить ресурс (/board/boards/1 -> /board/boards)"""
+    explicit = match.options.get("cache_purge")
+    if explicit:
+        return explicit
+    segments = [s for s in path.split("/") if s]
+    return [f"/{match.service}/{segments[0]}"] if segments else [f"/{match.service}"]
+
+
+def is_storable(headers: list[tuple[str, str]]) -> bool:
+    """Чи можна віддавати відповідь іншим клієнтам: upstream не заборонив
+    (Cache-Control: no-store / private) і відповідь не встановлює cookie"""
+    directives = set()
+    for key, value in headers:
+        name = key.lower()
+        if name == "set-cookie":
+            return False
+        if name == "cache-control":
+            directives.update(d.split("=", 1)[0].strip().lower() for d in value.split(","))
+    return not directives & {"no-store", "private"}
+
+
+def _storable_headers(headers: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    connection_tokens = {token.strip().lower() for key, value in headers
+                         if key.lower() == "connection" for token in value.split(",")}
+    excluded = UNCACHED_HEADERS | connection_tokens
+    return [(k, v) for k, v in headers if k.lower() not in excluded]
+
+
+def _not_modified(entry: CacheEntry, cache_status: str) -> Response:
+    headers = [(k, v) for k, v in entry.response.headers if k.lower() in ("cache-control", "expires", "vary")]
+    response = Response(status_code=304)
+    response.raw_headers.extend(
+        (k.lower().encode("latin-1"), v.encode("latin-1"))
+        for k, v in headers + [("etag", entry.etag), ("x-cache", cache_status)]
+    )
+    return response
+
+
+async def serve_cached(cache: ResponseCache, match: RouteMatch, request: Request, path: str,
+                       identity: str | None, fetch_upstream) -> Response:
+    """Віддає GET з кешу, або з upstream (fetch_upstream) з подальшим збереженням у кеш.
+    fetch_upstream не повинен передавати If-None-Match, щоб отримати повне тіло."""
+    key = cache_key(match, path, request, identity)
+    if_none_match = request.headers.get("if-none-match")
+
+    entry = cache.get(key)
+    if entry is not None:
+        if etag_matches(if_none_match, entry.etag):
+            RESPONSE_CACHE_LOOKUPS.labels(result="not_modified").inc()
+            return _not_modified(entry, "HIT")
+        RESPONSE_CACHE_LOOKUPS.labels(result="hit").inc()
+        age = int(time.monotonic() - entry.stored_at)
+        return entry.response.to_response([("etag", entry.etag), ("age", str(age)), ("x-cache", "HIT")])
+
+    RESPONSE_CACHE_LOOKUPS.labels(result="miss").inc()
+    generation = cache.generation
+    fetched = await fetch_upstream()
+    if fetched.status_code != 200 or not is_storable(fetched.headers):
+        return fetched.to_response()
+
+    # Відповідь може бути спільною для кількох запитів, тому не змінюємо її, а копіюємо
+    etag = next((v for k, v in fetched.headers if k.lower() == "etag"), None) or make_etag(fetched.body)
+    buffered = BufferedResponse(
+        fetched.status_code,
+        _storable_headers(fetched.headers),
+        fetched.body,
+    )
+    entry = CacheEntry(buffered, etag, match.options["cache_ttl"])
+    cache.put(key, entry, generation)
+
+    if etag_matches(if_none_match, etag):
+        return _not_modified(entry, "MISS")
+    return buffered.to_response([("etag", etag), ("x-cache", "MISS")])
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from collections import deque
+import httpx
+from config import RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND, HEDGE_DEFAULT_DELAY
+from monitoring import UPSTREAM_RETRIES, HEDGE_WINS
+
+# Помилки, за яких запит гарантовано не дійшов до upstream, тому його безпечно повторити
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class RetryBudget:
+    """
+    Спільний для всіх upstream бюджет повторів і hedged-запитів.
+    Кожен запит додає ratio токена, кожен повтор забирає один, тож повторів не більше
+    ratio від трафіку; min_per_second дозволяє кілька повторів і за малого трафіку.
+    Під час збою бюджет швидко вичерпується, і повтори не множать навантаження.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = min_per_second
+        self.updated = time.monotonic()
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class LatencyTracker:
+    """Останні затримки маршруту для обчислення перцентиля (перераховується раз на 20 вимірів)"""
+    __slots__ = ("samples", "added", "_cached")
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+        self.added = 0
+        self._cached = {}
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.added += 1
+        if self.added % 20 == 0:
+            self._cached.clear()
+
+    def percentile(self, p: float) -> float | None:
+        if len(self.samples) < 20:
+            return None
+        if p not in self._cached:
+            ordered = sorted(self.samples)
+            self._cached[p] = ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+        return self._cached[p]
+
+
+retry_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND)
+
+# Затримки маршрутів з hedge, ключ - шаблон маршруту
+_latency: dict[str, LatencyTracker] = {}
+
+
+def hedge_delay(options: dict, key: str) -> float:
+    """Фіксована затримка з правила або перцентиль спостережених затримок маршруту"""
+    if "delay" in options:
+        return options["delay"]
+    tracker = _latency.get(key)
+    observed = tracker.percentile(options.get("percentile", 95)) if tracker else None
+    return observed if observed is not None else HEDGE_DEFAULT_DELAY
+
+
+async def _with_retries(pool, method: str, url: str, retries: int, tried: list, kwargs: dict,
+                        original: bool = True) -> httpx.Response:
+    """Запит з повтором на іншу репліку, якщо не вдалося встановити з'єднання.
+    original=False - уся спроба є hedge-запитом."""
+    attempt = 0
+    while True:
+        try:
+            return await pool.request(method, url, tried=tried, original=original and attempt == 0, **kwargs)
+        except CONNECT_ERRORS:
+            if attempt >= retries:
+                raise
+            if not retry_budget.withdraw():
+                UPSTREAM_RETRIES.labels(service=pool.name, kind="retry", outcome="budget_exhausted").inc()
+                raise
+            UPSTREAM_RETRIES.labels(service=pool.name, kind="retry", outcome="sent").inc()
+            attempt += 1
+
+
+async def request_with_policy(pool, method: str, url: str, options: dict, key: str, **kwargs) -> httpx.Response:
+    """
+    Виконує запит з налаштуваннями маршруту:
+    retries - скільки разів повторити при помилці з'єднання,
+    hedge   - для GET: якщо відповіді немає після затримки, надіслати другий запит
+              на іншу здорову репліку (якщо вона є) і взяти першу успішну відповідь.
+    """
+    retries = options.get("retries", 0)
+    hedge = options.get("hedge")
+    # Репліки, які вже використано цим запитом (повтор і hedge йдуть на інші)
+    tried = []
+
+    async def attempt(original: bool = True):
+        started = time.perf_counter()
+        response = await _with_retries(pool, method, url, retries, tried, kwargs, original)
+        if hedge:
+            _latency.setdefault(key, LatencyTracker()).add(time.perf_counter() - started)
+        return response
+
+    if not hedge or method != "GET":
+        return await attempt()
+
+    primary = asyncio.create_task(attempt())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay(hedge, key))
+        if not done:
+            if not pool.has_spare(tried):
+                # Єдина (або всі здорові вже зайняті) репліка - hedge лише подвоїв би навантаження на неї
+                UPSTREAM_RETRIES.labels(service=pool.name, kind="hedge", outcome="no_replica").inc()
+            elif retry_budget.withdraw():
+                UPSTREAM_RETRIES.labels(service=pool.name, kind="hedge", outcome="sent").inc()
+                tasks.append(asyncio.create_task(attempt(original=False)))
+            else:
+                UPSTREAM_RETRIES.labels(service=pool.name, kind="hedge", outcome="budget_exhausted").inc()
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if len(tasks) > 1:
+                        HEDGE_WINS.labels(service=pool.name, winner="primary" if task is primary else "hedge").inc()
+                    return task.result()
+        # Усі спроби невдалі - повертаємо помилку першої
+        return primary.result()
+    finally:
+        # Програла спроба (або запит клієнта скасовано) - не чекаємо на неї
+        for task in tasks:
+            if not task.done():
+                task.cancel()
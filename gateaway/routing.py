@@ -0,0 +1,151 @@
+import time
+from monitoring import ROUTE_MATCH_LATENCY
+
+ANY_METHOD = "*"
+
+
+def _split(path: str) -> list[str]:
+    # Зайві та кінцеві "/" не впливають на маршрут: users/{id}/ == users/{id}
+    return [segment for segment in path.split("/") if segment]
+
+
+def _is_param(segment: str) -> bool:
+    return segment.startswith("{") and segment.endswith("}")
+
+
+class Route:
+    """Правило маршрутизації: сервіс, метод, шаблон шляху і вимоги доступу"""
+    __slots__ = ("service", "method", "template", "scope", "protected", "options", "param_names")
+
+    def __init__(self, service: str, method: str, template: str, scope: str | None = None,
+                 protected: bool = True, options: dict | None = None):
+        self.service = service
+        self.method = method
+        self.template = template
+        self.scope = scope
+        self.protected = protected
+        self.options = options or {}
+        self.param_names = [s[1:-1] for s in [service] + _split(template) if _is_param(s)]
+
+    def __repr__(self):
+        return f"Route({self.method} /{self.service}/{self.template}, scope={self.scope})"
+
+
+class RouteMatch:
+    """Результат пошуку маршруту для конкретного запиту"""
+    __slots__ = ("route", "service", "params")
+
+    def __init__(self, route: Route, service: str, params: dict):
+        self.route = route
+        self.service = service
+        self.params = params
+
+    @property
+    def scope(self):
+        return self.route.scope
+
+    @property
+    def protected(self):
+        return self.route.protected
+
+    @property
+    def upstream(self):
+        # Upstream за замовчуванням - однойменний запис у SERVICE_URLS
+        return self.route.options.get("upstream", self.service)
+
+    @property
+    def template(self):
+        return f"/{self.route.service}/{self.route.template}"
+
+    @property
+    def options(self):
+        return self.route.options
+
+
+class _Node:
+    __slots__ = ("static", "param", "routes")
+
+    def __init__(self):
+        self.static = {}
+        self.param = None
+        # HTTP-метод -> Route
+        self.routes = {}
+
+
+class Router:
+    """
+    Префіксне дерево за сегментами шляху (перший сегмент - назва сервісу).
+    Сегменти-шаблони на кшталт {id} збігаються з будь-яким значенням,
+    статичні сегменти мають пріоритет. Пошук - O(довжина шляху).
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+
+    def add(self, route: Route):
+        node = self.root
+        for segment in [route.service] + _split(route.template):
+            if _is_param(segment):
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+        if route.method in node.routes:
+            raise ValueError(f"Duplicate route {route!r}")
+        node.routes[route.method] = route
+        self.size += 1
+
+    def resolve(self, service: str, method: str, path: str) -> RouteMatch | None:
+        started = time.perf_counter()
+        values = []
+        route = self._find(self.root, [service] + _split(path), 0, method, values)
+        ROUTE_MATCH_LATENCY.observe(time.perf_counter() - started)
+        if route is None:
+            return None
+        # Значення збираються з кінця шляху, імена параметрів беремо з шаблону правила
+        values.reverse()
+        return RouteMatch(route, service, dict(zip(route.param_names, values)))
+
+    def _find(self, node: _Node, segments: list[str], depth: int, method: str, values: list):
+        if depth == len(segments):
+            return node.routes.get(method) or node.routes.get(ANY_METHOD)
+
+        segment = segments[depth]
+        child = node.static.get(segment)
+        if child is not None:
+            route = self._find(child, segments, depth + 1, method, values)
+            if route is not None:
+                return route
+
+        # Повертаємось до шаблонного сегмента лише якщо статичний шлях не підійшов
+        if node.param is not None:
+            route = self._find(node.param, segments, depth + 1, method, values)
+            if route is not None:
+                values.append(segment)
+                return route
+        return None
+
+
+def build_router(authorization_map: dict, unprotected_paths: list[str]) -> Router:
+    """
+    Компілює AUTHORIZATION_MAP і UNPROTECTED_PATHS в одне дерево маршрутів.
+    Значення AUTHORIZATION_MAP - або рядок зі scope, або словник
+    {"scope": ..., <додаткові налаштування маршруту>}.
+    Незахищені шляхи діють для будь-якого методу.
+    """
+    router = Router()
+    for (service, method, template), value in authorization_map.items():
+        if isinstance(value, dict):
+            options = dict(value)
+            scope = options.pop("scope", None)
+        else:
+            options, scope = {}, value
+        router.add(Route(service, method, template, scope=scope, options=options))
+
+    for path in unprotected_paths:
+        segments = _split(path)
+        router.add(Route(segments[0], ANY_METHOD, "/".join(segments[1:]), protected=False))
+
+    return router
@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from monitoring import PHASE_LATENCY
+
+# Фази запиту в порядку виконання (назви - і для метрик, і для Server-Timing)
+PHASES = ("route", "auth", "queue", "connect", "ttfb", "body")
+
+
+class RequestTiming:
+    """Час фаз одного запиту через gateway; кожна фаза одразу потрапляє в гістограму"""
+    __slots__ = ("service", "route", "started", "phases")
+
+    def __init__(self, service: str, route: str):
+        self.service = service
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def observe(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        PHASE_LATENCY.labels(service=self.service, route=self.route, phase=phase).observe(seconds)
+
+    @contextmanager
+    def measure(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def server_timing(self) -> str:
+        """Значення заголовка Server-Timing (тривалість у мілісекундах)"""
+        entries = [f"{phase};dur={self.phases[phase] * 1000:.2f}" for phase in PHASES if phase in self.phases]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+# Вимірювання поточного запиту; задачі, створені під час запиту, успадковують його
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def start(service: str, route: str) -> RequestTiming:
+    timing = RequestTiming(service, route)
+    _current.set(timing)
+    return timing
+
+
+def current() -> RequestTiming | None:
+    return _current.get()
+
+
+class UpstreamTrace:
+    """
+    Розбиває запит до upstream на фази за подіями httpcore (розширення "trace" httpx):
+    connect - від надсилання до запису заголовків (очікування з'єднання з пулу і TCP/TLS),
+    ttfb - від запису заголовків до отримання заголовків відповіді,
+    body - читання тіла відповіді (finish).
+    """
+    __slots__ = ("timing", "started", "sent", "headers_received")
+
+    def __init__(self, timing: RequestTiming):
+        self.timing = timing
+        self.started = time.perf_counter()
+        self.sent = None
+        self.headers_received = None
+
+    async def __call__(self, event: str, info: dict):
+        if event.endswith("send_request_headers.started"):
+            self.sent = time.perf_counter()
+            self.timing.observe("connect", self.sent - self.started)
+        elif event.endswith("receive_response_headers.complete") and self.sent is not None:
+            self.headers_received = time.perf_counter()
+            self.timing.observe("ttfb", self.headers_received - self.sent)
+
+    def finish(self):
+        if self.headers_received is not None:
+            self.timing.observe("body", time.perf_counter() - self.headers_received)
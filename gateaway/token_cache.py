@@ -0,0 +1,73 @@
+import hashlib
+import time
+from collections import OrderedDict
+from monitoring import TOKEN_CACHE_LOOKUPS, TOKEN_CACHE_SIZE
+
+
+class VerifiedToken:
+    """Результат перевірки JWT: payload і вже розібрані scopes"""
+    __slots__ = ("payload", "scopes", "expires_at")
+
+    def __init__(self, payload: dict, expires_at: float):
+        self.payload = payload
+        # Поле 'scope' є рядком, розділеним пробілами - розбираємо один раз
+        self.scopes = frozenset(payload.get("scope", "").split())
+        self.expires_at = expires_at
+
+
+class TokenCache:
+    """
+    Обмежений LRU-кеш перевірених токенів.
+    Ключ - SHA-256 від токена (сам токен у пам'яті не зберігається),
+    запис живе до exp токена, але не довше max_ttl.
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300.0):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, VerifiedToken] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> VerifiedToken | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            del self._entries[key]
+            TOKEN_CACHE_SIZE.set(len(self._entries))
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            TOKEN_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        TOKEN_CACHE_LOOKUPS.labels(result="hit").inc()
+        return entry
+
+    def put(self, token: str, payload: dict) -> VerifiedToken:
+        expires_at = time.time() + self.max_ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        entry = VerifiedToken(payload, expires_at)
+
+        key = self._key(token)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        TOKEN_CACHE_SIZE.set(len(self._entries))
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        TOKEN_CACHE_SIZE.set(0)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import random
+import time
+import httpx
+from config import (SERVICE_URLS, DEFAULT_POOL_SETTINGS, POOL_SETTINGS, HEALTH_CHECK_SETTINGS,
+                    CIRCUIT_BREAKER_SETTINGS, CONCURRENCY_LIMIT_SETTINGS)
+from shared.circuit_breaker import CircuitBreaker
+from concurrency import AdaptiveLimiter
+import timing
+from retry import retry_budget
+from monitoring import (UPSTREAM_POOL_IN_FLIGHT, UPSTREAM_POOL_MAX_CONNECTIONS,
+                        UPSTREAM_POOL_TIMEOUTS, UPSTREAM_REQUESTS,
+                        ENDPOINT_HEALTHY, ENDPOINT_OUTSTANDING, ENDPOINT_LATENCY_EWMA)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  HTTP/2 потребує httpx[http2]
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Вага нового виміру в експоненційному середньому затримки
+EWMA_ALPHA = 0.3
+
+
+def uds_path(url: str) -> str | None:
+    """Шлях до сокета для адрес виду unix:/run/services/auth.sock (або unix:///...)"""
+    if not url.startswith("unix:"):
+        return None
+    path = url[len("unix:"):]
+    return "/" + path.lstrip("/")
+
+
+class Endpoint:
+    """Одна репліка сервісу зі своїм пулом keep-alive з'єднань"""
+
+    def __init__(self, service: str, url: str, settings: dict):
+        self.service = service
+        self.url = url
+        self.settings = settings
+        self.client: httpx.AsyncClient | None = None
+        self.outstanding = 0
+        self.latency_ewma = 0.0
+        self.healthy = True
+        self.failures = 0
+        self.successes = 0
+        self.uds_path = uds_path(url)
+
+    def open(self):
+        http2 = self.settings["http2"]
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning(f"HTTP/2 requested for '{self.service}' but 'h2' is not installed, using HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=self.settings["max_connections"],
+            max_keepalive_connections=self.settings["max_keepalive_connections"],
+            keepalive_expiry=self.settings["keepalive_expiry"],
+        )
+        timeout = httpx.Timeout(
+            connect=self.settings["connect_timeout"],
+            read=self.settings["read_timeout"],
+            write=self.settings["write_timeout"],
+            pool=self.settings["pool_timeout"],
+        )
+        if self.uds_path is not None:
+            # Сервіс на тому ж хості: з'єднання через Unix-сокет замість TCP loopback.
+            # Ліміти пулу задаються транспорту, бо клієнт їх тоді не використовує.
+            self.client = httpx.AsyncClient(
+                base_url="http://localhost",
+                transport=httpx.AsyncHTTPTransport(uds=self.uds_path, limits=limits, http2=http2),
+                timeout=timeout,
+            )
+        else:
+            self.client = httpx.AsyncClient(
+                base_url=self.url,
+                limits=limits,
+                timeout=timeout,
+                http2=http2,
+            )
+        ENDPOINT_HEALTHY.labels(service=self.service, endpoint=self.url).set(1)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def acquire(self):
+        self.outstanding += 1
+        ENDPOINT_OUTSTANDING.labels(service=self.service, endpoint=self.url).set(self.outstanding)
+
+    def release(self, latency: float | None):
+        self.outstanding -= 1
+        ENDPOINT_OUTSTANDING.labels(service=self.service, endpoint=self.url).set(self.outstanding)
+        if latency is not None:
+            if self.latency_ewma == 0.0:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency_ewma
+            ENDPOINT_LATENCY_EWMA.labels(service=self.service, endpoint=self.url).set(self.latency_ewma)
+
+    def mark(self, ok: bool):
+        """Результат health check: виключення або повернення репліки в ротацію"""
+        if ok:
+            self.failures = 0
+            self.successes += 1
+            if not self.healthy and self.successes >= HEALTH_CHECK_SETTINGS["healthy_threshold"]:
+                self.healthy = True
+                logger.info(f"Endpoint {self.url} of '{self.service}' is healthy again")
+        else:
+            self.successes = 0
+            self.failures += 1
+            if self.healthy and self.failures >= HEALTH_CHECK_SETTINGS["unhealthy_threshold"]:
+                self.healthy = False
+                logger.warning(f"Endpoint {self.url} of '{self.service}' ejected after {self.failures} failed checks")
+        ENDPOINT_HEALTHY.labels(service=self.service, endpoint=self.url).set(1 if self.healthy else 0)
+
+
+class UpstreamPool:
+    """Набір реплік одного upstream-сервісу з балансуванням навантаження"""
+
+    def __init__(self, name: str, urls: list[str], settings: dict):
+        self.name = name
+        self.settings = settings
+        self.endpoints = [Endpoint(name, url, settings) for url in urls]
+        # Один breaker на upstream: коли сервіс лежить, запити відхиляються одразу
+        self.breaker = CircuitBreaker(f"gateway:{name}", **CIRCUIT_BREAKER_SETTINGS)
+        # Адаптивний ліміт одночасних запитів: надлишок чекає в черзі або отримує 503
+        self.limiter = None
+        if CONCURRENCY_LIMIT_SETTINGS["enabled"]:
+            limits = {k: v for k, v in CONCURRENCY_LIMIT_SETTINGS.items() if k != "enabled"}
+            self.limiter = AdaptiveLimiter(
+                name, max_limit=settings["max_connections"] * len(self.endpoints), **limits
+            )
+        # Потокові відповіді, що ще тримають з'єднання: response -> (репліка, час до заголовків, trace)
+        self._streams: dict[httpx.Response, tuple[Endpoint, float, timing.UpstreamTrace | None]] = {}
+
+    def open(self):
+        for endpoint in self.endpoints:
+            endpoint.open()
+        UPSTREAM_POOL_MAX_CONNECTIONS.labels(service=self.name).set(
+            self.settings["max_connections"] * len(self.endpoints)
+        )
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.close()
+
+    def pick(self, exclude=()) -> Endpoint:
+        """
+        Power-of-two-choices: з двох випадкових здорових реплік береться та,
+        що має менше незавершених запитів (за рівності - з меншою затримкою).
+        Якщо здорових реплік немає, пробуємо всі.
+        """
+        candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+        if not candidates:
+            candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        if (second.outstanding, second.latency_ewma) < (first.outstanding, first.latency_ewma):
+            return second
+        return first
+
+    def has_spare(self, exclude=()) -> bool:
+        """Чи є здорова репліка, якої ще не використано (для hedge)"""
+        return any(e.healthy and e not in exclude for e in self.endpoints)
+
+    def _record(self, token: tuple, response: httpx.Response):
+        if response.status_code >= 500:
+            self.breaker.record_failure(token)
+        else:
+            self.breaker.record_success(token)
+
+    async def _admit(self, original: bool = True) -> tuple:
+        """Circuit breaker, потім adaptive limiter. Кидає CircuitOpenError або LimitExceeded.
+        Повертає токен circuit breaker для запису результату."""
+        token = self.breaker.before_call()
+        if original:
+            # Бюджет повторів поповнюють лише початкові запити, а не самі повтори чи hedge
+            retry_budget.deposit()
+        if self.limiter is not None:
+            started = time.perf_counter()
+            try:
+                # Відповідь, яка прийде пізніше за read_timeout, клієнт однаково не отримає
+                await self.limiter.acquire(time.monotonic() + self.settings["read_timeout"])
+            except BaseException:
+                self.breaker.record_ignored(token)
+                raise
+            request_timing = timing.current()
+            if request_timing is not None:
+                request_timing.observe("queue", time.perf_counter() - started)
+        return token
+
+    @staticmethod
+    def _trace(kwargs: dict) -> timing.UpstreamTrace | None:
+        """Підключає розбивку на фази, якщо запит вимірюється"""
+        request_timing = timing.current()
+        if request_timing is None:
+            return None
+        trace = timing.UpstreamTrace(request_timing)
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": trace}
+        return trace
+
+    def _endpoint_latency(self, latency: float | None, failed: bool, started: float) -> float:
+        """Затримка для EWMA репліки. Помилка рахується як connect_timeout, а скасований
+        запит (програний hedge) - як час, що вже минув, щоб балансувальник уникав таких реплік."""
+        if latency is not None and not failed:
+            return latency
+        elapsed = time.perf_counter() - started
+        return max(elapsed, self.settings["connect_timeout"]) if failed else elapsed
+
+    def _release_limit(self, latency: float | None, failed: bool):
+        if self.limiter is not None:
+            self.limiter.release(latency, failed)
+
+    async def request(self, method: str, url: str, tried: list | None = None, original: bool = True,
+                      **kwargs) -> httpx.Response:
+        """Виконує запит через пул, враховуючи метрики зайнятості пулу.
+        Якщо circuit breaker відкритий - кидає CircuitOpenError без звернення до upstream,
+        якщо upstream перевантажений - LimitExceeded.
+        tried - репліки, які вже пробували для цього запиту: беремо іншу і додаємо обрану.
+        original=False - повтор або hedge, який не поповнює бюджет повторів."""
+        if tried is None:
+            endpoint = self.pick()
+        else:
+            # Репліку обираємо і позначаємо ще до черги limiter: hedge, вирішений, поки
+            # цей запит чекає на слот, має бачити, що вона вже зайнята
+            endpoint = self.pick(exclude=tried)
+            tried.append(endpoint)
+        token = await self._admit(original)
+        trace = self._trace(kwargs)
+        in_flight = UPSTREAM_POOL_IN_FLIGHT.labels(service=self.name)
+        in_flight.inc()
+        endpoint.acquire()
+        started = time.perf_counter()
+        latency = None
+        failed = False
+        try:
+            response = await endpoint.client.request(method, url, **kwargs)
+            latency = time.perf_counter() - started
+            if trace is not None:
+                trace.finish()
+            failed = response.status_code >= 500
+        except httpx.PoolTimeout:
+            # Усі з'єднання зайняті - сигнал, що треба масштабуватись
+            UPSTREAM_POOL_TIMEOUTS.labels(service=self.name).inc()
+            UPSTREAM_REQUESTS.labels(service=self.name, outcome="pool_timeout").inc()
+            self.breaker.record_failure(token)
+            failed = True
+            raise
+        except httpx.HTTPError:
+            UPSTREAM_REQUESTS.labels(service=self.name, outcome="error").inc()
+            self.breaker.record_failure(token)
+            failed = True
+            raise
+        except BaseException:
+            self.breaker.record_ignored(token)
+            raise
+        finally:
+            in_flight.dec()
+            endpoint.release(self._endpoint_latency(latency, failed, started))
+            self._release_limit(latency, failed)
+        UPSTREAM_REQUESTS.labels(service=self.name, outcome="ok").inc()
+        self._record(token, response)
+        return response
+
+    async def open_stream(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Надсилає запит і повертає відповідь з ще не прочитаним тілом.
+        З'єднання лишається зайнятим до виклику close_stream."""
+        token = await self._admit()
+        endpoint = self.pick()
+        trace = self._trace(kwargs)
+        request = endpoint.client.build_request(method, url, **kwargs)
+        in_flight = UPSTREAM_POOL_IN_FLIGHT.labels(service=self.name)
+        in_flight.inc()
+        endpoint.acquire()
+        started = time.perf_counter()
+        try:
+            response = await endpoint.client.send(request, stream=True)
+        except httpx.PoolTimeout:
+            in_flight.dec()
+            endpoint.release(None)
+            self._release_limit(None, True)
+            UPSTREAM_POOL_TIMEOUTS.labels(service=self.name).inc()
+            UPSTREAM_REQUESTS.labels(service=self.name, outcome="pool_timeout").inc()
+            self.breaker.record_failure(token)
+            raise
+        except BaseException as e:
+            in_flight.dec()
+            endpoint.release(None)
+            UPSTREAM_REQUESTS.labels(service=self.name, outcome="error").inc()
+            if isinstance(e, httpx.HTTPError):
+                self._release_limit(None, True)
+                self.breaker.record_failure(token)
+            else:
+                # Скасування або помилка тіла запиту - не ознака збою upstream
+                self._release_limit(None, False)
+                self.breaker.record_ignored(token)
+            raise
+        UPSTREAM_REQUESTS.labels(service=self.name, outcome="ok").inc()
+        self._record(token, response)
+        # Для потокових відповідей затримкою репліки вважаємо час до заголовків
+        self._streams[response] = (endpoint, time.perf_counter() - started, trace)
+        return response
+
+    async def close_stream(self, response: httpx.Response):
+        """Повертає з'єднання потокової відповіді в пул"""
+        endpoint, latency, trace = self._streams.pop(response)
+        try:
+            await response.aclose()
+        finally:
+            if trace is not None:
+                trace.finish()
+            UPSTREAM_POOL_IN_FLIGHT.labels(service=self.name).dec()
+            endpoint.release(latency)
+            self._release_limit(latency, response.status_code >= 500)
+
+    async def check_health(self):
+        """Перевіряє /health кожної репліки"""
+        path = HEALTH_CHECK_SETTINGS["path"]
+        timeout = HEALTH_CHECK_SETTINGS["timeout"]
+
+        async def probe(endpoint: Endpoint):
+            try:
+                response = await endpoint.client.get(path, timeout=timeout)
+                endpoint.mark(response.status_code == 200)
+            except (httpx.HTTPError, OSError):
+                # OSError - напр. відсутній Unix-сокет репліки
+                endpoint.mark(False)
+
+        await asyncio.gather(*(probe(endpoint) for endpoint in self.endpoints))
+
+
+# Пули з'єднань, ключ - запис у SERVICE_URLS
+pools: dict[str, UpstreamPool] = {}
+_health_task: asyncio.Task | None = None
+
+
+def _urls(entry) -> list[str]:
+    # Запис у SERVICE_URLS - одна адреса або список адрес реплік
+    return [entry] if isinstance(entry, str) else list(entry)
+
+
+async def _health_loop():
+    interval = HEALTH_CHECK_SETTINGS["interval"]
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.gather(*(pool.check_health() for pool in pools.values()))
+        except Exception:
+            # Будь-яка помилка ітерації лише логується - інакше активна перевірка тихо зупинилась би
+            logger.exception("Upstream health check iteration failed")
+
+
+def open_pools():
+    """Створює пули для всіх сервісів і запускає health check (викликається в lifespan)"""
+    global _health_task
+    for name, entry in SERVICE_URLS.items():
+        settings = {**DEFAULT_POOL_SETTINGS, **POOL_SETTINGS.get(name, {})}
+        pool = UpstreamPool(name, _urls(entry), settings)
+        pool.open()
+        pools[name] = pool
+    logger.info(f"Upstream pools opened: {', '.join(f'{n}({len(p.endpoints)})' for n, p in pools.items())}")
+    if HEALTH_CHECK_SETTINGS["enabled"]:
+        _health_task = asyncio.create_task(_health_loop())
+
+
+async def close_pools():
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        try:
+            await _health_task
+        except asyncio.CancelledError:
+            pass
+        _health_task = None
+    for pool in pools.values():
+        await pool.close()
+    pools.clear()
+    logger.info("Upstream pools closed.")
+
+
+def get_pool(service_name: str) -> UpstreamPool:
+    return pools[service_name]
@@ -0,0 +1,93 @@
+import asyncio
+from fastapi import HTTPException
+from monitoring import VIEW_PART_FAILURES
+from proxy import fetch, BufferedResponse
+from batch import decode_body
+from upstream import get_pool
+
+
+class PartFailed(Exception):
+    """Частину агрегованого документа не вдалося отримати"""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+async def _get_part(service: str, path: str, headers, timeout: float):
+    """GET до upstream з власним таймаутом; повертає розібране тіло або кидає PartFailed"""
+    try:
+        response: BufferedResponse = await asyncio.wait_for(
+            fetch(get_pool(service), "GET", path, headers=headers), timeout
+        )
+    except asyncio.TimeoutError:
+        raise PartFailed("timeout")
+    except HTTPException as e:
+        raise PartFailed("timeout" if e.status_code == 504 else "unavailable")
+    if response.status_code == 404:
+        raise PartFailed("not_found")
+    if response.status_code >= 400:
+        raise PartFailed(f"status_{response.status_code}")
+    return decode_body(response)
+
+
+async def board_view(board_id: str, headers, scopes: frozenset, timeout: float, user_concurrency: int) -> dict:
+    """
+    Збирає дошку, її учасників (з даними користувачів з auth) і завдання одним документом.
+    Запити до сервісів ідуть паралельно; кожен користувач запитується один раз.
+    Частини, які не вдалося отримати, позначаються в "errors", решта документа повертається.
+    """
+    errors = {}
+
+    def fail(part: str, reason: str):
+        errors[part] = reason
+        VIEW_PART_FAILURES.labels(view="board", part=part.split("/")[0], reason=reason).inc()
+
+    async def load_members():
+        members = await _get_part("board", f"boards/{board_id}/users", headers, timeout)
+        if "user:read" not in scopes:
+            fail("users", "forbidden")
+            return members
+
+        # Один запит на користувача, навіть якщо він трапляється кілька разів
+        semaphore = asyncio.Semaphore(user_concurrency)
+        user_ids = list(dict.fromkeys(m["user_id"] for m in members))
+
+        async def load_user(user_id: str):
+            async with semaphore:
+                try:
+                    return await _get_part("auth", f"users/{user_id}", headers, timeout)
+                except PartFailed as e:
+                    fail(f"users/{user_id}", e.reason)
+                    return None
+
+        users = dict(zip(user_ids, await asyncio.gather(*(load_user(u) for u in user_ids))))
+        for member in members:
+            member["user"] = users[member["user_id"]]
+        return members
+
+    async def load_tasks():
+        if "task:read" not in scopes:
+            raise PartFailed("forbidden")
+        return await _get_part("task", f"tasks/board/{board_id}", headers, timeout)
+
+    board, members, tasks = await asyncio.gather(
+        _get_part("board", f"boards/{board_id}", headers, timeout),
+        load_members(),
+        load_tasks(),
+        return_exceptions=True,
+    )
+
+    if isinstance(board, PartFailed) and board.reason == "not_found":
+        raise HTTPException(status_code=404, detail="Board not found")
+
+    document = {}
+    for part, value in (("board", board), ("members", members), ("tasks", tasks)):
+        if isinstance(value, PartFailed):
+            fail(part, value.reason)
+            value = None
+        elif isinstance(value, BaseException):
+            raise value
+        document[part] = value
+    document["errors"] = errors
+    document["partial"] = bool(errors)
+    return document
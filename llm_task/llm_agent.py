@@ -41,7 +41,8 @@ class AuthServiceClient:
         print(f"REQUEST: Шукаю користувача {email}...")
         async with httpx.AsyncClient() as client:
             try:
-                resp = await client.get(f"{AUTH_SERVICE_URL}/users")
+                # Пошук за email на сервері (індекс), а не завантаження всього списку
+                resp = await client.get(f"{AUTH_SERVICE_URL}/users", params={"email": email})
                 
                 # print(f"  [DEBUG] Server Status: {resp.status_code}")
                 # print(f"  [DEBUG] Server Body: {resp.text}")
@@ -49,11 +50,9 @@ class AuthServiceClient:
                 if resp.status_code != 200:
                     return f"Error: API returned {resp.status_code}"
 
-                all_users = resp.json()
-                
-                # 2. Фільтруємо на стороні клієнта
-                # Шукаємо того у кого емейл співпадає
-                found_user = next((u for u in all_users if u["email"] == email), None)
+                # Список з одного користувача або порожній
+                found_users = resp.json()
+                found_user = found_users[0] if found_users else None
                 
                 if found_user:
                     print(f"FOUND: ID {found_user['id']}")
@@ -44,14 +44,14 @@ async def get_user_by_email(email: str) -> str:
 
     async with httpx.AsyncClient() as client:
         try:
-            # Емуляція пошуку немає endpoint /users?email=...)
-            response = await client.get(f"{API_BASE_URL}/users")
+            # Пошук за email на сервері: /users?email=...
+            response = await client.get(f"{API_BASE_URL}/users", params={"email": email})
             
             if response.status_code != 200:
                 return f"API Error: {response.status_code}"
             
             users = response.json()
-            found = next((u for u in users if u["email"] == email), None)
+            found = users[0] if users else None
             
             if found:
                 return json.dumps(found, indent=2)
@@ -3,7 +3,7 @@ from datetime import datetime
 import requests
 
 from app.api.models import NotificationRequest, NotificationResponse, NotificationType
-from app.database import notifications_db, create_notification, get_user_notifications
+from app.database import notifications_db, create_notification, get_user_notifications_async, get_notifications_by_type
 # import pika
 import json
 
@@ -11,12 +11,12 @@ router = APIRouter()
 
 @router.get("/notifications/user/{user_id}", response_model=list[NotificationResponse])
 async def get_user_notifications_endpoint(user_id: str):
-    notifications = get_user_notifications(user_id)
+    notifications = await get_user_notifications_async(user_id)
     return [NotificationResponse(**notification) for notification in notifications]
 
 @router.get("/notifications/types/{notification_type}", response_model=list[NotificationResponse])
 async def get_notifications_by_type_endpoint(notification_type: str):
-    notifications = [n for n in notifications_db if n["notification_type"] == notification_type]
+    notifications = get_notifications_by_type(notification_type)
     return [NotificationResponse(**notification) for notification in notifications]
 
 # def publish_to_queue(notification_data: NotificationRequest):
@@ -41,4 +41,5 @@ async def get_notifications_by_type_endpoint(notification_type: str):
 
 @router.get("/notifications", response_model=list[NotificationResponse])
 async def get_notitications():
-    return notifications_db
\ No newline at end of file
+    notifications = await notifications_db.all_async()
+    return [NotificationResponse(**notification) for notification in notifications]
\ No newline at end of file
@@ -1,10 +1,11 @@
 import json
-from app.database import create_notification, inbox_db
+from app.database import create_notification_async, is_message_processed, mark_message_processed_async
 from app.api.models import NotificationType
 import logging
 import asyncio
 import aio_pika
 import random
+from shared.persistence import durable_writes
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ async def process_message(message: aio_pika.IncomingMessage):
             logger.info(f"Received event ID: {message_id}")
             logger.info(f"Received notification: {data}")
 
-            if message_id in [entry["id"] for entry in inbox_db]:
+            if is_message_processed(message_id):
                 logger.warning(f"Message ID {message_id} already processed. Skipping (Idempotency).")
                 return
 
@@ -44,16 +45,17 @@ async def process_message(message: aio_pika.IncomingMessage):
             #     # Кидаємо помилку, щоб message.process(requeue=False) відхилив повідомлення
             #     raise Exception("SAGA Step Failure: Notification Service deliberately failed to process.")
 
-            notification = await asyncio.to_thread(
-                create_notification,
-                user_id=user_id,
-                notification_type=notification_type,
-                subject=subject,
-                message=message_content,
-                metadata=metadata
-            )
-            
-            inbox_db.append({"id": message_id})
+            # ACK відправляється лише після того, як обидві зміни записано на диск (без блокування event loop)
+            async with durable_writes():
+                notification = await create_notification_async(
+                    user_id=user_id,
+                    notification_type=notification_type,
+                    subject=subject,
+                    message=message_content,
+                    metadata=metadata
+                )
+                
+                await mark_message_processed_async(message_id)
 
             logger.info(f"Notification stored: {notification['id']}")
 
@@ -1,30 +1,69 @@
 from datetime import datetime
-import uuid
-from shared.unique_id import generate_unique_id
+from shared.unique_id import generate_id
+from shared.repository import MultiIndex
+from shared.storage import open_repository
+from shared.records import Record
+from app.api.models import NotificationType
 
-# Тимчасова база даних в пам'яті
-notifications_db = []
-inbox_db = []
+class NotificationRecord(Record):
+    __slots__ = ("id", "user_id", "notification_type", "subject", "message", "metadata", "sent_at", "status")
+    TIMESTAMPS = frozenset({"sent_at"})
+    ENUMS = {"notification_type": NotificationType}
+    INTERNED = frozenset({"user_id", "status"})
 
-def create_notification(user_id: str, notification_type: str, subject: str, message: str, metadata: dict = None):
-    notification_id = generate_unique_id(notifications_db)
-    
-    notification = {
-        "id": notification_id,
-        "user_id": user_id,
-        "notification_type": notification_type,
-        "subject": subject,
-        "message": message,
-        "metadata": metadata or {},
-        "sent_at": datetime.now(),
-        "status": "sent"  # В реальному додатку буде "pending", "sent", "failed"
-    }
+    def __getitem__(self, field):
+        # Порожні metadata не зберігаються окремим dict у кожному записі
+        if field == "metadata":
+            return self.metadata if self.metadata is not None else {}
+        return super().__getitem__(field)
+
+# База даних сервісу: у пам'яті або в SQLite (STORAGE_BACKEND, див. shared/storage.py)
+notifications_db = open_repository("notifications", indexes={
+    "user_id": MultiIndex("user_id"),
+    "notification_type": MultiIndex("notification_type"),
+})
+# ID оброблених повідомлень (ідемпотентність consumer)
+inbox_db = open_repository("inbox")
+
+def _new_notification(user_id: str, notification_type: str, subject: str, message: str,
+                      metadata: dict = None) -> NotificationRecord:
+    notification_id = generate_id()
     
-    notifications_db.append(notification)
-    return notification
+    return NotificationRecord(
+        id=notification_id,
+        user_id=user_id,
+        notification_type=notification_type,
+        subject=subject,
+        message=message,
+        metadata=metadata or None,
+        sent_at=datetime.now(),
+        status="sent"  # В реальному додатку буде "pending", "sent", "failed"
+    )
+
+def create_notification(user_id: str, notification_type: str, subject: str, message: str, metadata: dict = None):
+    return notifications_db.insert(_new_notification(user_id, notification_type, subject, message, metadata))
+
+async def create_notification_async(user_id: str, notification_type: str, subject: str, message: str,
+                                    metadata: dict = None):
+    """Як create_notification, але без блокування event loop на час запису (для бекенду sqlite)"""
+    return await notifications_db.insert_async(
+        _new_notification(user_id, notification_type, subject, message, metadata))
 
 def get_user_notifications(user_id: str):
-    return [n for n in notifications_db if n["user_id"] == user_id]
+    return notifications_db.find("user_id", user_id)
+
+async def get_user_notifications_async(user_id: str):
+    """Як get_user_notifications, але без блокування event loop (для бекенду sqlite)"""
+    return await notifications_db.find_async("user_id", user_id)
 
 def get_notifications_by_type(notification_type: str):
-    return [n for n in notifications_db if n["notification_type"] == notification_type]
\ No newline at end of file
+    return notifications_db.find("notification_type", notification_type)
+
+def is_message_processed(message_id: str) -> bool:
+    return message_id in inbox_db
+
+def mark_message_processed(message_id: str):
+    inbox_db.insert({"id": message_id})
+
+async def mark_message_processed_async(message_id: str):
+    await inbox_db.insert_async({"id": message_id})
\ No newline at end of file
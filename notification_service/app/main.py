@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from shared.persistence import DurableWritesMiddleware
 from app.api.routes import router
 from app.consumer import start_consumer
 import threading
@@ -35,6 +36,9 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(title="Notification Service", version="1.0.0",lifespan=lifespan)
 
+# Очікування fsync журналу (PERSISTENCE_FSYNC=always) - поза event loop, перед відправкою відповіді
+app.add_middleware(DurableWritesMiddleware)
+
 # Підключаємо всі маршрути
 app.include_router(router)
 
@@ -47,6 +51,12 @@ async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # UVICORN_UDS=/run/services/<name>.sock - слухати Unix-сокет замість TCP (gateway на тому ж хості)
+    uds = os.getenv("UVICORN_UDS")
+    if uds:
+        uvicorn.run(app, uds=uds)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
  
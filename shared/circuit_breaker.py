@@ -1,49 +1,187 @@
 import time
+import threading
+from collections import deque
 from enum import Enum
 
+try:
+    from prometheus_client import Gauge
+    CIRCUIT_STATE = Gauge(
+        'circuit_breaker_state', 'Circuit breaker state (0=closed, 1=half_open, 2=open)',
+        ['name']
+    )
+except ImportError:
+    # prometheus_client є не в усіх сервісах - тоді стан просто не експортується
+    CIRCUIT_STATE = None
+
 class CircuitState(Enum):
     CLOSED = "closed"
-    OPEN = "open" 
+    OPEN = "open"
     HALF_OPEN = "half_open"
 
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Виклик відхилено без звернення до сервісу, бо circuit breaker відкритий"""
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit breaker '{name}' is OPEN")
+        self.name = name
+        self.retry_after = retry_after
+
 class CircuitBreaker:
-    def __init__(self, failure_threshold=5, recovery_timeout=30):
-        self.failure_threshold = failure_threshold
+    """
+    Circuit breaker з оцінкою частки помилок у ковзному вікні.
+    Вікно складається з посекундних кошиків, тому оцінка коштує O(window_seconds).
+    Після recovery_timeout пропускається не більше half_open_max_calls пробних викликів.
+    Працює як із синхронним кодом (call), так і з asyncio (call_async);
+    блокування не утримується під час самого виклику.
+
+    Для ручного використання: token = before_call(), потім record_*(token).
+    Токен - (покоління стану, чи це пробний виклик). Покоління змінюється при кожному
+    переході стану, тож результати викликів, допущених до переходу, не впливають на новий стан.
+    """
+    def __init__(self, name="default", failure_rate_threshold=0.5, window_seconds=30,
+                 minimum_calls=10, recovery_timeout=30, half_open_max_calls=3, clock=time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = window_seconds
+        self.minimum_calls = minimum_calls
         self.recovery_timeout = recovery_timeout
-        self.failure_count = 0
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
         self.state = CircuitState.CLOSED
-        self.last_failure_time = None
-    
+        self.opened_at = None
+        # Кошики [секунда, успіхи, помилки]
+        self._buckets = deque()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._export_state()
+
+    # --- Публічний API ---
+
     def call(self, func, *args, **kwargs):
-        if self.state == CircuitState.OPEN:
-            if time.time() - self.last_failure_time > self.recovery_timeout:
-                self.state = CircuitState.HALF_OPEN
-            else:
-                raise Exception("Circuit breaker is OPEN")
-        
+        token = self.before_call()
         try:
             result = func(*args, **kwargs)
-            self._on_success()
-            return result
-        except Exception as e:
-            self._on_failure()
-            raise e
-    
-    def _on_success(self):
-        self.failure_count = 0
-        self.state = CircuitState.CLOSED
-    
-    def _on_failure(self):
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-        
-        if self.failure_count >= self.failure_threshold:
-            self.state = CircuitState.OPEN
+        except Exception:
+            self.record_failure(token)
+            raise
+        except BaseException:
+            self.record_ignored(token)
+            raise
+        self.record_success(token)
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        token = self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self.record_failure(token)
+            raise
+        except BaseException:
+            self.record_ignored(token)
+            raise
+        self.record_success(token)
+        return result
+
+    def before_call(self) -> tuple:
+        """Дозволяє виклик (повертає токен для record_*) або кидає CircuitOpenError"""
+        with self._lock:
+            now = self.clock()
+            if self.state == CircuitState.OPEN:
+                elapsed = now - self.opened_at
+                if elapsed < self.recovery_timeout:
+                    raise CircuitOpenError(self.name, self.recovery_timeout - elapsed)
+                self._transition(CircuitState.HALF_OPEN)
+
+            if self.state == CircuitState.HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, 1.0)
+                self._half_open_in_flight += 1
+                return (self._generation, True)
+            return (self._generation, False)
+
+    def record_success(self, token: tuple):
+        with self._lock:
+            generation, probe = token
+            if generation != self._generation:
+                # Виклик допущено до останньої зміни стану - його результат уже нічого не означає
+                return
+            if probe:
+                self._half_open_in_flight -= 1
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition(CircuitState.CLOSED)
+                return
+            self._record(self.clock(), failed=False)
+
+    def record_failure(self, token: tuple):
+        with self._lock:
+            generation, probe = token
+            if generation != self._generation:
+                return
+            now = self.clock()
+            if probe:
+                # Пробний виклик не вдався - сервіс ще не відновився
+                self._half_open_in_flight -= 1
+                self._transition(CircuitState.OPEN, now)
+                return
+            self._record(now, failed=True)
+            calls, failures = self._totals(now)
+            if calls >= self.minimum_calls and failures / calls >= self.failure_rate_threshold:
+                self._transition(CircuitState.OPEN, now)
+
+    def record_ignored(self, token: tuple):
+        """Виклик не дав результату (наприклад, скасований) - лише звільняє пробний слот"""
+        with self._lock:
+            generation, probe = token
+            if probe and generation == self._generation:
+                self._half_open_in_flight -= 1
+
+    # --- Внутрішні методи (викликаються під блокуванням) ---
+
+    def _record(self, now, failed):
+        second = int(now)
+        # Старі кошики видаляємо й тут: за самих успіхів _totals не викликається
+        oldest = second - self.window_seconds
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+        if self._buckets and self._buckets[-1][0] == second:
+            bucket = self._buckets[-1]
+        else:
+            bucket = [second, 0, 0]
+            self._buckets.append(bucket)
+        bucket[2 if failed else 1] += 1
+
+    def _totals(self, now):
+        oldest = int(now) - self.window_seconds
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+        successes = sum(b[1] for b in self._buckets)
+        failures = sum(b[2] for b in self._buckets)
+        return successes + failures, failures
+
+    def _transition(self, state, now=None):
+        self.state = state
+        self._generation += 1
+        if state == CircuitState.OPEN:
+            self.opened_at = now
+        else:
+            self._buckets.clear()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._export_state()
+
+    def _export_state(self):
+        if CIRCUIT_STATE is not None:
+            CIRCUIT_STATE.labels(name=self.name).set(_STATE_VALUES[self.state])
 
 # Глобальний circuit breaker для міжсервісних викликів
-auth_service_cb = CircuitBreaker()
-board_service_cb = CircuitBreaker()
-subscription_service_cb = CircuitBreaker()
-task_server_cb = CircuitBreaker()
- 
- 
\ No newline at end of file
+auth_service_cb = CircuitBreaker("auth-service")
+board_service_cb = CircuitBreaker("board-service")
+subscription_service_cb = CircuitBreaker("subscription-service")
+task_server_cb = CircuitBreaker("task-service")
+
+
@@ -0,0 +1,381 @@
+import asyncio
+import atexit
+import logging
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from copy import copy
+
+from shared.repository import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Очікування fsync, відкладене до кінця запиту (див. durable_writes)
+_deferred: ContextVar["_DeferredWait | None"] = ContextVar("deferred_durability", default=None)
+
+# Кадр журналу: довжина і crc32 тіла, далі pickle (операція, аргументи)
+_FRAME = struct.Struct("<II")
+
+
+def _fsync_directory(path: str):
+    # Після rename/створення файлу фіксуємо й сам каталог, інакше запис каталогу може загубитися
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """
+    Журнал змін одного Repository: сегменти <name>.wal.<N> і знімок <name>.snapshot.
+    Знімок зберігає номер сегмента, з якого треба продовжити відтворення.
+    """
+
+    def __init__(self, persistence: "Persistence", repository):
+        self.persistence = persistence
+        self.repository = repository
+        self.name = repository.name
+        self.directory = persistence.directory
+        # Сегмент, у який потрапить наступний поставлений у чергу кадр
+        self.segment = 0
+        # Сегмент відкритого файлу (змінює лише потік-flusher)
+        self._file_segment = 0
+        # Кадри, ще не записані на диск; int - маркер переходу на сегмент з цим номером
+        self.pending: list = []
+        # Скільки байтів журналу накопичилося з моменту останнього знімка
+        self.size = 0
+        self._file = None
+
+    # --- Шляхи ---
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{self.name}.wal.{segment}")
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}.snapshot")
+
+    def _segments(self) -> list[int]:
+        pattern = re.compile(rf"^{re.escape(self.name)}\.wal\.(\d+)$")
+        found = (pattern.match(entry) for entry in os.listdir(self.directory))
+        return sorted(int(match.group(1)) for match in found if match)
+
+    # --- Запис (append викликається під блокуванням репозиторію) ---
+
+    def append(self, operation: str, args: tuple) -> int:
+        payload = pickle.dumps((operation, args), protocol=5)
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        return self.persistence.enqueue(self, frame)
+
+    def wait(self, ticket: int):
+        deferred = _deferred.get()
+        if deferred is not None:
+            # Усередині durable_writes: чекаємо пізніше, не блокуючи event loop
+            deferred.add(self.persistence, ticket)
+            return
+        self.persistence.wait(ticket)
+
+    def write_pending(self, items: list):
+        """Викликається лише потоком-flusher: пише кадри і переходить на нові сегменти"""
+        for item in items:
+            if isinstance(item, int):
+                self._close_file()
+                self._file_segment = item
+                continue
+            if self._file is None:
+                self._file = open(self._segment_path(self._file_segment), "ab")
+            self._file.write(item)
+
+    def sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _close_file(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    # --- Відновлення ---
+
+    def recover(self):
+        """Завантажує знімок і відтворює хвіст журналу. Журнал ще не підключено до репозиторію."""
+        repository = self.repository
+        start_segment = 0
+        snapshot_path = self._snapshot_path()
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+            start_segment = snapshot["segment"]
+            repository.load(snapshot["records"])
+
+        segments = [s for s in self._segments() if s >= start_segment]
+        replayed = 0
+        for segment in segments:
+            replayed += self._replay(self._segment_path(segment))
+        # Нові записи - в окремий сегмент; старі видалить наступний знімок
+        self.segment = self._file_segment = (segments[-1] + 1) if segments else start_segment
+        logger.info(f"Repository '{self.name}' recovered: {len(repository)} records, {replayed} WAL entries")
+
+    def _replay(self, path: str) -> int:
+        repository = self.repository
+        replayed = 0
+        with open(path, "r+b") as f:
+            data = f.read()
+            offset = 0
+            while offset + _FRAME.size <= len(data):
+                length, checksum = _FRAME.unpack_from(data, offset)
+                payload = data[offset + _FRAME.size: offset + _FRAME.size + length]
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                operation, args = pickle.loads(payload)
+                try:
+                    getattr(repository, operation)(*args)
+                except DuplicateKeyError:
+                    # Кадр, повторно записаний після помилки диска - запис уже відновлено
+                    pass
+                offset += _FRAME.size + length
+                replayed += 1
+            self.size += offset
+            if offset < len(data):
+                # Недописаний кадр (падіння під час запису) - відкидаємо хвіст
+                logger.warning(f"Truncating torn WAL tail in {path} at offset {offset}")
+                f.truncate(offset)
+        return replayed
+
+    # --- Знімок ---
+
+    def snapshot(self):
+        """Зберігає стан репозиторію і видаляє сегменти журналу, які він покриває"""
+        repository = self.repository
+        # Під блокуванням лише копіюємо записи (поверхнево - значення полів замінюються, а не змінюються)
+        # і ставимо маркер переходу на новий сегмент: усе, що після нього, знімок не містить
+        with repository._lock:
+            records = [copy(record) for record in repository._records.values()]
+            segment = self.persistence.rotate(self)
+
+        temporary = self._snapshot_path() + ".tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump({"segment": segment, "records": records}, f, protocol=5)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._snapshot_path())
+        _fsync_directory(self.directory)
+
+        for old in self._segments():
+            if old < segment:
+                os.remove(self._segment_path(old))
+        logger.info(f"Snapshot of '{self.name}' written: {len(records)} records")
+
+
+class Persistence:
+    """
+    Знімки та журнал змін (WAL) для репозиторіїв у пам'яті одного сервісу.
+
+    Зміни накопичуються в пам'яті й скидаються на диск одним потоком-flusher:
+    один fsync на пакет змін від усіх потоків (group commit).
+    fsync_mode="always" - зміна повертається лише після fsync її пакета;
+    fsync_mode="batch"  - пакет скидається раз на flush_interval; при падінні процесу чи ОС
+                          можна втратити зміни за останні flush_interval секунд.
+    Коли журнал репозиторію перевищує wal_max_bytes, він ущільнюється у знімок.
+    """
+
+    def __init__(self, directory: str, fsync_mode: str = "batch", flush_interval: float = 0.01,
+                 wal_max_bytes: int = 64 * 1024 * 1024, check_interval: float = 5.0):
+        if fsync_mode not in ("always", "batch"):
+            raise ValueError(f"Unknown fsync mode: {fsync_mode}")
+        self.directory = directory
+        self.fsync_mode = fsync_mode
+        self.flush_interval = flush_interval
+        self.wal_max_bytes = wal_max_bytes
+        self.check_interval = check_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.journals: list[Journal] = []
+        self._condition = threading.Condition()
+        self._dirty: set[Journal] = set()
+        self._enqueued = 0
+        self._durable = 0
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+        self._flusher.start()
+        self._compactor = threading.Thread(target=self._compact_loop, name="wal-compactor", daemon=True)
+        self._compactor.start()
+        atexit.register(self.close)
+
+    def attach(self, repository):
+        """Відновлює стан репозиторію з диска і вмикає для нього журнал"""
+        journal = Journal(self, repository)
+        journal.recover()
+        repository.journal = journal
+        self.journals.append(journal)
+        return journal
+
+    # --- Черга записів ---
+
+    def enqueue(self, journal: Journal, frame: bytes) -> int:
+        with self._condition:
+            journal.pending.append(frame)
+            journal.size += len(frame)
+            self._dirty.add(journal)
+            self._enqueued += 1
+            if self.fsync_mode == "always":
+                self._condition.notify_all()
+            return self._enqueued
+
+    def rotate(self, journal: Journal) -> int:
+        """Ставить маркер нового сегмента; повертає його номер"""
+        with self._condition:
+            journal.segment += 1
+            journal.pending.append(journal.segment)
+            journal.size = 0
+            self._dirty.add(journal)
+            self._condition.notify_all()
+            return journal.segment
+
+    def wait(self, ticket: int):
+        if self.fsync_mode != "always":
+            return
+        with self._condition:
+            while self._durable < ticket and not self._closed:
+                self._condition.wait()
+
+    def flush(self):
+        """Скидає на диск усе, що вже поставлено в чергу"""
+        with self._condition:
+            ticket = self._enqueued
+            self._condition.notify_all()
+            while self._durable < ticket and not self._closed:
+                self._condition.wait()
+
+    # --- Фонові потоки ---
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                if self.fsync_mode == "always":
+                    while not self._dirty and not self._closed:
+                        self._condition.wait()
+                else:
+                    self._condition.wait_for(lambda: self._closed, timeout=self.flush_interval)
+                closed = self._closed
+                batch = [(journal, journal.pending) for journal in self._dirty]
+                for journal in self._dirty:
+                    journal.pending = []
+                self._dirty = set()
+                ticket = self._enqueued
+            failed = []
+            for journal, items in batch:
+                try:
+                    journal.write_pending(items)
+                    journal.sync()
+                except OSError as e:
+                    logger.error(f"WAL write for '{journal.name}' failed, will retry: {e}")
+                    with suppress(OSError):
+                        journal._file.close()
+                    journal._file = None
+                    failed.append((journal, items))
+            with self._condition:
+                if failed:
+                    # Повертаємо пакет у чергу перед новішими кадрами; очікувачі чекають далі
+                    for journal, items in failed:
+                        journal.pending = items + journal.pending
+                        self._dirty.add(journal)
+                else:
+                    self._durable = ticket
+                self._condition.notify_all()
+            if failed and not closed:
+                time.sleep(self.flush_interval)
+                continue
+            if closed:
+                for journal in self.journals:
+                    journal._close_file()
+                return
+
+    def _compact_loop(self):
+        while not self._closed:
+            time.sleep(self.check_interval)
+            for journal in list(self.journals):
+                if journal.size > self.wal_max_bytes:
+                    try:
+                        journal.snapshot()
+                    except Exception as e:
+                        logger.error(f"Snapshot of '{journal.name}' failed: {e}")
+
+    def close(self):
+        """Скидає журнал на диск і зупиняє фонові потоки (викликається й при виході процесу)"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+
+
+class _DeferredWait:
+    """Найбільший ticket кожного Persistence, записаний у межах durable_writes"""
+    __slots__ = ("tickets",)
+
+    def __init__(self):
+        self.tickets: dict[Persistence, int] = {}
+
+    def add(self, persistence: Persistence, ticket: int):
+        if ticket > self.tickets.get(persistence, 0):
+            self.tickets[persistence] = ticket
+
+    async def wait(self):
+        # Забираємо tickets одразу: нові зміни під час очікування дочекаються наступного виклику
+        tickets, self.tickets = self.tickets, {}
+        for persistence, ticket in tickets.items():
+            if persistence.fsync_mode == "always":
+                await asyncio.to_thread(persistence.wait, ticket)
+
+
+@asynccontextmanager
+async def durable_writes():
+    """
+    Зміни репозиторіїв усередині блоку не чекають fsync (PERSISTENCE_FSYNC=always) у потоці,
+    що їх зробив; очікування виконується при виході з блоку в пулі потоків, не блокуючи event loop.
+    Для асинхронного коду, який не проходить через DurableWritesMiddleware (напр. consumer черги).
+    """
+    deferred = _DeferredWait()
+    token = _deferred.set(deferred)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    await deferred.wait()
+
+
+class DurableWritesMiddleware:
+    """
+    ASGI middleware: обробники, що змінюють репозиторії, не блокують event loop очікуванням fsync.
+    Відповідь (кожне її повідомлення) відправляється лише після того, як зроблені до неї зміни
+    записані на диск, тож гарантія PERSISTENCE_FSYNC=always для клієнта зберігається.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        deferred = _DeferredWait()
+        token = _deferred.set(deferred)
+
+        async def durable_send(message):
+            if deferred.tickets:
+                await deferred.wait()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, durable_send)
+        finally:
+            _deferred.reset(token)
@@ -0,0 +1,133 @@
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Час зберігається цілим числом мікросекунд від епохи (int займає менше, ніж datetime).
+# Відлік від "наївної" епохи: datetime.now() відновлюється точно, без перетворення часових поясів.
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            # Час з поясом приводимо до UTC, щоб усі значення поля були порівнюваними
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - _EPOCH) // _MICROSECOND
+    return value
+
+
+def from_epoch(value):
+    if isinstance(value, int):
+        return _EPOCH + value * _MICROSECOND
+    return value
+
+
+def intern_value(enum_class, value):
+    """Член enum (один об'єкт на значення) або інтернований рядок, якщо значення поза enum"""
+    if value is None or isinstance(value, enum_class):
+        return value
+    try:
+        return enum_class(value)
+    except ValueError:
+        return sys.intern(str(value))
+
+
+class Record:
+    """
+    Компактний запис зі __slots__ замість dict на кожен рядок.
+    Підтримує доступ як до dict (record["status"], get, keys, **record), тож код,
+    що працював зі словниками, і Pydantic-моделі (Model(**record)) працюють без змін.
+
+    У підкласі:
+      __slots__  - поля, що зберігаються;
+      TIMESTAMPS - поля datetime, що зберігаються як int (to_epoch);
+      ENUMS      - поле -> клас Enum, значення зберігаються як члени enum;
+      INTERNED   - рядкові поля, що часто повторюються (ID користувачів, дошок).
+    """
+    __slots__ = ()
+    TIMESTAMPS: frozenset = frozenset()
+    ENUMS: dict = {}
+    INTERNED: frozenset = frozenset()
+    FIELDS: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.__slots__)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            self[field] = values.get(field)
+        # Обчислювані поля підкласу (якщо є) встановлюються через їх __setitem__
+        for field, value in values.items():
+            if field not in self._FIELD_SET:
+                self[field] = value
+
+    # --- Доступ як до словника ---
+
+    def __getitem__(self, field):
+        if field not in self._FIELD_SET:
+            raise KeyError(field)
+        value = getattr(self, field)
+        if field in self.TIMESTAMPS:
+            return from_epoch(value)
+        return value
+
+    def __setitem__(self, field, value):
+        if field not in self._FIELD_SET:
+            raise KeyError(field)
+        if field in self.TIMESTAMPS:
+            value = to_epoch(value)
+        elif field in self.ENUMS:
+            value = intern_value(self.ENUMS[field], value)
+        elif field in self.INTERNED and value is not None:
+            value = sys.intern(value)
+        object.__setattr__(self, field, value)
+
+    def __contains__(self, field) -> bool:
+        return field in self.keys()
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def keys(self) -> tuple:
+        return self.FIELDS
+
+    def to_dict(self) -> dict:
+        return {field: self[field] for field in self.keys()}
+
+    # --- Копіювання, порівняння, pickle ---
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    @classmethod
+    def _from_values(cls, values: tuple):
+        record = cls.__new__(cls)
+        for field, value in zip(cls.FIELDS, values):
+            object.__setattr__(record, field, value)
+        return record
+
+    def __reduce__(self):
+        # Кортеж значень без імен полів - знімки і журнал змін стають компактнішими
+        return (self._from_values, (self._values(),))
+
+    def copy(self):
+        return self._from_values(self._values())
+
+    __copy__ = copy
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self._values() == other._values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
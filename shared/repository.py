@@ -0,0 +1,359 @@
+import threading
+from enum import Enum
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+
+_MISSING = object()
+
+
+def _normalize(value):
+    # Enum(str) хешується за іменем, а не значенням - індексуємо значення,
+    # щоб пошук за "welcome" і за NotificationType.WELCOME давав однаковий результат
+    return value.value if isinstance(value, Enum) else value
+
+
+class DuplicateKeyError(Exception):
+    """Запис порушує унікальний індекс (або первинний ключ)"""
+    def __init__(self, index, value):
+        super().__init__(f"Duplicate value {value!r} for unique index '{index}'")
+        self.index = index
+        self.value = value
+
+
+class Index:
+    """
+    Базовий індекс. key - функція, що дістає ключ із запису (за замовчуванням поле field).
+    Записи з ключем None не індексуються.
+    each=True - поле є списком, і запис індексується за кожним його елементом.
+    """
+    unique = False
+
+    def __init__(self, field: str, key=None, each: bool = False):
+        self.field = field
+        self.key = key or itemgetter(field)
+        self.each = each
+
+    def keys_of(self, record) -> tuple:
+        return self.values(self.stored_key(record))
+
+    def stored_key(self, record):
+        """Ключ у вигляді, який репозиторій пам'ятає для запису: значення (або None),
+        а для each=True - кортеж значень. Окремий кортеж на кожне значення не створюється."""
+        value = self.key(record)
+        if value is None:
+            return () if self.each else None
+        if self.each:
+            # dict.fromkeys - прибирає дублікати, зберігаючи порядок
+            return tuple(dict.fromkeys(_normalize(v) for v in value if v is not None))
+        return _normalize(value)
+
+    def values(self, stored) -> tuple:
+        if self.each:
+            return stored
+        return () if stored is None else (stored,)
+
+    def add(self, value, pk): ...
+    def remove(self, value, pk): ...
+
+
+class UniqueIndex(Index):
+    """Хеш-індекс значення -> первинний ключ"""
+    unique = True
+
+    def __init__(self, field: str, key=None, each: bool = False):
+        super().__init__(field, key, each)
+        self.entries: dict = {}
+
+    def conflicts(self, value, pk) -> bool:
+        owner = self.entries.get(value, pk)
+        return owner != pk
+
+    def add(self, value, pk):
+        self.entries[value] = pk
+
+    def remove(self, value, pk):
+        if self.entries.get(value) == pk:
+            del self.entries[value]
+
+    def lookup(self, value) -> list:
+        pk = self.entries.get(value)
+        return [] if pk is None else [pk]
+
+    def count(self, value) -> int:
+        return 1 if value in self.entries else 0
+
+
+class MultiIndex(Index):
+    """Хеш-індекс значення -> первинні ключі (у порядку додавання)"""
+
+    def __init__(self, field: str, key=None, each: bool = False):
+        super().__init__(field, key, each)
+        self.entries: dict[object, dict] = {}
+
+    def add(self, value, pk):
+        self.entries.setdefault(value, {})[pk] = None
+
+    def remove(self, value, pk):
+        bucket = self.entries.get(value)
+        if bucket is not None:
+            bucket.pop(pk, None)
+            if not bucket:
+                del self.entries[value]
+
+    def lookup(self, value) -> list:
+        return list(self.entries.get(value, ()))
+
+    def count(self, value) -> int:
+        return len(self.entries.get(value, ()))
+
+
+class RangeIndex(Index):
+    """Впорядкований індекс (наприклад, за datetime) для вибірок за діапазоном"""
+
+    def __init__(self, field: str, key=None):
+        super().__init__(field, key)
+        # Відсортовані пари (значення, первинний ключ)
+        self.entries: list[tuple] = []
+
+    def add(self, value, pk):
+        insort(self.entries, (value, pk))
+
+    def remove(self, value, pk):
+        position = bisect_left(self.entries, (value, pk))
+        if position < len(self.entries) and self.entries[position] == (value, pk):
+            del self.entries[position]
+
+    def lookup(self, value) -> list:
+        return self.between(value, value, include_end=True)
+
+    def count(self, value) -> int:
+        return len(self.lookup(value))
+
+    def between(self, start=None, end=None, include_end: bool = False, limit: int | None = None) -> list:
+        """Первинні ключі записів зі start <= значення < end (None - без межі), не більше limit"""
+        low = 0 if start is None else bisect_left(self.entries, start, key=itemgetter(0))
+        if end is None:
+            high = len(self.entries)
+        elif include_end:
+            high = bisect_right(self.entries, end, key=itemgetter(0))
+        else:
+            high = bisect_left(self.entries, end, key=itemgetter(0))
+        if limit is not None:
+            high = min(high, low + limit)
+        return [pk for _, pk in self.entries[low:high]]
+
+
+class Repository:
+    """
+    Колекція записів у пам'яті з хеш-індексом за первинним ключем і вторинними індексами.
+    Записи зберігаються в порядку вставки (як у списку, який вона замінює).
+
+    Усі зміни мають проходити через insert/update/delete: індекси оновлюються
+    під блокуванням разом із записом, а при порушенні унікальності зміна відкочується.
+    Записи, повернуті з get/find, не можна змінювати напряму - лише через update.
+    """
+
+    def __init__(self, name: str, primary_key: str = "id", indexes: dict[str, Index] | None = None):
+        self.name = name
+        self.primary_key = primary_key
+        self.indexes: dict[str, Index] = indexes or {}
+        self._index_list = list(self.indexes.items())
+        self._records: dict = {}
+        # Ключі, під якими запис зараз лежить в індексах (кортеж у порядку _index_list)
+        self._index_keys: dict = {}
+        self._lock = threading.RLock()
+        # Журнал змін для відновлення після перезапуску (див. shared.persistence)
+        self.journal = None
+
+    # --- Читання ---
+
+    def get(self, pk):
+        return self._records.get(pk)
+
+    def __contains__(self, pk) -> bool:
+        return pk in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def all(self) -> list:
+        with self._lock:
+            return list(self._records.values())
+
+    def find(self, index: str, value) -> list:
+        with self._lock:
+            return [self._records[pk] for pk in self.indexes[index].lookup(_normalize(value))]
+
+    def find_one(self, index: str, value):
+        with self._lock:
+            pks = self.indexes[index].lookup(_normalize(value))
+            return self._records[pks[0]] if pks else None
+
+    def count(self, index: str, value) -> int:
+        with self._lock:
+            return self.indexes[index].count(_normalize(value))
+
+    def range(self, index: str, start=None, end=None, limit: int | None = None) -> list:
+        """Записи, у яких значення RangeIndex лежить у [start, end), у порядку індексу"""
+        with self._lock:
+            return [self._records[pk] for pk in self.indexes[index].between(start, end, limit=limit)]
+
+    # Той самий інтерфейс, що й у SqliteRepository; у пам'яті читання не блокує event loop
+
+    async def get_async(self, pk):
+        return self.get(pk)
+
+    async def all_async(self) -> list:
+        return self.all()
+
+    async def find_async(self, index: str, value) -> list:
+        return self.find(index, value)
+
+    async def range_async(self, index: str, start=None, end=None, limit: int | None = None) -> list:
+        return self.range(index, start, end, limit)
+
+    # --- Зміни ---
+    # Якщо підключено журнал (shared.persistence), кожна зміна записується в нього під тим самим
+    # блокуванням, що й застосовується, а очікування fsync відбувається вже після його зняття.
+
+    def insert(self, record):
+        pk = record[self.primary_key]
+        with self._lock:
+            if pk in self._records:
+                raise DuplicateKeyError(self.primary_key, pk)
+            keys = self._compute_keys(record)
+            self._check_unique(keys, pk)
+            self._records[pk] = record
+            self._index_keys[pk] = keys
+            self._add_keys(keys, pk)
+            ticket = self._log("insert", record)
+        self._wait_durable(ticket)
+        return record
+
+    def load(self, records):
+        """Масове завантаження (відновлення зі знімка): без журналу, одне блокування на всі записи"""
+        primary_key = self.primary_key
+        indexes = [index for _, index in self._index_list]
+        has_unique = any(index.unique for index in indexes)
+        with self._lock:
+            for record in records:
+                pk = record[primary_key]
+                if pk in self._records:
+                    raise DuplicateKeyError(primary_key, pk)
+                keys = tuple([index.stored_key(record) for index in indexes])
+                if has_unique:
+                    self._check_unique(keys, pk)
+                self._records[pk] = record
+                self._index_keys[pk] = keys
+                for index, key in zip(indexes, keys):
+                    for value in index.values(key):
+                        index.add(value, pk)
+
+    def update(self, pk, changes: dict):
+        """Змінює поля запису і перебудовує лише ті індекси, ключі яких змінилися"""
+        with self._lock:
+            record = self._records.get(pk)
+            if record is None:
+                return None
+            if self.primary_key in changes and changes[self.primary_key] != pk:
+                raise ValueError("Primary key cannot be changed")
+            previous = {field: record.get(field, _MISSING) for field in changes}
+            for field, value in changes.items():
+                record[field] = value
+            keys = self._compute_keys(record)
+            try:
+                self._check_unique(keys, pk)
+            except DuplicateKeyError:
+                for field, value in previous.items():
+                    if value is _MISSING:
+                        del record[field]
+                    else:
+                        record[field] = value
+                raise
+            old_keys = self._index_keys[pk]
+            for (_, index), key, old_key in zip(self._index_list, keys, old_keys):
+                if key != old_key:
+                    for value in index.values(old_key):
+                        index.remove(value, pk)
+                    for value in index.values(key):
+                        index.add(value, pk)
+            self._index_keys[pk] = keys
+            ticket = self._log("update", pk, changes)
+        self._wait_durable(ticket)
+        return record
+
+    def delete(self, pk):
+        with self._lock:
+            record, ticket = self._delete(pk)
+        self._wait_durable(ticket)
+        return record
+
+    def delete_where(self, index: str, value) -> int:
+        """Видаляє всі записи з даним значенням індексу, повертає їх кількість"""
+        ticket = None
+        with self._lock:
+            pks = self.indexes[index].lookup(_normalize(value))
+            for pk in pks:
+                _, ticket = self._delete(pk)
+        self._wait_durable(ticket)
+        return len(pks)
+
+    def clear(self):
+        ticket = None
+        with self._lock:
+            for pk in list(self._records):
+                _, ticket = self._delete(pk)
+        self._wait_durable(ticket)
+
+    # Той самий інтерфейс, що й у SqliteRepository. У пам'яті зміна не блокує event loop,
+    # а очікування fsync відкладають DurableWritesMiddleware і durable_writes (shared.persistence)
+
+    async def insert_async(self, record):
+        return self.insert(record)
+
+    async def update_async(self, pk, changes: dict):
+        return self.update(pk, changes)
+
+    async def delete_async(self, pk):
+        return self.delete(pk)
+
+    async def delete_where_async(self, index: str, value) -> int:
+        return self.delete_where(index, value)
+
+    # --- Внутрішні методи (викликаються під блокуванням) ---
+
+    def _delete(self, pk):
+        record = self._records.pop(pk, None)
+        if record is None:
+            return None, None
+        for (_, index), key in zip(self._index_list, self._index_keys.pop(pk)):
+            for value in index.values(key):
+                index.remove(value, pk)
+        return record, self._log("delete", pk)
+
+    def _log(self, operation: str, *args):
+        if self.journal is None:
+            return None
+        return self.journal.append(operation, args)
+
+    def _wait_durable(self, ticket):
+        if ticket is not None:
+            self.journal.wait(ticket)
+
+    def _compute_keys(self, record) -> tuple:
+        return tuple([index.stored_key(record) for _, index in self._index_list])
+
+    def _check_unique(self, keys: tuple, pk):
+        for (name, index), key in zip(self._index_list, keys):
+            if index.unique:
+                for value in index.values(key):
+                    if index.conflicts(value, pk):
+                        raise DuplicateKeyError(name, value)
+
+    def _add_keys(self, keys: tuple, pk):
+        for (_, index), key in zip(self._index_list, keys):
+            for value in index.values(key):
+                index.add(value, pk)
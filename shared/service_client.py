@@ -0,0 +1,32 @@
+import os
+
+import httpx
+
+# Таймаут викликів до інших сервісів (секунди)
+INTER_SERVICE_TIMEOUT = float(os.getenv("INTER_SERVICE_TIMEOUT", "3"))
+
+# Один клієнт на процес: з'єднання до інших сервісів перевикористовуються
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=INTER_SERVICE_TIMEOUT)
+    return _client
+
+
+async def _get(url: str) -> httpx.Response:
+    response = await _get_client().get(url)
+    # 5xx - збій сервісу, який має врахувати circuit breaker
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+async def service_get(breaker, url: str) -> httpx.Response:
+    """
+    GET до іншого сервісу через circuit breaker, не блокуючи event loop.
+    Кидає CircuitOpenError, якщо breaker відкритий, і httpx.HTTPError при збої.
+    """
+    return await breaker.call_async(_get, url)
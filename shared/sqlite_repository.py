@@ -0,0 +1,366 @@
+import asyncio
+import pickle
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from shared.repository import DuplicateKeyError, Index, RangeIndex, _normalize
+
+# Скільки операцій запису об'єднується в одну транзакцію
+WRITE_BATCH_SIZE = 256
+
+
+def _sql_value(value):
+    """Значення індексу у вигляді, який SQLite порівнює так само, як Python"""
+    value = _normalize(value)
+    if isinstance(value, datetime):
+        # Фіксована точність: рядки ISO 8601 тоді впорядковуються як самі дати
+        return value.isoformat(timespec="microseconds")
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class SqliteStore:
+    """
+    Файл SQLite у режимі WAL, спільний для всіх репозиторіїв сервісу.
+
+    Усі записи виконує один потік-writer: операції з черги збираються в пакет
+    і виконуються в одній транзакції (кожна у власному SAVEPOINT, тож помилка однієї
+    не скасовує інших). Виклик запису повертається після COMMIT; write_async чекає на нього,
+    не блокуючи event loop, тож одночасні запити потрапляють в один пакет.
+    Читання йдуть через окремі з'єднання кожного потоку і не чекають на writer (WAL).
+    """
+
+    def __init__(self, path: str, synchronous: str = "NORMAL", read_threads: int = 4):
+        self.path = path
+        self.synchronous = synchronous
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._closed = False
+        # Перше з'єднання створює файл і вмикає WAL (режим зберігається у файлі)
+        self._writer_conn = self._connect()
+        self._writer_conn.execute("PRAGMA journal_mode=WAL")
+        self._writer = threading.Thread(target=self._write_loop, name=f"sqlite-writer:{path}", daemon=True)
+        self._writer.start()
+        self.read_executor = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix="sqlite-read")
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None - транзакціями керуємо самі; cached_statements - кеш підготовлених запитів
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=512)
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def submit(self, operation) -> Future:
+        """Ставить operation(conn) у чергу потоку-writer; Future завершується після COMMIT"""
+        if self._closed:
+            raise RuntimeError(f"SQLite store '{self.path}' is closed")
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def write(self, operation):
+        """Виконує operation(conn) у потоці-writer і повертає її результат"""
+        return self.submit(operation).result()
+
+    async def write_async(self, operation):
+        """Як write, але чекає на COMMIT без блокування event loop"""
+        return await asyncio.wrap_future(self.submit(operation))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+            self.read_executor.shutdown(wait=True)
+
+    def _write_loop(self):
+        conn = self._writer_conn
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_batch(self, conn, batch):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, _ in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((True, operation(conn)))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((False, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Не вдалося зафіксувати транзакцію - жодна операція пакета не збережена
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(False, e)] * len(batch)
+        for (_, future), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+class SqliteRepository:
+    """
+    Repository з тим самим інтерфейсом, що й shared.repository.Repository,
+    але записи зберігаються в SQLite: рядок = pickle запису + колонки індексів.
+    Для індексів each=True (значення - список) використовується окрема таблиця пар (значення, ключ).
+    Записи, повернуті з get/find, - копії; зміни мають проходити через update.
+    """
+
+    def __init__(self, store: SqliteStore, name: str, primary_key: str = "id",
+                 indexes: dict[str, Index] | None = None):
+        self.store = store
+        self.name = name
+        self.primary_key = primary_key
+        self.indexes: dict[str, Index] = indexes or {}
+        self._columns = [n for n, index in self.indexes.items() if not index.each]
+        self._side_tables = {n: f"{name}__{n}" for n, index in self.indexes.items() if index.each}
+        self._create_schema()
+        self._prepare_statements()
+
+    # --- Схема і запити ---
+
+    def _create_schema(self):
+        def create(conn):
+            columns = "".join(f", i_{n}" for n in self._columns)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.name} "
+                         f"(seq INTEGER PRIMARY KEY, pk UNIQUE NOT NULL, data BLOB NOT NULL{columns})")
+            for n in self._columns:
+                unique = "UNIQUE " if self.indexes[n].unique else ""
+                # UNIQUE допускає кілька NULL - як і в пам'яті, None не індексується
+                target = f"i_{n}" if unique else f"i_{n}, seq"
+                conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS {self.name}_{n} ON {self.name} ({target})")
+            for n, table in self._side_tables.items():
+                unique = "UNIQUE " if self.indexes[n].unique else ""
+                target = "value" if unique else "value, pk"
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (value NOT NULL, pk NOT NULL)")
+                conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS {table}_value ON {table} ({target})")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_pk ON {table} (pk)")
+        self.store.write(create)
+
+    def _prepare_statements(self):
+        columns = ["pk", "data"] + [f"i_{n}" for n in self._columns]
+        self._sql_insert = (f"INSERT INTO {self.name} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' * len(columns))})")
+        assignments = ", ".join(["data = ?"] + [f"i_{n} = ?" for n in self._columns])
+        self._sql_update = f"UPDATE {self.name} SET {assignments} WHERE pk = ?"
+        self._sql_get = f"SELECT data FROM {self.name} WHERE pk = ?"
+        self._sql_delete = f"DELETE FROM {self.name} WHERE pk = ?"
+        self._sql_all = f"SELECT data FROM {self.name} ORDER BY seq"
+        self._sql_len = f"SELECT COUNT(*) FROM {self.name}"
+        self._sql_find, self._sql_count, self._sql_pks = {}, {}, {}
+        for n in self._columns:
+            self._sql_find[n] = f"SELECT data FROM {self.name} WHERE i_{n} = ? ORDER BY seq"
+            self._sql_count[n] = f"SELECT COUNT(*) FROM {self.name} WHERE i_{n} = ?"
+            self._sql_pks[n] = f"SELECT pk FROM {self.name} WHERE i_{n} = ?"
+        for n, table in self._side_tables.items():
+            self._sql_find[n] = (f"SELECT t.data FROM {table} s JOIN {self.name} t ON t.pk = s.pk "
+                                 f"WHERE s.value = ? ORDER BY t.seq")
+            self._sql_count[n] = f"SELECT COUNT(*) FROM {table} WHERE value = ?"
+            self._sql_pks[n] = f"SELECT pk FROM {table} WHERE value = ?"
+
+    def _row(self, record) -> tuple:
+        values = [record[self.primary_key], pickle.dumps(record, protocol=5)]
+        for n in self._columns:
+            keys = self.indexes[n].keys_of(record)
+            values.append(_sql_value(keys[0]) if keys else None)
+        return tuple(values)
+
+    def _write_side(self, conn, pk, record, replace: bool):
+        for n, table in self._side_tables.items():
+            if replace:
+                conn.execute(f"DELETE FROM {table} WHERE pk = ?", (pk,))
+            conn.executemany(f"INSERT INTO {table} (value, pk) VALUES (?, ?)",
+                             [(_sql_value(v), pk) for v in self.indexes[n].keys_of(record)])
+
+    def _duplicate(self, error: sqlite3.IntegrityError, record) -> DuplicateKeyError:
+        # Повідомлення SQLite: "UNIQUE constraint failed: users.i_email"
+        message = str(error)
+        for n, index in self.indexes.items():
+            if message.endswith(f".i_{n}") or f"{self.name}__{n}." in message:
+                keys = index.keys_of(record)
+                return DuplicateKeyError(n, keys[0] if len(keys) == 1 else keys)
+        return DuplicateKeyError(self.primary_key, record[self.primary_key])
+
+    # --- Читання ---
+
+    def _query(self, sql: str, params=()) -> list:
+        return self.store.reader().execute(sql, params).fetchall()
+
+    def get(self, pk):
+        rows = self._query(self._sql_get, (pk,))
+        return pickle.loads(rows[0][0]) if rows else None
+
+    def __contains__(self, pk) -> bool:
+        return bool(self._query(self._sql_get, (pk,)))
+
+    def __len__(self) -> int:
+        return self._query(self._sql_len)[0][0]
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def all(self) -> list:
+        return [pickle.loads(data) for data, in self._query(self._sql_all)]
+
+    def find(self, index: str, value) -> list:
+        return [pickle.loads(data) for data, in self._query(self._sql_find[index], (_sql_value(value),))]
+
+    def find_one(self, index: str, value):
+        records = self.find(index, value)
+        return records[0] if records else None
+
+    def count(self, index: str, value) -> int:
+        return self._query(self._sql_count[index], (_sql_value(value),))[0][0]
+
+    def range(self, index: str, start=None, end=None, limit: int | None = None) -> list:
+        """Записи, у яких значення RangeIndex лежить у [start, end), у порядку індексу"""
+        if not isinstance(self.indexes[index], RangeIndex):
+            raise TypeError(f"Index '{index}' is not a RangeIndex")
+        conditions, params = [f"i_{index} IS NOT NULL"], []
+        if start is not None:
+            conditions.append(f"i_{index} >= ?")
+            params.append(_sql_value(start))
+        if end is not None:
+            conditions.append(f"i_{index} < ?")
+            params.append(_sql_value(end))
+        sql = f"SELECT data FROM {self.name} WHERE {' AND '.join(conditions)} ORDER BY i_{index}, pk"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [pickle.loads(data) for data, in self._query(sql, params)]
+
+    # Асинхронне читання: запит виконується в пулі потоків, event loop не блокується
+
+    async def _in_reader(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.store.read_executor, partial(method, *args))
+
+    async def get_async(self, pk):
+        return await self._in_reader(self.get, pk)
+
+    async def all_async(self) -> list:
+        return await self._in_reader(self.all)
+
+    async def find_async(self, index: str, value) -> list:
+        return await self._in_reader(self.find, index, value)
+
+    async def range_async(self, index: str, start=None, end=None, limit: int | None = None) -> list:
+        return await self._in_reader(self.range, index, start, end, limit)
+
+    # --- Зміни (виконуються в потоці-writer) ---
+    # Кожна зміна - операція для SqliteStore.write; варіанти *_async чекають на COMMIT у event loop
+
+    def insert(self, record):
+        self.store.write(self._insert(record))
+        return record
+
+    def update(self, pk, changes: dict):
+        """Змінює поля запису; зчитування, перевірка індексів і запис - одна операція writer"""
+        return self.store.write(self._update(pk, changes))
+
+    def delete(self, pk):
+        return self.store.write(partial(self._delete, pk=pk))
+
+    def delete_where(self, index: str, value) -> int:
+        """Видаляє всі записи з даним значенням індексу, повертає їх кількість"""
+        return self.store.write(self._delete_where(index, value))
+
+    async def insert_async(self, record):
+        await self.store.write_async(self._insert(record))
+        return record
+
+    async def update_async(self, pk, changes: dict):
+        return await self.store.write_async(self._update(pk, changes))
+
+    async def delete_async(self, pk):
+        return await self.store.write_async(partial(self._delete, pk=pk))
+
+    async def delete_where_async(self, index: str, value) -> int:
+        return await self.store.write_async(self._delete_where(index, value))
+
+    def clear(self):
+        def clear(conn):
+            conn.execute(f"DELETE FROM {self.name}")
+            for table in self._side_tables.values():
+                conn.execute(f"DELETE FROM {table}")
+        self.store.write(clear)
+
+    def _insert(self, record):
+        row = self._row(record)
+        pk = record[self.primary_key]
+
+        def insert(conn):
+            try:
+                conn.execute(self._sql_insert, row)
+                self._write_side(conn, pk, record, replace=False)
+            except sqlite3.IntegrityError as e:
+                raise self._duplicate(e, record) from None
+        return insert
+
+    def _update(self, pk, changes: dict):
+        if self.primary_key in changes and changes[self.primary_key] != pk:
+            raise ValueError("Primary key cannot be changed")
+
+        def update(conn):
+            rows = conn.execute(self._sql_get, (pk,)).fetchall()
+            if not rows:
+                return None
+            record = pickle.loads(rows[0][0])
+            for field, value in changes.items():
+                record[field] = value
+            row = self._row(record)
+            try:
+                conn.execute(self._sql_update, row[1:] + (pk,))
+                self._write_side(conn, pk, record, replace=True)
+            except sqlite3.IntegrityError as e:
+                raise self._duplicate(e, record) from None
+            return record
+        return update
+
+    def _delete_where(self, index: str, value):
+        def delete_where(conn):
+            pks = [pk for pk, in conn.execute(self._sql_pks[index], (_sql_value(value),)).fetchall()]
+            for pk in pks:
+                self._delete(conn, pk)
+            return len(pks)
+        return delete_where
+
+    def _delete(self, conn, pk):
+        rows = conn.execute(self._sql_get, (pk,)).fetchall()
+        if not rows:
+            return None
+        conn.execute(self._sql_delete, (pk,))
+        for table in self._side_tables.values():
+            conn.execute(f"DELETE FROM {table} WHERE pk = ?", (pk,))
+        return pickle.loads(rows[0][0])
@@ -0,0 +1,61 @@
+import os
+import threading
+
+from shared.repository import Index, Repository
+
+# Де зберігаються дані сервісу:
+#   memory - у пам'яті процесу (за замовчуванням, втрачаються при перезапуску)
+#   sqlite - у файлі SQLITE_PATH (режим WAL, один потік-writer)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/storage.db")
+# NORMAL у режимі WAL не втрачає даних при падінні процесу, лише при збої живлення ОС
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+# Для memory: якщо задано каталог, стан зберігається знімками + журналом змін (shared/persistence.py)
+PERSISTENCE_DIR = os.getenv("PERSISTENCE_DIR")
+PERSISTENCE_FSYNC = os.getenv("PERSISTENCE_FSYNC", "batch")  # always | batch
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "0.01"))
+PERSISTENCE_WAL_MAX_BYTES = int(os.getenv("PERSISTENCE_WAL_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_store = None
+_persistence = None
+_store_lock = threading.Lock()
+
+
+def _sqlite_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            from shared.sqlite_repository import SqliteStore
+            directory = os.path.dirname(SQLITE_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            _store = SqliteStore(SQLITE_PATH, synchronous=SQLITE_SYNCHRONOUS)
+        return _store
+
+
+def _memory_persistence():
+    global _persistence
+    with _store_lock:
+        if _persistence is None:
+            from shared.persistence import Persistence
+            _persistence = Persistence(
+                PERSISTENCE_DIR,
+                fsync_mode=PERSISTENCE_FSYNC,
+                flush_interval=PERSISTENCE_FLUSH_INTERVAL,
+                wal_max_bytes=PERSISTENCE_WAL_MAX_BYTES,
+            )
+        return _persistence
+
+
+def open_repository(name: str, primary_key: str = "id", indexes: dict[str, Index] | None = None):
+    """Репозиторій обраного бекенду (STORAGE_BACKEND) з однаковим інтерфейсом"""
+    if STORAGE_BACKEND == "sqlite":
+        from shared.sqlite_repository import SqliteRepository
+        return SqliteRepository(_sqlite_store(), name, primary_key, indexes)
+    if STORAGE_BACKEND != "memory":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    repository = Repository(name, primary_key, indexes)
+    if PERSISTENCE_DIR:
+        _memory_persistence().attach(repository)
+    return repository
@@ -1,14 +1,106 @@
-import uuid
-
-def generate_unique_id(data):
-    """Генерує ID і перевіряє унікальність в пам'яті"""
-    max_attempts = 10
-    for _ in range(max_attempts):
-        user_id = str(uuid.uuid4())
-
-        # Перевіряємо чи немає користувача з таким ID
-        user_exists = any(example['id'] == user_id for example in data)
-        if not user_exists:
-            return user_id
-            
-    raise Exception("Cannot generate unique ID")
\ No newline at end of file
+import os
+import random
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime
+
+# Формат ID (128 біт, як ULID): 48 біт - час у мілісекундах, 16 біт - вузол,
+# 64 біти - лічильник у межах мілісекунди (стартує з випадкового значення).
+# Рядок - 26 символів Crockford base32, тому лексикографічний порядок = порядок створення.
+ID_LENGTH = 26
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {c: i for i, c in enumerate(_ALPHABET)}
+_TIME_BITS, _NODE_BITS, _SEQ_BITS = 48, 16, 64
+_SEQ_MAX = (1 << _SEQ_BITS) - 1
+
+
+def _default_node_id() -> int:
+    """NODE_ID з оточення або хеш імені хоста і PID (різні контейнери - різні вузли)"""
+    node = os.getenv("NODE_ID")
+    if node is not None:
+        return int(node) & 0xFFFF
+    return zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode()) & 0xFFFF
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def _decode(id_value: str) -> int:
+    if len(id_value) != ID_LENGTH:
+        raise ValueError(f"Invalid ID: {id_value!r}")
+    value = 0
+    for char in id_value.upper():
+        try:
+            value = (value << 5) | _DECODE[char]
+        except KeyError:
+            raise ValueError(f"Invalid ID: {id_value!r}") from None
+    return value
+
+
+class IdGenerator:
+    """
+    Генератор k-сортованих ID без перевірки наявних записів (O(1)).
+    Унікальність: вузол відрізняє процеси, лічильник - ID в одній мілісекунді.
+    Якщо годинник повернувся назад, використовується останній час (ID лишаються зростаючими).
+    """
+
+    def __init__(self, node_id: int | None = None):
+        self.node_id = (node_id if node_id is not None else _default_node_id()) & 0xFFFF
+        self._last_ms = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def new_id(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                # Старт з випадкового значення: ID не вгадати за сусіднім, лишаючи місце для зростання
+                self._seq = random.getrandbits(_SEQ_BITS - 1)
+            elif self._seq < _SEQ_MAX:
+                self._seq += 1
+            else:
+                # Лічильник вичерпано - переходимо до наступної мілісекунди
+                self._last_ms += 1
+                self._seq = 0
+            value = (self._last_ms << (_NODE_BITS + _SEQ_BITS)) | (self.node_id << _SEQ_BITS) | self._seq
+        return _encode(value)
+
+
+def parse_id(id_value: str) -> tuple[datetime, int, int]:
+    """Розбирає ID на (час створення, вузол, лічильник)"""
+    value = _decode(id_value)
+    timestamp_ms = value >> (_NODE_BITS + _SEQ_BITS)
+    node_id = (value >> _SEQ_BITS) & 0xFFFF
+    return datetime.fromtimestamp(timestamp_ms / 1000), node_id, value & _SEQ_MAX
+
+
+def id_created_at(id_value: str) -> datetime:
+    """Час створення запису з його ID"""
+    return parse_id(id_value)[0]
+
+
+def id_lower_bound(moment: datetime) -> str:
+    """Найменший можливий ID для моменту часу: id >= id_lower_bound(t) означає "створено не раніше t".
+    Зручно для діапазонів за часом і пагінації без окремого поля created_at."""
+    timestamp_ms = int(moment.timestamp() * 1000)
+    return _encode(timestamp_ms << (_NODE_BITS + _SEQ_BITS))
+
+
+_generator = IdGenerator()
+
+
+def generate_id() -> str:
+    return _generator.new_id()
+
+
+def generate_unique_id(data=None):
+    """Генерує унікальний ID без перегляду наявних записів (data лишено для сумісності)"""
+    return _generator.new_id()
@@ -1,41 +1,46 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, timedelta
 import uuid
-import requests
+import httpx
 from shared.rabbitmq import publish_notification_async
+from shared.unique_id import generate_id
+from shared.circuit_breaker import auth_service_cb, CircuitOpenError
+from shared.service_client import service_get
 
 from app.api.models import (
     SubscriptionCreate, SubscriptionResponse, 
     SubscriptionStatus, SubscriptionPlan,
     PaymentRequest, PaymentResponse
 )
-from app.database import subscriptions_db, payments_db, create_subscription, find_subscription_by_user, generate_unique_id
+from app.database import (create_subscription_async, find_subscription_by_user, update_subscription_async,
+                          delete_subscription_async, add_payment_async)
 
 router = APIRouter()
 
-# Синхронний виклик до auth-service для перевірки користувача
-def verify_user_exists(user_id: str) -> bool:
+# Виклик до auth-service для перевірки користувача
+async def verify_user_exists(user_id: str) -> bool:
     try:
-        # Виклик до auth-service (синхронна комунікація)
-        response = requests.get(f"http://auth-service:8000/users/{user_id}")
+        response = await service_get(auth_service_cb, f"http://auth-service:8000/users/{user_id}")
         return response.status_code == 200
-    except requests.exceptions.RequestException:
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Auth service is temporarily unavailable")
+    except httpx.HTTPError:
         return False
     
 
 @router.post("/subscriptions", response_model=SubscriptionResponse)
 async def create_subscription_endpoint(subscription_data: SubscriptionCreate):
     # Перевірка чи існує користувач
-    if not verify_user_exists(subscription_data.user_id):
+    if not await verify_user_exists(subscription_data.user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Перевірка чи вже є підписка
-    existing_sub,index = find_subscription_by_user(subscription_data.user_id)
+    existing_sub = find_subscription_by_user(subscription_data.user_id)
     if existing_sub:
         raise HTTPException(status_code=400, detail="Subscription already exists")
     
     # Створення підписки
-    new_subscription = create_subscription(
+    new_subscription = await create_subscription_async(
         user_id=subscription_data.user_id,
         plan=subscription_data.plan
     )
@@ -55,15 +60,15 @@ async def create_subscription_endpoint(subscription_data: SubscriptionCreate):
 
 @router.post("/subscriptions/trial", response_model=SubscriptionResponse)
 async def activate_trial(user_id: str):
-    if not verify_user_exists(user_id):
+    if not await verify_user_exists(user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    existing_sub,index = find_subscription_by_user(user_id)
+    existing_sub = find_subscription_by_user(user_id)
     if existing_sub:
         raise HTTPException(status_code=400, detail="User already has subscription")
     
     # Активуємо пробну версію на 14 днів
-    trial_subscription = create_subscription(
+    trial_subscription = await create_subscription_async(
         user_id=user_id,
         plan=SubscriptionPlan.PREMIUM,
         trial_days=14
@@ -85,13 +90,13 @@ async def activate_trial(user_id: str):
 
 @router.delete("/subscriptions/{user_id}")
 async def cancel_subscription(user_id: str):
-    subscription,index = find_subscription_by_user(user_id)
+    subscription = find_subscription_by_user(user_id)
     if not subscription:
         raise HTTPException(status_code=404, detail="Subscription not found")
     
     # Оновлюємо статус
     # subscription["status"] = SubscriptionStatus.CANCELED
-    del subscriptions_db[index]
+    await delete_subscription_async(subscription["id"])
     print(f"Subscription canceled for user: {user_id}")
     try:
         await publish_notification_async(
@@ -106,7 +111,7 @@ async def cancel_subscription(user_id: str):
 
 @router.get("/subscriptions/{user_id}", response_model=SubscriptionResponse)
 async def get_subscription(user_id: str):
-    subscription,index = find_subscription_by_user(user_id)
+    subscription = find_subscription_by_user(user_id)
     if not subscription:
         raise HTTPException(status_code=404, detail="Subscription not found")
     
@@ -115,7 +120,7 @@ async def get_subscription(user_id: str):
 @router.post("/payments", response_model=PaymentResponse)
 async def process_payment(payment_data: PaymentRequest):
     # Імітація платежної системи
-    payment_id = generate_unique_id(payments_db)
+    payment_id = generate_id()
     
     # Спрощена логіка - завжди успішно
     payment_status = "success"
@@ -129,23 +134,25 @@ async def process_payment(payment_data: PaymentRequest):
         "created_at": datetime.now()
     }
     
-    payments_db.append(payment_record)
+    await add_payment_async(payment_record)
     
     # Якщо платіж успішний - оновлюємо підписку
     if payment_status == "success":
-        subscription,index = find_subscription_by_user(payment_data.user_id)
+        subscription = find_subscription_by_user(payment_data.user_id)
         if subscription:
-            subscription["status"] = SubscriptionStatus.ACTIVE
-            subscription["expires_at"] = datetime.now() + timedelta(days=30)
+            await update_subscription_async(subscription["id"], {
+                "status": SubscriptionStatus.ACTIVE,
+                "expires_at": datetime.now() + timedelta(days=30),
+            })
     
     print(f"Payment processed for user: {payment_data.user_id}")
 
     try:
         await publish_notification_async(
-            user_id = payment_record.user_id,
+            user_id = payment_record["user_id"],
             notification_type="payment_success",
             subject = "payment_success",
-            message = f"user  {payment_record.user_id} payment_success"
+            message = f"user  {payment_record['user_id']} payment_success"
         )
     except Exception as e:
         print(f"Failed to publish payment_success notification: {e}")
@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta
-import uuid
-from shared.unique_id import generate_unique_id
+from shared.unique_id import generate_id
+from shared.repository import UniqueIndex, MultiIndex
+from shared.storage import open_repository
 
-# Тимчасова база даних в пам'яті
-subscriptions_db = []
-payments_db = []
+# База даних сервісу: у пам'яті або в SQLite (STORAGE_BACKEND, див. shared/storage.py)
+subscriptions_db = open_repository("subscriptions", indexes={
+    # Одна підписка на користувача
+    "user_id": UniqueIndex("user_id"),
+})
+payments_db = open_repository("payments", primary_key="payment_id", indexes={
+    "user_id": MultiIndex("user_id"),
+})
 
 
-def create_subscription(user_id: str, plan: str, trial_days: int = 0):
-    subscription_id = generate_unique_id(subscriptions_db)
+def _new_subscription(user_id: str, plan: str, trial_days: int) -> dict:
+    subscription_id = generate_id()
     
     if trial_days > 0:
         expires_at = datetime.now() + timedelta(days=trial_days)
@@ -25,12 +31,32 @@ def create_subscription(user_id: str, plan: str, trial_days: int = 0):
         "created_at": datetime.now(),
         "expires_at": expires_at
     }
-    
-    subscriptions_db.append(subscription)
     return subscription
 
+def create_subscription(user_id: str, plan: str, trial_days: int = 0):
+    return subscriptions_db.insert(_new_subscription(user_id, plan, trial_days))
+
+async def create_subscription_async(user_id: str, plan: str, trial_days: int = 0):
+    """Як create_subscription, але без блокування event loop на час запису (для бекенду sqlite)"""
+    return await subscriptions_db.insert_async(_new_subscription(user_id, plan, trial_days))
+
 def find_subscription_by_user(user_id: str):
-    for index,sub in enumerate(subscriptions_db):
-        if sub["user_id"] == user_id:
-            return sub,index
-    return None,-1
\ No newline at end of file
+    return subscriptions_db.find_one("user_id", user_id)
+
+def update_subscription(subscription_id: str, updates: dict):
+    return subscriptions_db.update(subscription_id, updates)
+
+async def update_subscription_async(subscription_id: str, updates: dict):
+    return await subscriptions_db.update_async(subscription_id, updates)
+
+def delete_subscription(subscription_id: str):
+    return subscriptions_db.delete(subscription_id)
+
+async def delete_subscription_async(subscription_id: str):
+    return await subscriptions_db.delete_async(subscription_id)
+
+def add_payment(payment: dict):
+    return payments_db.insert(payment)
+
+async def add_payment_async(payment: dict):
+    return await payments_db.insert_async(payment)
\ No newline at end of file
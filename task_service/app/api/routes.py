@@ -1,48 +1,54 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-import requests
+import httpx
 from typing import List
+from shared.circuit_breaker import auth_service_cb, board_service_cb, CircuitOpenError
+from shared.service_client import service_get
 
 from app.api.models import (
     TaskCreate, TaskResponse, TaskUpdate, TaskStatus, TaskPriority,
     CommentCreate, CommentResponse, AssignRequest
 )
 from app.database import (
-    tasks_db, comments_db, create_task, find_task_by_id, 
-    find_tasks_by_board, update_task, add_comment, get_task_comments
+    create_task_async, find_task_by_id, find_tasks_by_board_async,
+    update_task_async, remove_task_async, add_comment_async, get_task_comments
 )
 
 router = APIRouter()
 
-def verify_user_exists(user_id: str) -> bool:
+async def verify_user_exists(user_id: str) -> bool:
     """Перевіряє чи існує користувач в auth-service"""
     try:
-        response = requests.get(f"http://auth-service:8000/users/{user_id}")
+        response = await service_get(auth_service_cb, f"http://auth-service:8000/users/{user_id}")
         return response.status_code == 200
-    except requests.exceptions.RequestException:
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Auth service is temporarily unavailable")
+    except httpx.HTTPError:
         return False
 
-def verify_board_exists(board_id: str) -> bool:
+async def verify_board_exists(board_id: str) -> bool:
     """Перевіряє чи існує дошка в board-service"""
     try:
-        response = requests.get(f"http://board-service:8000/boards/{board_id}")
+        response = await service_get(board_service_cb, f"http://board-service:8000/boards/{board_id}")
         return response.status_code == 200
-    except requests.exceptions.RequestException:
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Board service is temporarily unavailable")
+    except httpx.HTTPError:
         return False
 
 @router.post("/tasks", response_model=TaskResponse)
 async def create_task_endpoint(task_data: TaskCreate):
     # Перевірка чи існує користувач
-    if not verify_user_exists(task_data.created_by):
+    if not await verify_user_exists(task_data.created_by):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Перевірка чи існує дошка
-    if not verify_board_exists(task_data.board_id):
+    if not await verify_board_exists(task_data.board_id):
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Створення завдання
     try:
-        new_task = create_task(
+        new_task = await create_task_async(
             title=task_data.title,
             description=task_data.description,
             board_id=task_data.board_id,
@@ -57,10 +63,10 @@ async def create_task_endpoint(task_data: TaskCreate):
 
 @router.get("/tasks/board/{board_id}", response_model=List[TaskResponse])
 async def get_board_tasks(board_id: str):
-    if not verify_board_exists(board_id):
+    if not await verify_board_exists(board_id):
         raise HTTPException(status_code=404, detail="Board not found")
     
-    tasks = find_tasks_by_board(board_id)
+    tasks = await find_tasks_by_board_async(board_id)
     return [TaskResponse(**task) for task in tasks]
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
@@ -92,7 +98,7 @@ async def update_task_endpoint(task_id: str, task_data: TaskUpdate):
     if task_data.due_date is not None:
         updates["due_date"] = task_data.due_date
     
-    updated_task = update_task(task_id, updates)
+    updated_task = await update_task_async(task_id, updates)
     
     print(f"Task '{task_id}' updated")
     
@@ -109,15 +115,15 @@ async def assign_task(assign_data: AssignRequest):
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Перевірка чи призначаючий користувач існує
-    if not verify_user_exists(assign_data.admin_user_id):
+    if not await verify_user_exists(assign_data.admin_user_id):
         raise HTTPException(status_code=404, detail="Admin user not found")
     
     # Перевірка чи призначений користувач існує
-    if not verify_user_exists(assign_data.assignee_id):
+    if not await verify_user_exists(assign_data.assignee_id):
         raise HTTPException(status_code=404, detail="Assignee user not found")
     
     # Оновлюємо призначення
-    update_task(assign_data.task_id, {"assignee_id": assign_data.assignee_id})
+    await update_task_async(assign_data.task_id, {"assignee_id": assign_data.assignee_id})
     
     print(f"Task '{assign_data.task_id}' assigned to user: {assign_data.assignee_id}")
     
@@ -134,11 +140,11 @@ async def add_comment_endpoint(comment_data: CommentCreate):
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Перевірка чи користувач існує
-    if not verify_user_exists(comment_data.user_id):
+    if not await verify_user_exists(comment_data.user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Додаємо коментар
-    new_comment = add_comment(
+    new_comment = await add_comment_async(
         task_id=comment_data.task_id,
         user_id=comment_data.user_id,
         text=comment_data.text
@@ -172,7 +178,7 @@ async def archive_task(task_id: str):
         raise HTTPException(status_code=400, detail="Only completed tasks can be archived")
     
     # Архівуємо завдання
-    update_task(task_id, {"status": "archived"})
+    await update_task_async(task_id, {"status": "archived"})
     
     print(f"Task '{task_id}' archived")
     
@@ -189,7 +195,7 @@ async def restore_task(task_id: str):
         raise HTTPException(status_code=400, detail="Only archived tasks can be restored")
     
     # Відновлюємо завдання (статус TODO)
-    update_task(task_id, {"status": "todo"})
+    await update_task_async(task_id, {"status": "todo"})
     
     print(f"Task '{task_id}' restored")
     
@@ -201,13 +207,8 @@ async def delete_task(task_id: str):
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Видаляємо завдання (в реальному додатку - м'яке видалення)
-    global tasks_db
-    tasks_db = [t for t in tasks_db if t["id"] != task_id]
-    
-    # Видаляємо коментарі до завдання
-    global comments_db
-    comments_db = [c for c in comments_db if c["task_id"] != task_id]
+    # Видаляємо завдання і коментарі до нього (в реальному додатку - м'яке видалення)
+    await remove_task_async(task_id)
     
     print(f"Task '{task_id}' deleted")
     
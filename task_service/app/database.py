@@ -1,68 +1,105 @@
 from datetime import datetime, timedelta
-import uuid
-from shared.unique_id import generate_unique_id
+from shared.unique_id import generate_id
+from shared.repository import MultiIndex
+from shared.storage import open_repository
+from shared.records import Record
+from app.api.models import TaskStatus, TaskPriority
 
-# Тимчасова база даних в пам'яті
-tasks_db = []
-comments_db = []
+class TaskRecord(Record):
+    __slots__ = ("id", "title", "description", "board_id", "status", "priority", "assignee_id",
+                 "created_by", "due_date", "created_at", "updated_at")
+    TIMESTAMPS = frozenset({"due_date", "created_at", "updated_at"})
+    ENUMS = {"status": TaskStatus, "priority": TaskPriority}
+    INTERNED = frozenset({"board_id", "assignee_id", "created_by"})
+
+class CommentRecord(Record):
+    __slots__ = ("id", "task_id", "user_id", "text", "created_at")
+    TIMESTAMPS = frozenset({"created_at"})
+    INTERNED = frozenset({"task_id", "user_id"})
+
+# База даних сервісу: у пам'яті або в SQLite (STORAGE_BACKEND, див. shared/storage.py)
+tasks_db = open_repository("tasks", indexes={
+    # Лише неархівовані завдання: для ліміту і списку завдань дошки
+    "active_board_id": MultiIndex("board_id", key=lambda t: t["board_id"] if t["status"] != "archived" else None),
+})
+comments_db = open_repository("comments", indexes={
+    "task_id": MultiIndex("task_id"),
+})
 TASK_LIMIT_PER_BOARD = 100
 
-def create_task(title: str, description: str, board_id: str, created_by: str):
+def _new_task(title: str, description: str, board_id: str, created_by: str) -> TaskRecord:
     # Перевірка ліміту завдань на дошці
-    board_tasks = [t for t in tasks_db if t["board_id"] == board_id and t["status"] != "archived"]
-    if len(board_tasks) >= TASK_LIMIT_PER_BOARD:
+    if tasks_db.count("active_board_id", board_id) >= TASK_LIMIT_PER_BOARD:
         raise Exception("Task limit reached for this board")
     
-    task_id = generate_unique_id(tasks_db)
+    task_id = generate_id()
     
-    task = {
-        "id": task_id,
-        "title": title,
-        "description": description,
-        "board_id": board_id,
-        "status": "todo",
-        "priority": "medium",
-        "assignee_id": None,
-        "created_by": created_by,
-        "due_date": None,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
-    
-    tasks_db.append(task)
+    task = TaskRecord(
+        id=task_id,
+        title=title,
+        description=description,
+        board_id=board_id,
+        status=TaskStatus.TODO,
+        priority=TaskPriority.MEDIUM,
+        assignee_id=None,
+        created_by=created_by,
+        due_date=None,
+        created_at=datetime.now(),
+        updated_at=datetime.now()
+    )
     return task
 
+def create_task(title: str, description: str, board_id: str, created_by: str):
+    return tasks_db.insert(_new_task(title, description, board_id, created_by))
+
+async def create_task_async(title: str, description: str, board_id: str, created_by: str):
+    """Як create_task, але без блокування event loop на час запису (для бекенду sqlite)"""
+    return await tasks_db.insert_async(_new_task(title, description, board_id, created_by))
+
 def find_task_by_id(task_id: str):
-    for task in tasks_db:
-        if task["id"] == task_id:
-            return task
-    return None
+    return tasks_db.get(task_id)
 
 def find_tasks_by_board(board_id: str):
-    return [t for t in tasks_db if t["board_id"] == board_id and t["status"] != "archived"]
+    return tasks_db.find("active_board_id", board_id)
+
+async def find_tasks_by_board_async(board_id: str):
+    """Як find_tasks_by_board, але без блокування event loop (для бекенду sqlite)"""
+    return await tasks_db.find_async("active_board_id", board_id)
+
+def _task_changes(updates: dict) -> dict:
+    changes = {key: value for key, value in updates.items() if value is not None}
+    changes["updated_at"] = datetime.now()
+    return changes
 
 def update_task(task_id: str, updates: dict):
-    task = find_task_by_id(task_id)
-    if task:
-        for key, value in updates.items():
-            if value is not None:
-                task[key] = value
-        task["updated_at"] = datetime.now()
-    return task
+    return tasks_db.update(task_id, _task_changes(updates))
+
+async def update_task_async(task_id: str, updates: dict):
+    return await tasks_db.update_async(task_id, _task_changes(updates))
+
+def remove_task(task_id: str):
+    """Видаляє завдання разом з коментарями до нього"""
+    comments_db.delete_where("task_id", task_id)
+    return tasks_db.delete(task_id)
+
+async def remove_task_async(task_id: str):
+    await comments_db.delete_where_async("task_id", task_id)
+    return await tasks_db.delete_async(task_id)
+
+def _new_comment(task_id: str, user_id: str, text: str) -> CommentRecord:
+    return CommentRecord(
+        id=generate_id(),
+        task_id=task_id,
+        user_id=user_id,
+        text=text,
+        created_at=datetime.now()
+    )
 
 def add_comment(task_id: str, user_id: str, text: str):
-    comment_id = generate_unique_id(comments_db)
-    
-    comment = {
-        "id": comment_id,
-        "task_id": task_id,
-        "user_id": user_id,
-        "text": text,
-        "created_at": datetime.now()
-    }
-    
-    comments_db.append(comment)
-    return comment
+    return comments_db.insert(_new_comment(task_id, user_id, text))
+
+async def add_comment_async(task_id: str, user_id: str, text: str):
+    return await comments_db.insert_async(_new_comment(task_id, user_id, text))
 
 def get_task_comments(task_id: str):
-    return [c for c in comments_db if c["task_id"] == task_id]
\ No newline at end of file
+    return comments_db.find("task_id", task_id)
\ No newline at end of file
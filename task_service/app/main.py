@@ -1,8 +1,12 @@
 from fastapi import FastAPI
+from shared.persistence import DurableWritesMiddleware
 from app.api.routes import router
 
 app = FastAPI(title="Task Service", version="1.0.0")
 
+# Очікування fsync журналу (PERSISTENCE_FSYNC=always) - поза event loop, перед відправкою відповіді
+app.add_middleware(DurableWritesMiddleware)
+
 # Підключаємо всі маршрути
 app.include_router(router)
 
@@ -15,5 +19,11 @@ async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # UVICORN_UDS=/run/services/<name>.sock - слухати Unix-сокет замість TCP (gateway на тому ж хості)
+    uds = os.getenv("UVICORN_UDS")
+    if uds:
+        uvicorn.run(app, uds=uds)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# shared/ імпортується як пакет з кореня репозиторію (у сервісах його копіює Dockerfile)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,111 @@
+import pytest
+
+from shared.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def open_breaker(clock, **kwargs):
+    breaker = CircuitBreaker("test", minimum_calls=2, recovery_timeout=10, half_open_max_calls=2,
+                             clock=clock, **kwargs)
+    for _ in range(2):
+        breaker.record_failure(breaker.before_call())
+    assert breaker.state == CircuitState.OPEN
+    return breaker
+
+
+def test_late_success_from_closed_state_does_not_count_as_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", minimum_calls=2, recovery_timeout=10, half_open_max_calls=2, clock=clock)
+    # Запит допущено, поки breaker закритий; він ще виконується, коли breaker відкривається
+    slow = breaker.before_call()
+    for _ in range(2):
+        breaker.record_failure(breaker.before_call())
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 11
+    first_probe = breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    # Пізня відповідь старого запиту: не звільняє пробний слот і не закриває breaker
+    breaker.record_success(slow)
+    assert breaker.state == CircuitState.HALF_OPEN
+    second_probe = breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(first_probe)
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_success(second_probe)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_late_failure_does_not_reopen_half_open_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", minimum_calls=2, recovery_timeout=10, half_open_max_calls=1, clock=clock)
+    slow = breaker.before_call()
+    for _ in range(2):
+        breaker.record_failure(breaker.before_call())
+    clock.now += 11
+    probe = breaker.before_call()
+
+    breaker.record_failure(slow)
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_ignored(slow)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(probe)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_probe_from_previous_half_open_period_is_ignored():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now += 11
+    failed_probe = breaker.before_call()
+    stale_probe = breaker.before_call()
+    breaker.record_failure(failed_probe)
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 11
+    probe = breaker.before_call()
+    # Проба попереднього періоду half-open не зменшує лічильник нового
+    breaker.record_success(stale_probe)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success(probe)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_call_async_records_result():
+    import asyncio
+
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now += 11
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        return [await breaker.call_async(ok) for _ in range(2)]
+
+    assert asyncio.run(run()) == ["ok", "ok"]
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_success_only_traffic_does_not_grow_window():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", window_seconds=5, clock=clock)
+    for _ in range(50):
+        breaker.record_success(breaker.before_call())
+        clock.now += 1
+    assert len(breaker._buckets) <= breaker.window_seconds + 1
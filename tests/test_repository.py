@@ -0,0 +1,80 @@
+import pytest
+
+from shared.repository import DuplicateKeyError, MultiIndex, RangeIndex, Repository, UniqueIndex
+
+
+def users_repo():
+    repo = Repository("users", indexes={
+        "email": UniqueIndex("email"),
+        "team": MultiIndex("team"),
+    })
+    repo.insert({"id": "a", "email": "a@x", "team": "red"})
+    repo.insert({"id": "b", "email": "b@x", "team": "blue"})
+    return repo
+
+
+def test_update_rolls_back_on_unique_conflict():
+    repo = users_repo()
+    with pytest.raises(DuplicateKeyError) as error:
+        repo.update("b", {"email": "a@x", "team": "red", "nickname": "bee"})
+    assert error.value.index == "email"
+
+    # Запис і всі індекси - як до невдалої зміни
+    assert repo.get("b") == {"id": "b", "email": "b@x", "team": "blue"}
+    assert repo.find_one("email", "a@x")["id"] == "a"
+    assert repo.find_one("email", "b@x")["id"] == "b"
+    assert [r["id"] for r in repo.find("team", "red")] == ["a"]
+    assert [r["id"] for r in repo.find("team", "blue")] == ["b"]
+
+    # Після відкату унікальне значення все ще можна змінити
+    repo.update("b", {"email": "c@x"})
+    assert repo.find_one("email", "c@x")["id"] == "b"
+    assert repo.find_one("email", "b@x") is None
+
+
+def test_each_index_is_rebuilt_on_update_and_delete():
+    repo = Repository("boards", indexes={"users": MultiIndex("users", each=True)})
+    repo.insert({"id": "b1", "users": ["u1", "u2", "u2"]})
+    repo.insert({"id": "b2", "users": ["u2"]})
+    # Дублікат у списку індексується один раз
+    assert [r["id"] for r in repo.find("users", "u2")] == ["b1", "b2"]
+
+    repo.update("b1", {"users": ["u2", "u3"]})
+    assert repo.find("users", "u1") == []
+    assert {r["id"] for r in repo.find("users", "u2")} == {"b1", "b2"}
+    assert [r["id"] for r in repo.find("users", "u3")] == ["b1"]
+
+    repo.delete("b1")
+    assert repo.find("users", "u3") == []
+    assert [r["id"] for r in repo.find("users", "u2")] == ["b2"]
+    assert repo.indexes["users"].entries == {"u2": {"b2": None}}
+
+
+def test_range_between_boundaries():
+    index = RangeIndex("at")
+    for pk, value in (("a", 1), ("b", 2), ("c", 2), ("d", 3), ("e", 5)):
+        index.add(value, pk)
+
+    assert index.between(2, 3) == ["b", "c"]
+    assert index.between(2, 3, include_end=True) == ["b", "c", "d"]
+    assert index.between(None, 2) == ["a"]
+    assert index.between(3) == ["d", "e"]
+    assert index.between(4, 5) == []
+    assert index.between(1, 5, limit=2) == ["a", "b"]
+    assert index.between(2, 2, include_end=True, limit=1) == ["b"]
+    assert index.between(limit=0) == []
+    assert index.lookup(2) == ["b", "c"]
+
+
+def test_delete_where_removes_all_matches_from_every_index():
+    repo = users_repo()
+    repo.insert({"id": "c", "email": "c@x", "team": "red"})
+
+    assert repo.delete_where("team", "red") == 2
+    assert [r["id"] for r in repo.all()] == ["b"]
+    assert repo.find("team", "red") == []
+    assert repo.find_one("email", "a@x") is None
+    # Звільнене унікальне значення можна використати знову
+    repo.insert({"id": "d", "email": "a@x", "team": "blue"})
+    assert repo.delete_where("team", "missing") == 0
+    assert len(repo) == 2
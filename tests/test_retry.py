@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+
+import httpx
+
+# Модулі gateway імпортуються з його каталогу (як у контейнері)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gateaway"))
+
+import retry  # noqa: E402
+from config import DEFAULT_POOL_SETTINGS  # noqa: E402
+from upstream import UpstreamPool  # noqa: E402
+
+
+class FakeClient:
+    def __init__(self, calls: list, url: str):
+        self.calls = calls
+        self.url = url
+
+    async def request(self, method, url, **kwargs):
+        self.calls.append(self.url)
+        return httpx.Response(200, text=self.url)
+
+
+class BlockingLimiter:
+    """Перший запит чекає на слот, поки тест його не відпустить; решта проходять одразу"""
+
+    def __init__(self):
+        self.opened = asyncio.Event()
+        self.waiting = 0
+
+    async def acquire(self, deadline=None):
+        self.waiting += 1
+        if self.waiting == 1:
+            await self.opened.wait()
+
+    def release(self, latency, failed):
+        pass
+
+
+def make_pool(urls: list, calls: list) -> UpstreamPool:
+    pool = UpstreamPool("test", urls, DEFAULT_POOL_SETTINGS)
+    for endpoint in pool.endpoints:
+        endpoint.client = FakeClient(calls, endpoint.url)
+    pool.limiter = BlockingLimiter()
+    return pool
+
+
+def hedges(outcome: str) -> float:
+    return retry.UPSTREAM_RETRIES.labels(service="test", kind="hedge", outcome=outcome)._value.get()
+
+
+def test_no_hedge_to_single_replica_while_primary_waits_for_limiter(monkeypatch):
+    monkeypatch.setattr(retry.retry_budget, "tokens", 10.0)
+    calls = []
+    sent, skipped = hedges("sent"), hedges("no_replica")
+
+    async def run():
+        pool = make_pool(["http://a"], calls)
+        request = asyncio.create_task(
+            retry.request_with_policy(pool, "GET", "/x", {"hedge": {"delay": 0.01}}, "test"))
+        # Затримка hedge минула, а основний запит ще в черзі limiter
+        await asyncio.sleep(0.05)
+        pool.limiter.opened.set()
+        return await request
+
+    response = asyncio.run(run())
+    assert response.text == "http://a"
+    assert calls == ["http://a"]
+    assert hedges("sent") == sent
+    assert hedges("no_replica") == skipped + 1
+
+
+def test_hedge_goes_to_other_replica_while_primary_waits_for_limiter(monkeypatch):
+    monkeypatch.setattr(retry.retry_budget, "tokens", 10.0)
+    calls = []
+    sent = hedges("sent")
+    picked = []
+
+    async def run():
+        pool = make_pool(["http://a", "http://b"], calls)
+        pick = pool.pick
+
+        def recording_pick(exclude=()):
+            endpoint = pick(exclude)
+            picked.append(endpoint.url)
+            return endpoint
+
+        pool.pick = recording_pick
+        response = await retry.request_with_policy(pool, "GET", "/x", {"hedge": {"delay": 0.01}}, "test")
+        pool.limiter.opened.set()
+        return response
+
+    response = asyncio.run(run())
+    # Hedge пройшов, поки основний запит чекав, і пішов на іншу репліку
+    primary, hedge = picked
+    assert primary != hedge
+    assert calls == [hedge] and response.text == hedge
+    assert hedges("sent") == sent + 1
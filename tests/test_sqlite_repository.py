@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import pytest
+
+from shared.repository import DuplicateKeyError, MultiIndex, UniqueIndex
+from shared.sqlite_repository import SqliteRepository, SqliteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(str(tmp_path / "test.db"))
+    yield store
+    store.close()
+
+
+def test_async_writes_do_not_block_event_loop_and_share_a_commit(store, monkeypatch):
+    repo = SqliteRepository(store, "users", indexes={"email": UniqueIndex("email"), "team": MultiIndex("team")})
+    batches = []
+    run_batch = store._run_batch
+
+    def recording_run_batch(conn, batch):
+        batches.append(len(batch))
+        run_batch(conn, batch)
+
+    monkeypatch.setattr(store, "_run_batch", recording_run_batch)
+
+    # Повільний COMMIT: writer зайнятий, доки тест його не відпустить
+    committing = threading.Event()
+    release = threading.Event()
+
+    def slow_commit(conn):
+        committing.set()
+        release.wait(5)
+
+    async def run():
+        slow = asyncio.wrap_future(store.submit(slow_commit))
+        await asyncio.to_thread(committing.wait, 5)
+        writes = [asyncio.create_task(repo.insert_async({"id": f"u{i}", "email": f"u{i}@x", "team": "red"}))
+                  for i in range(50)]
+        await asyncio.sleep(0)
+        # Усі записи вже в черзі writer, а event loop і далі обслуговує інші запити
+        assert store._queue.qsize() == 50
+        assert await repo.get_async("u0") is None
+        assert not any(write.done() for write in writes)
+        release.set()
+        await slow
+        return await asyncio.gather(*writes)
+
+    records = asyncio.run(run())
+    assert [r["id"] for r in records] == [f"u{i}" for i in range(50)]
+    # 50 одночасних записів - одна транзакція, а не 50 COMMIT по черзі
+    assert batches == [1, 50]
+    assert len(repo.find("team", "red")) == 50
+
+
+def test_async_mutations_return_results_and_raise_errors(store):
+    repo = SqliteRepository(store, "boards", indexes={
+        "name": UniqueIndex("name"),
+        "users": MultiIndex("users", each=True),
+    })
+
+    async def run():
+        await repo.insert_async({"id": "b1", "name": "one", "users": ["u1", "u2"]})
+        await repo.insert_async({"id": "b2", "name": "two", "users": ["u2"]})
+        with pytest.raises(DuplicateKeyError):
+            await repo.insert_async({"id": "b3", "name": "one", "users": []})
+        with pytest.raises(DuplicateKeyError):
+            await repo.update_async("b2", {"name": "one"})
+        updated = await repo.update_async("b1", {"users": ["u3"]})
+        assert await repo.update_async("missing", {"name": "x"}) is None
+        removed = await repo.delete_where_async("users", "u2")
+        deleted = await repo.delete_async("b1")
+        return updated, removed, deleted
+
+    updated, removed, deleted = asyncio.run(run())
+    assert updated["users"] == ["u3"]
+    assert removed == 1
+    assert deleted["id"] == "b1"
+    assert len(repo) == 0